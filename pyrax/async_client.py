@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2012 Rackspace
+
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Asynchronous wrappers for the clients and managers built on BaseClient and
+BaseManager.
+
+Each call returns an AsyncResult immediately, and the request itself is made
+by a bounded pool of workers. If eventlet is installed and the application
+has monkey-patched the standard library with eventlet.monkey_patch(), the
+workers are green threads, so thousands of calls can be in flight without an
+OS thread for each. Otherwise a fixed number of worker threads is used;
+green threads would never get to run while an unpatched thread waits for
+their results.
+
+The results are the same resource objects that the synchronous calls return,
+and failed calls raise the same exceptions.
+"""
+
+import Queue
+import sys
+import threading
+
+import pyrax.exceptions as exc
+
+# Use eventlet if available
+try:
+    import eventlet
+    import eventlet.patcher
+except ImportError:
+    eventlet = None
+
+
+def _green_threads_usable():
+    """
+    Returns True if eventlet is installed and threading has been
+    monkey-patched, so that waiting on a result lets green threads run.
+    """
+    if eventlet is None:
+        return False
+    return eventlet.patcher.is_monkey_patched("thread")
+
+
+class AsyncResult(object):
+    """
+    The pending result of an asynchronous call. Call result() to wait for
+    the call to finish and get its return value; if the call raised an
+    exception, result() raises it.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._value = None
+        self._exc_info = None
+
+
+    def done(self):
+        """Returns True if the call has finished."""
+        return self._event.is_set()
+
+
+    def result(self, timeout=None):
+        """
+        Waits up to 'timeout' seconds (forever if timeout is None) for the
+        call to finish, and returns its result or raises its exception. If
+        the call doesn't finish in time, AsyncCallTimedOut is raised.
+        """
+        if not self._event.wait(timeout):
+            raise exc.AsyncCallTimedOut("The call did not finish within %s "
+                    "seconds." % timeout)
+        if self._exc_info:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._value
+
+
+    def exception(self, timeout=None):
+        """
+        Waits like result(), and returns the exception raised by the call,
+        or None if it succeeded.
+        """
+        if not self._event.wait(timeout):
+            raise exc.AsyncCallTimedOut("The call did not finish within %s "
+                    "seconds." % timeout)
+        return self._exc_info[1] if self._exc_info else None
+
+
+    def add_done_callback(self, fnc):
+        """
+        Arranges for fnc(async_result) to be called when the call finishes.
+        If it has already finished, fnc is called immediately.
+        """
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(fnc)
+                return
+        fnc(self)
+
+
+    def _set_result(self, value, exc_info=None):
+        with self._lock:
+            self._value = value
+            self._exc_info = exc_info
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fnc in callbacks:
+            fnc(self)
+
+
+
+class AsyncExecutor(object):
+    """
+    Runs submitted calls on up to 'max_workers' green threads if eventlet is
+    available and threading has been monkey-patched, or OS threads if not.
+    Calls beyond that number wait their turn.
+
+    Pass 'use_green=True' to use green threads even though threading hasn't
+    been patched, for instance when all the waiting is done from green
+    threads, or 'use_green=False' to always use OS threads.
+    """
+    def __init__(self, max_workers=10, use_green=None):
+        self.max_workers = max_workers
+        self._queue = Queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        if use_green is None:
+            use_green = _green_threads_usable()
+        if use_green and eventlet is not None:
+            self._green_pool = eventlet.GreenPool(max_workers)
+        else:
+            self._green_pool = None
+
+
+    def submit(self, fnc, *args, **kwargs):
+        """
+        Schedules fnc(*args, **kwargs) to be called, and returns an
+        AsyncResult for it.
+        """
+        result = AsyncResult()
+        if self._green_pool is not None:
+            self._green_pool.spawn_n(self._run, result, fnc, args, kwargs)
+            return result
+        self._queue.put((result, fnc, args, kwargs))
+        with self._lock:
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+        return result
+
+
+    def shutdown(self, wait=True):
+        """
+        Stops the workers once the calls already submitted have finished. If
+        'wait' is True, waits for that to happen.
+        """
+        if self._green_pool is not None:
+            if wait:
+                self._green_pool.waitall()
+            return
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._run(*item)
+
+
+    @staticmethod
+    def _run(result, fnc, args, kwargs):
+        try:
+            value = fnc(*args, **kwargs)
+        except Exception:
+            result._set_result(None, sys.exc_info())
+        else:
+            result._set_result(value)
+
+
+
+class AsyncBaseManager(object):
+    """
+    Wraps a BaseManager, so that its calls return AsyncResults instead of
+    blocking.
+    """
+    def __init__(self, manager, executor):
+        self.manager = manager
+        self.executor = executor
+
+
+    def list(self, limit=None, marker=None):
+        """Gets a list of all items."""
+        return self.executor.submit(self.manager.list, limit=limit,
+                marker=marker)
+
+
+    def get(self, item):
+        """Gets a specific item."""
+        return self.executor.submit(self.manager.get, item)
+
+
+    def create(self, *args, **kwargs):
+        """Creates a new item."""
+        return self.executor.submit(self.manager.create, *args, **kwargs)
+
+
+    def delete(self, item):
+        """Deletes the specified item."""
+        return self.executor.submit(self.manager.delete, item)
+
+
+    def action(self, item, action_type, body={}):
+        """Makes a call to the 'action' API for the item."""
+        return self.executor.submit(self.manager.action, item, action_type,
+                body=body)
+
+
+    def find(self, **kwargs):
+        """Finds a single item with attributes matching ``**kwargs``."""
+        return self.executor.submit(self.manager.find, **kwargs)
+
+
+    def findall(self, **kwargs):
+        """Finds all items with attributes matching ``**kwargs``."""
+        return self.executor.submit(self.manager.findall, **kwargs)
+
+
+
+class AsyncBaseClient(object):
+    """
+    Wraps a BaseClient, so that its calls return AsyncResults instead of
+    blocking. The list/get/create/delete/find/findall methods work as they
+    do on the client; any other method of the client can be called
+    asynchronously with submit().
+
+    By default the number of workers matches the size of the client's HTTP
+    connection pool. 'use_green' is passed to the AsyncExecutor.
+    """
+    def __init__(self, client, max_workers=None, use_green=None):
+        self.client = client
+        if max_workers is None:
+            max_workers = client.http_pool_size
+        self.executor = AsyncExecutor(max_workers=max_workers,
+                use_green=use_green)
+        self._manager = AsyncBaseManager(client._manager, self.executor)
+
+
+    def wrap_manager(self, manager):
+        """
+        Returns an AsyncBaseManager for one of the client's other managers,
+        sharing this client's workers.
+        """
+        return AsyncBaseManager(manager, self.executor)
+
+
+    def submit(self, fnc, *args, **kwargs):
+        """
+        Calls the function asynchronously. 'fnc' may be a callable, or the
+        name of a method of the wrapped client.
+        """
+        if isinstance(fnc, basestring):
+            fnc = getattr(self.client, fnc)
+        return self.executor.submit(fnc, *args, **kwargs)
+
+
+    def list(self, limit=None, marker=None):
+        """Returns a list of all resources."""
+        return self.submit(self.client.list, limit=limit, marker=marker)
+
+
+    def get(self, item):
+        """Gets a specific resource."""
+        return self.submit(self.client.get, item)
+
+
+    def create(self, *args, **kwargs):
+        """Creates a new resource."""
+        return self.submit(self.client.create, *args, **kwargs)
+
+
+    def delete(self, item):
+        """Deletes a specific resource."""
+        return self.submit(self.client.delete, item)
+
+
+    def action(self, item, action_type, body={}):
+        """Makes a call to the 'action' API for the resource."""
+        return self._manager.action(item, action_type, body=body)
+
+
+    def find(self, **kwargs):
+        """Finds a single item with attributes matching ``**kwargs``."""
+        return self.submit(self.client.find, **kwargs)
+
+
+    def findall(self, **kwargs):
+        """Finds all items with attributes matching ``**kwargs``."""
+        return self.submit(self.client.findall, **kwargs)
+
+
+    def shutdown(self, wait=True):
+        """Stops the workers once the pending calls have finished."""
+        self.executor.shutdown(wait=wait)
+
+
+
+def wait_all(results, timeout=None):
+    """
+    Waits for all of the AsyncResults to finish, and returns a list of their
+    results in the same order. The first exception raised by any of the
+    calls is re-raised.
+    """
+    return [result.result(timeout) for result in results]
+
+
+def call_all(fncs, max_workers=10, use_green=None):
+    """
+    Calls each of the functions with no arguments, running up to
+    'max_workers' of them at a time, and waits for all of them to finish.
+    Returns their results in the same order; the first exception raised by
+    any of them is re-raised. If only one worker would be used, the
+    functions are simply called in turn. 'use_green' is passed to the
+    AsyncExecutor.
+    """
+    max_workers = min(max_workers, len(fncs))
+    if max_workers <= 1:
+        return [fnc() for fnc in fncs]
+    executor = AsyncExecutor(max_workers=max_workers, use_green=use_green)
+    try:
+        return wait_all([executor.submit(fnc) for fnc in fncs])
+    finally:
+        executor.shutdown()
@@ -1,10 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import copy
 import datetime
 from functools import wraps
 import hashlib
 import hmac
+import json
+import logging
 # Use eventlet if available
 try:
     import eventlet.green.httplib as httplib
@@ -12,8 +15,10 @@ except ImportError:
     import httplib
 import math
 import os
+import Queue
 import re
 import socket
+import tempfile
 import threading
 import time
 import urllib
@@ -37,6 +42,33 @@ no_such_container_pattern = re.compile(r"Container GET|HEAD failed: .+/(.+) 404"
 etag_fail_pat = r"Object PUT failed: .+/([^/]+)/(\S+) 422 Unprocessable Entity"
 etag_failed_pattern = re.compile(etag_fail_pat)
 
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+def _bulk_delete(url, token, data, http_conn=None, **kwargs):
+    """
+    Sends a request to the bulk delete middleware to delete the objects whose
+    newline-separated '/container/object' paths are in 'data', and returns
+    the decoded response. The signature matches the swiftclient functions so
+    that it can be called through Connection._retry().
+    """
+    parsed, conn = http_conn
+    path = "%s?bulk-delete" % parsed.path
+    headers = {"X-Auth-Token": token,
+            "Accept": "application/json",
+            "Content-Type": "text/plain",
+            "Content-Length": str(len(data)),
+            }
+    conn.request("DELETE", path, data, headers)
+    resp = conn.getresponse()
+    body = resp.read()
+    if not 200 <= resp.status < 300:
+        raise _swift_client.ClientException("Bulk delete failed",
+                http_status=resp.status, http_reason=resp.reason)
+    return json.loads(body)
+
+
 def handle_swiftclient_exception(fnc):
     @wraps(fnc)
     def _wrapped(*args, **kwargs):
@@ -78,10 +110,28 @@ class CFClient(object):
     _container_cache = {}
     # Upload size limit
     max_file_size = 5368709119  # 5GB - 1
+    # Unsized streams passed to store_object() are held in memory up to
+    # this many bytes before being spooled to disk.
+    spool_size = 8 * 1024 * 1024
+    # Size of the ranged requests made by download_object(), and of the
+    # chunks read from each of them.
+    download_part_size = 64 * 1024 * 1024
+    download_chunk_size = 65536
+    # Appended to the destination path to name the journal kept by
+    # resumable downloads.
+    download_journal_suffix = ".pyrax-journal"
+    # Default number of simultaneous requests made when deleting all the
+    # objects in a container.
+    delete_concurrency = 10
+    # The largest bulk delete the cluster accepts, once it has been looked up.
+    _bulk_delete_max = None
     # Folder upload status dict. Each upload will generate its own UUID key.
     # The app can use that key query the status of the upload. This dict
     # will also be used to hold the flag to interrupt uploads in progress.
     folder_upload_status = {}
+    # Folder uploads with concurrency > 1 update the progress from several
+    # threads at once.
+    _folder_upload_lock = threading.Lock()
 
 
     def __init__(self, auth_endpoint, username, api_key, tenant_name,
@@ -108,6 +158,34 @@ class CFClient(object):
         self.connection._make_cdn_connection(cdn_url)
 
 
+    def _clone_connection(self):
+        """
+        swiftclient connections cannot be shared between threads, so code that
+        uploads or downloads in several threads at once needs one connection
+        per thread. This returns a new Connection that re-uses the storage URL
+        and auth token of the current one, so no additional authentication
+        request is needed.
+        """
+        conn = self.connection
+        return Connection(conn.authurl, conn.user, conn.key,
+                preauthurl=conn.url, preauthtoken=conn.token,
+                tenant_name=getattr(conn, "tenant_name", None),
+                auth_version=conn.auth_version,
+                os_options=dict(getattr(conn, "os_options", None) or {}),
+                http_log_debug=conn.http_log_debug)
+
+
+    def _get_worker_client(self):
+        """
+        Returns a copy of this client that has its own connection, for use
+        in a separate thread. The container cache and folder upload status
+        are class attributes, so they are shared with the original.
+        """
+        clt = copy.copy(self)
+        clt.connection = self._clone_connection()
+        return clt
+
+
     def _massage_metakeys(self, dct, prfx):
         """
         Returns a copy of the supplied dictionary, prefixing any keys that do not
@@ -374,24 +452,156 @@ class CFClient(object):
 
 
     @handle_swiftclient_exception
-    def delete_container(self, container, del_objects=False):
+    def delete_container(self, container, del_objects=False, concurrency=None):
         """
         Deletes the specified container. This will fail if the container
         still has objects stored in it; if that's the case and you want
         to delete the container anyway, set del_objects to True, and
         the container's objects will be deleted before the container is
-        deleted.
+        deleted. See delete_all_objects() for the meaning of 'concurrency'.
         """
         self._remove_container_from_cache(container)
         cname = self._resolve_name(container)
         if del_objects:
-            objs = self.get_container_object_names(cname)
-            for obj in objs:
-                self.delete_object(cname, obj)
+            self.delete_all_objects(cname, concurrency=concurrency)
         self.connection.delete_container(cname)
         return True
 
 
+    @handle_swiftclient_exception
+    def delete_all_objects(self, container, concurrency=None, use_bulk=None):
+        """
+        Deletes every object in the container, and returns a dict with the
+        number of objects that were 'deleted' and the number that 'failed',
+        along with a list of 'errors'. Each error is a 2-tuple of the object
+        name and either the exception raised or the status reported by the
+        bulk delete middleware; the name is None when a failure can't be
+        tied to particular objects.
+
+        The listing is read one page at a time, and the objects on each page
+        are deleted before the next page is requested, so this works for
+        containers of any size. If the cluster supports the bulk delete
+        middleware, each page is deleted with as few requests as possible;
+        otherwise the objects are deleted individually. Either way, up to
+        'concurrency' requests (self.delete_concurrency by default) are made
+        at once. Pass 'use_bulk=False' to always delete objects individually.
+
+        Objects that no longer exist by the time they are deleted are counted
+        as deleted.
+        """
+        cname = self._resolve_name(container)
+        concurrency = concurrency or self.delete_concurrency
+        bulk_max = 0
+        if use_bulk is not False:
+            bulk_max = self._get_bulk_delete_max()
+        # (deleted, failed) counts, appended to from several threads at once.
+        counts = []
+        # (name, error) pairs reported in the bodies of bulk deletes.
+        bulk_errors = []
+
+        def iter_names():
+            for obj in self.iter_objects(cname):
+                yield obj.name
+
+        def iter_batches():
+            batch = []
+            for name in iter_names():
+                batch.append(name)
+                if len(batch) == bulk_max:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        def delete_one(clt, name):
+            try:
+                clt.connection.delete_object(cname, name)
+            except _swift_client.ClientException as e:
+                if e.http_status != 404:
+                    raise
+            counts.append((1, 0))
+
+        def quote(val):
+            if isinstance(val, unicode):
+                val = val.encode(pyrax.encoding)
+            return urllib.quote(val)
+
+        def delete_batch(clt, names):
+            data = "\n".join("/%s/%s" % (quote(cname), quote(name))
+                    for name in names)
+            resp = clt.connection._retry(None, _bulk_delete, data)
+            # The middleware answers 200 even when the batch fails; the real
+            # outcome is in the body. Objects that were already gone count
+            # as deleted, as they do when deleting one at a time.
+            status = resp.get("Response Status") or "200 OK"
+            if "Number Deleted" in resp or not status.startswith("2"):
+                deleted = ((resp.get("Number Deleted") or 0) +
+                        (resp.get("Number Not Found") or 0))
+            else:
+                deleted = len(names) - len(resp.get("Errors") or [])
+            deleted = min(deleted, len(names))
+            counts.append((deleted, len(names) - deleted))
+            reported = resp.get("Errors") or []
+            for path, err in reported:
+                name = urllib.unquote(path.split("/", 2)[-1])
+                bulk_errors.append((name, err))
+            if deleted < len(names) and not reported:
+                bulk_errors.append((None, status))
+
+        if bulk_max:
+            batch_errors = self._run_in_parallel(delete_batch,
+                    iter_batches(), concurrency)
+            failed = 0
+            errors = []
+            for batch, err in batch_errors:
+                if batch is None:
+                    errors.append((None, err))
+                    continue
+                failed += len(batch)
+                errors.extend((name, err) for name in batch)
+            errors.extend(bulk_errors)
+        else:
+            errors = self._run_in_parallel(delete_one, iter_names(),
+                    concurrency)
+            failed = len([name for name, err in errors if name is not None])
+        deleted = sum(count[0] for count in counts)
+        failed += sum(count[1] for count in counts)
+        cont = self._container_cache.get(cname)
+        if cont is not None:
+            cont._object_cache.clear()
+        return {"deleted": deleted, "failed": failed, "errors": errors}
+
+
+    def _get_bulk_delete_max(self):
+        """
+        Returns the maximum number of objects that the cluster's bulk delete
+        middleware accepts in a single request, or 0 if bulk deletes are not
+        available. The cluster's capabilities are only requested the first
+        time; if that request fails, it is tried again next time.
+        """
+        if self._bulk_delete_max is not None:
+            return self._bulk_delete_max
+        get_capabilities = getattr(self.connection, "get_capabilities", None)
+        if get_capabilities is None:
+            # Older versions of swiftclient can't query the cluster.
+            self._bulk_delete_max = 0
+            return 0
+        try:
+            # Without the storage URL, swiftclient re-authenticates to find
+            # it.
+            caps = get_capabilities(self.connection.url)
+        except Exception as e:
+            logger.warning("Could not get the cluster's capabilities, so "
+                    "objects will be deleted individually: %s", e)
+            return 0
+        bulk = caps.get("bulk_delete")
+        if bulk is None:
+            self._bulk_delete_max = 0
+        else:
+            self._bulk_delete_max = bulk.get("max_deletes_per_request", 10000)
+        return self._bulk_delete_max
+
+
     def _remove_container_from_cache(self, container):
         """Removes the container from the cache."""
         nm = self._resolve_name(container)
@@ -417,25 +627,79 @@ class CFClient(object):
 
     @handle_swiftclient_exception
     def store_object(self, container, obj_name, data, content_type=None,
-            etag=None):
+            etag=None, return_none=False):
         """
         Creates a new object in the specified container, and populates it with
         the given data.
+
+        The data can be a string, a buffer such as a bytearray or memoryview,
+        a file-like object, or an iterable that yields chunks of the content.
+        It is sent directly from memory with its Content-Length computed up
+        front; only streams that can't be sized without reading them are
+        spooled to a temporary file first, and then only if they are large.
+
+        The StorageObject for the new object is returned, unless
+        'return_none' is set to True, which saves a request.
         """
         cont = self.get_container(container)
-        with utils.SelfDeletingTempfile() as tmp:
-            with open(tmp, "wb") as tmpfile:
-                try:
-                    tmpfile.write(data)
-                except UnicodeEncodeError:
-                    udata = data.encode("utf-8")
-                    tmpfile.write(udata)
-            with open(tmp, "rb") as tmpfile:
-                self.connection.put_object(cont.name, obj_name,
-                        contents=tmpfile, content_type=content_type, etag=etag)
+        contents, content_length = self._get_upload_contents(data)
+        try:
+            self.connection.put_object(cont.name, obj_name, contents=contents,
+                    content_length=content_length, content_type=content_type,
+                    etag=etag)
+        finally:
+            if contents is not data and hasattr(contents, "close"):
+                contents.close()
+        if return_none:
+            return None
         return self.get_object(container, obj_name)
 
 
+    def _get_upload_contents(self, data):
+        """
+        Returns a (contents, content_length) tuple for the supplied data that
+        can be passed to put_object(). When the data is already seekable or
+        held in memory, it is used as is; otherwise it is copied into a
+        SpooledTemporaryFile, which stays in memory unless it grows larger
+        than self.spool_size.
+        """
+        if isinstance(data, unicode):
+            data = data.encode("utf-8")
+        if isinstance(data, str):
+            return data, len(data)
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+            return data, len(data)
+        if isinstance(data, (bytearray, buffer)):
+            data = str(data)
+            return data, len(data)
+        if hasattr(data, "read"):
+            try:
+                pos = data.tell()
+                data.seek(0, os.SEEK_END)
+                end = data.tell()
+                data.seek(pos)
+                return data, end - pos
+            except (AttributeError, IOError, OSError):
+                # Not seekable; fall through and spool it.
+                chunks = iter(lambda: data.read(self.spool_size), "")
+        elif isinstance(data, (list, tuple)):
+            chunks = [chk.encode("utf-8") if isinstance(chk, unicode) else chk
+                    for chk in data]
+            data = "".join(chunks)
+            return data, len(data)
+        else:
+            chunks = data
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        for chunk in chunks:
+            if isinstance(chunk, unicode):
+                chunk = chunk.encode("utf-8")
+            spool.write(chunk)
+        content_length = spool.tell()
+        spool.seek(0)
+        return spool, content_length
+
+
     @handle_swiftclient_exception
     def copy_object(self, container, obj_name, new_container, new_obj_name=None):
         """
@@ -489,12 +753,21 @@ class CFClient(object):
 
     @handle_swiftclient_exception
     def upload_file(self, container, file_or_path, obj_name=None,
-            content_type=None, etag=None, return_none=False):
+            content_type=None, etag=None, return_none=False,
+            segment_size=None, concurrency=1):
         """
         Uploads the specified file to the container. If no name is supplied, the
         file's name will be used. Either a file path or an open file-like object
         may be supplied. A StorageObject reference to the uploaded file will be
         returned, unless 'return_none' is set to True.
+
+        Files larger than self.max_file_size are uploaded as a series of
+        segments plus a manifest object. You can also have smaller files
+        segmented by passing a 'segment_size' that is less than the size of
+        the file. Each segment is read directly from the file and its checksum
+        is computed as it is sent, so no temporary copies are made. Segments
+        are uploaded 'concurrency' at a time, and the manifest is uploaded
+        once all of the segments are stored.
         """
         cont = self.get_container(container)
 
@@ -512,33 +785,17 @@ class CFClient(object):
                 fsize = 0
             else:
                 fsize = get_file_size(fileobj)
-            if fsize < self.max_file_size:
+            if (fsize < self.max_file_size) and (segment_size is None
+                    or fsize <= segment_size):
                 # We can just upload it as-is.
                 return self.connection.put_object(cont.name, obj_name,
                         contents=fileobj, content_type=content_type,
                         etag=etag)
             # Files larger than self.max_file_size must be segmented
             # and uploaded separately.
-            num_segments = int(math.ceil(float(fsize) / self.max_file_size))
-            digits = int(math.log10(num_segments)) + 1
-            # NOTE: This could be greatly improved with threading or other
-            # async design.
-            for segment in xrange(num_segments):
-                sequence = str(segment + 1).zfill(digits)
-                seg_name = "%s.%s" % (fname, sequence)
-                with utils.SelfDeletingTempfile() as tmpname:
-                    with open(tmpname, "wb") as tmp:
-                        tmp.write(fileobj.read(self.max_file_size))
-                    with open(tmpname, "rb") as tmp:
-                        # We have to calculate the etag for each segment
-                        etag = utils.get_checksum(tmp)
-                        self.connection.put_object(cont.name, seg_name,
-                                contents=tmp, content_type=content_type,
-                                etag=etag)
-            # Upload the manifest
-            hdr = {"X-Object-Meta-Manifest": "%s." % fname}
-            return self.connection.put_object(cont.name, fname,
-                    contents=None, headers=hdr)
+            return self._upload_segments(cont, obj_name, fileobj, fsize,
+                    content_type=content_type, segment_size=segment_size,
+                    concurrency=concurrency)
 
         ispath = isinstance(file_or_path, basestring)
         if ispath:
@@ -564,7 +821,120 @@ class CFClient(object):
             return self.get_object(container, obj_name)
 
 
-    def upload_folder(self, folder_path, container=None, ignore=None):
+    def _upload_segments(self, cont, obj_name, fileobj, fsize,
+            content_type=None, segment_size=None, concurrency=1):
+        """
+        Uploads the remainder of 'fileobj' as a series of segments named
+        '<obj_name>.<sequence>', and then uploads the manifest object that
+        ties them together as 'obj_name'.
+        """
+        segment_size = min(segment_size or self.max_file_size,
+                self.max_file_size)
+        start = fileobj.tell()
+        num_segments = int(math.ceil(float(fsize - start) / segment_size))
+        digits = int(math.log10(num_segments)) + 1
+        # All the segments read from the same file object.
+        lock = threading.Lock()
+        segments = []
+        for segment in xrange(num_segments):
+            sequence = str(segment + 1).zfill(digits)
+            seg_name = "%s.%s" % (obj_name, sequence)
+            offset = start + (segment * segment_size)
+            seg_file = _FileSegment(fileobj, offset,
+                    min(segment_size, fsize - offset), lock)
+            segments.append((seg_name, seg_file))
+
+        def upload_segment(clt, segment):
+            seg_name, seg_file = segment
+            seg_etag = clt.connection.put_object(cont.name, seg_name,
+                    contents=seg_file, content_length=len(seg_file),
+                    content_type=content_type)
+            # The checksum of what was actually sent has been calculated by
+            # the time the upload finishes; make sure it matches what was
+            # stored.
+            if isinstance(seg_etag, basestring) and seg_file.etag and (
+                    seg_etag.strip('"') != seg_file.etag):
+                raise exc.UploadFailed("Upload of segment '%s' to container "
+                        "'%s' failed." % (seg_name, cont.name))
+
+        errors = self._run_in_parallel(upload_segment, segments, concurrency)
+        if errors:
+            raise errors[0][1]
+        # Upload the manifest last, so that the object never appears with
+        # some of its segments missing.
+        manifest = "%s/%s." % (cont.name, obj_name)
+        if isinstance(manifest, unicode):
+            manifest = manifest.encode(pyrax.encoding)
+        hdr = {"X-Object-Manifest": urllib.quote(manifest)}
+        return self.connection.put_object(cont.name, obj_name,
+                contents=None, headers=hdr)
+
+
+    def _run_in_parallel(self, fnc, items, concurrency):
+        """
+        Calls fnc(client, item) for each of the items, using up to
+        'concurrency' threads. Each thread gets its own client from
+        _get_worker_client(); with a concurrency of 1 the calls are made in
+        the current thread using this client. Returns a list of 2-tuples of
+        (item, exception) for any of the calls that raised an exception. If a
+        thread can't get its client, the error is included with an item of
+        None; the other threads carry on with the remaining items.
+
+        'items' may be any iterable, including a generator; it is consumed
+        as the threads become free, so it never has to be built up front.
+        An exception raised by the iterable itself stops the work and is
+        re-raised.
+        """
+        errors = []
+        if concurrency <= 1:
+            for item in items:
+                try:
+                    fnc(self, item)
+                except Exception as e:
+                    errors.append((item, e))
+            return errors
+        if hasattr(items, "__len__"):
+            concurrency = min(concurrency, len(items))
+        item_iter = iter(items)
+        lock = threading.Lock()
+        # An error raised while getting the next item.
+        iter_errors = []
+
+        def worker():
+            try:
+                clt = self._get_worker_client()
+            except Exception as e:
+                errors.append((None, e))
+                return
+            while True:
+                with lock:
+                    if iter_errors:
+                        return
+                    try:
+                        item = next(item_iter)
+                    except StopIteration:
+                        return
+                    except Exception as e:
+                        iter_errors.append(e)
+                        return
+                try:
+                    fnc(clt, item)
+                except Exception as e:
+                    errors.append((item, e))
+
+        threads = [threading.Thread(target=worker)
+                for num in xrange(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if iter_errors:
+            raise iter_errors[0]
+        return errors
+
+
+    def upload_folder(self, folder_path, container=None, ignore=None,
+            concurrency=1):
         """
         Convenience method for uploading an entire folder, including any
         sub-folders, to Cloud Files.
@@ -598,6 +968,17 @@ class CFClient(object):
         cancel_folder_upload(uuid), passing the uuid returned by the initial call.
         It will then be up to you to either keep or delete the partially-uploaded
         content.
+
+        By default the files are uploaded one at a time. When uploading many
+        files over a fast network, the time is dominated by the latency of each
+        request rather than by bandwidth; in that case, pass a value greater
+        than 1 for 'concurrency', and that many files will be uploaded in
+        parallel, each worker thread using its own connection.
+
+        Files that fail to upload are not counted by get_uploaded(), so the
+        total may never be reached; call is_folder_upload_done(uuid) to find
+        out when the upload has stopped, and get_upload_errors(uuid) to see
+        which files failed and why.
         """
         if not os.path.isdir(folder_path):
             raise exc.FolderNotFound("No such folder: '%s'" % folder_path)
@@ -608,17 +989,19 @@ class CFClient(object):
         self.folder_upload_status[upload_key] = {"continue": True,
                 "total_bytes": total_bytes,
                 "uploaded": 0,
+                "errors": [],
+                "done": False,
                 }
         self._upload_folder_in_background(folder_path, container, ignore,
-                upload_key)
+                upload_key, concurrency=concurrency)
         return (upload_key, total_bytes)
 
 
     def _upload_folder_in_background(self, folder_path, container, ignore,
-            upload_key):
+            upload_key, concurrency=1):
         """Runs the folder upload in the background."""
         uploader = FolderUploader(folder_path, container, ignore, upload_key,
-                self)
+                self, concurrency=concurrency)
         uploader.start()
 
 
@@ -647,51 +1030,106 @@ class CFClient(object):
         uploaded. The patterns should be standard *nix-style shell patterns; e.g.,
         '*pyc' will ignore all files ending in 'pyc', such as 'program.pyc' and
         'abcpyc'.
+
+        The container is listed once at the start of the sync, and every local
+        file is compared against that listing, so the number of API calls made
+        is proportional to the number of changed files rather than the total
+        number of files. The list of actions that were carried out is returned;
+        see _sync_folder_to_container() for their format.
         """
         cont = self.get_container(container)
-        self._local_files = []
-        self._sync_folder_to_container(folder_path, cont, prefix="", delete=delete,
-                include_hidden=include_hidden, ignore=ignore,
-                ignore_timestamps=ignore_timestamps)
+        remote_objects = self._get_object_index(cont)
+        actions = self._sync_folder_to_container(folder_path, cont,
+                remote_objects, delete=delete, include_hidden=include_hidden,
+                ignore=ignore, ignore_timestamps=ignore_timestamps)
+        for action, pth, obj_name, etag in actions:
+            if action == "upload":
+                cont.upload_file(pth, obj_name=obj_name, etag=etag,
+                        return_none=True)
+            elif action == "delete":
+                self.delete_object(cont, obj_name)
+        return actions
 
 
-    def _sync_folder_to_container(self, folder_path, cont, prefix, delete,
-            include_hidden, ignore, ignore_timestamps):
+    @handle_swiftclient_exception
+    def _get_object_index(self, container, prefix=None):
         """
-        This is the internal method that is called recursively to handle
-        nested folder structures.
+        Returns a dict that maps the name of every object in the container
+        whose name starts with 'prefix' to a 3-tuple of (etag, last_modified,
+        bytes). The listing is retrieved one page at a time, and only those
+        three values are kept for each object, so the raw listing for the
+        entire container is never held in memory at once.
+        """
+        index = {}
+        for objs in self._iter_listing_pages(container, prefix=prefix):
+            for obj in objs:
+                name = obj.get("name")
+                if name is None:
+                    continue
+                if isinstance(name, unicode):
+                    name = name.encode(pyrax.encoding)
+                index[name] = (obj.get("hash"), obj.get("last_modified"),
+                        obj.get("bytes"))
+        return index
+
+
+    def _iter_listing_pages(self, container, prefix=None, limit=None):
+        """
+        Generator that yields the raw listing of the container one page at a
+        time, following the marker until the listing is exhausted.
+        """
+        cname = self._resolve_name(container)
+        marker = None
+        while True:
+            hdrs, objs = self.connection.get_container(cname, marker=marker,
+                    prefix=prefix, limit=limit)
+            if not objs:
+                return
+            yield objs
+            marker = objs[-1].get("name") or objs[-1].get("subdir")
+
+
+    def _sync_folder_to_container(self, folder_path, cont, remote_objects,
+            delete, include_hidden, ignore, ignore_timestamps):
+        """
+        Walks the local folder and compares each file against the index of
+        remote objects created by _get_object_index(). No API calls are made;
+        instead a list of 4-tuples of (action, local_path, obj_name, etag) is
+        returned, where 'action' is one of 'upload', 'skip' or 'delete'. For
+        'delete' actions both 'local_path' and 'etag' are None.
+
+        A local file is only checksummed when a remote object of the same
+        size exists; otherwise it has clearly changed, and its 'etag' is None.
         """
-        fnames = os.listdir(folder_path)
         ignore = utils.coerce_string_to_list(ignore)
         if not include_hidden:
-            ignore.append(".*")
-        for fname in fnames:
-            if utils.match_pattern(fname, ignore):
-                continue
-            pth = os.path.join(folder_path, fname)
-            if os.path.isdir(pth):
-                subprefix = fname
-                if prefix:
-                    subprefix = "%s/%s" % (prefix, subprefix)
-                self._sync_folder_to_container(pth, cont, prefix=subprefix,
-                        delete=delete, include_hidden=include_hidden,
-                        ignore=ignore, ignore_timestamps=ignore_timestamps)
-                continue
-            self._local_files.append(os.path.join(prefix, fname))
-            local_etag = utils.get_checksum(pth)
-            fullname = fname
-            if prefix:
-                fullname = "%s/%s" % (prefix, fname)
-            try:
-                obj = cont.get_object(fullname)
-                obj_etag = obj.etag
-            except exc.NoSuchObject:
-                obj = None
-                obj_etag = None
-            if local_etag != obj_etag:
+            ignore = ignore + [".*"]
+        actions = []
+        local_names = set()
+        for dirname, dirnames, fnames in os.walk(folder_path):
+            # Prune ignored folders so that os.walk() doesn't descend into them.
+            dirnames[:] = [nm for nm in dirnames
+                    if not utils.match_pattern(nm, ignore)]
+            relpath = os.path.relpath(dirname, folder_path)
+            prefix = "" if relpath == os.curdir else relpath.replace(os.sep, "/")
+            for fname in sorted(fnames):
+                if utils.match_pattern(fname, ignore):
+                    continue
+                pth = os.path.join(dirname, fname)
+                fullname = "%s/%s" % (prefix, fname) if prefix else fname
+                local_names.add(fullname)
+                local_etag = None
+                obj_etag, obj_last_modified, obj_bytes = remote_objects.get(
+                        fullname, (None, None, None))
+                if obj_etag is not None and (obj_bytes is None or
+                        obj_bytes == os.stat(pth).st_size):
+                    local_etag = utils.get_checksum(pth)
+                    if local_etag == obj_etag:
+                        actions.append(("skip", pth, fullname, local_etag))
+                        continue
                 if not ignore_timestamps:
-                    if obj:
-                        obj_time_str = obj.last_modified[:19]
+                    if obj_last_modified:
+                        obj_time_str = obj_last_modified[:19]
                     else:
                         obj_time_str = EARLY_DATE_STR
                     local_mod = datetime.datetime.utcfromtimestamp(
@@ -699,24 +1137,14 @@ class CFClient(object):
                     local_mod_str = local_mod.isoformat()
                     if obj_time_str >= local_mod_str:
                         # Remote object is newer
+                        actions.append(("skip", pth, fullname, local_etag))
                         continue
-                cont.upload_file(pth, obj_name=fullname, etag=local_etag,
-                        return_none=True)
-        if delete and not prefix:
-            self._delete_objects_not_in_list(cont)
-
-
-    def _delete_objects_not_in_list(self, cont):
-        """
-        Finds all the objects in the specified container that are not present in the
-        self._local_files list, and deletes them.
-        """
-        for obj in cont.get_objects(full_listing=True):
-            objname = obj.name
-            if isinstance(objname, unicode):
-                objname = objname.encode(pyrax.encoding)
-            if objname not in self._local_files:
-                obj.delete()
+                actions.append(("upload", pth, fullname, local_etag))
+        if delete:
+            for obj_name in sorted(remote_objects):
+                if obj_name not in local_names:
+                    actions.append(("delete", None, obj_name, None))
+        return actions
 
 
     def _valid_upload_key(fnc):
@@ -732,7 +1160,8 @@ class CFClient(object):
 
     @_valid_upload_key
     def _update_progress(self, upload_key, size):
-        self.folder_upload_status[upload_key]["uploaded"] += size
+        with self._folder_upload_lock:
+            self.folder_upload_status[upload_key]["uploaded"] += size
 
 
     @_valid_upload_key
@@ -741,6 +1170,42 @@ class CFClient(object):
         return self.folder_upload_status[upload_key]["uploaded"]
 
 
+    @_valid_upload_key
+    def _add_upload_error(self, upload_key, full_path, obj_name, err):
+        with self._folder_upload_lock:
+            status = self.folder_upload_status[upload_key]
+            status.setdefault("errors", []).append((full_path, obj_name, err))
+
+
+    @_valid_upload_key
+    def get_upload_errors(self, upload_key):
+        """
+        Returns a list of (path, obj_name, exception) 3-tuples for the files
+        that failed to upload in the specified process. If the failure was
+        not specific to a single file, such as being unable to connect,
+        'path' and 'obj_name' are None.
+        """
+        with self._folder_upload_lock:
+            return list(self.folder_upload_status[upload_key].get("errors",
+                    []))
+
+
+    @_valid_upload_key
+    def _finish_folder_upload(self, upload_key):
+        self.folder_upload_status[upload_key]["done"] = True
+
+
+    @_valid_upload_key
+    def is_folder_upload_done(self, upload_key):
+        """
+        Returns True once the specified process has stopped, whether it
+        uploaded everything, was canceled, or some files failed. Since failed
+        files are never counted by get_uploaded(), check this rather than
+        waiting for that to reach the total.
+        """
+        return self.folder_upload_status[upload_key].get("done", False)
+
+
     @_valid_upload_key
     def cancel_folder_upload(self, upload_key):
         """
@@ -781,6 +1246,118 @@ class CFClient(object):
             return data
 
 
+    @handle_swiftclient_exception
+    def download_object(self, container, obj_name, dest_path, concurrency=1,
+            part_size=None, resume=False):
+        """
+        Downloads the object to the file at 'dest_path', replacing that file
+        if it already exists.
+
+        The object is fetched as a series of ranged GET requests of
+        'part_size' bytes each (self.download_part_size by default), using up
+        to 'concurrency' connections at once. Each part is written directly
+        to its position in the destination file, which is created at its full
+        size before the download begins.
+
+        Unless the object is a manifest for a segmented object, the MD5 of
+        the downloaded file is compared with the object's etag once all the
+        parts have been written. If any part fails, or the checksum doesn't
+        match, the file is removed and a DownloadFailed exception is raised.
+
+        If 'resume' is True, each completed part is recorded in a journal
+        file next to the destination file ('dest_path' plus
+        self.download_journal_suffix). When a download fails part way, the
+        file and its journal are kept, and calling this method again with
+        'resume=True' only requests the parts that are missing, as long as
+        the object has not changed in the meantime. The journal is removed
+        once the download completes.
+        """
+        cname = self._resolve_name(container)
+        oname = self._resolve_name(obj_name)
+        try:
+            hdrs = self.connection.head_object(cname, oname)
+        except _swift_client.ClientException as e:
+            if e.http_status == 404:
+                raise exc.NoSuchObject("Object '%s' not found in container "
+                        "'%s'" % (oname, cname))
+            raise
+        total_bytes = int(hdrs.get("content-length", 0))
+        etag = hdrs.get("etag", "").strip('"')
+        is_manifest = ("x-object-manifest" in hdrs) or (
+                hdrs.get("x-static-large-object", "").lower() == "true")
+        part_size = part_size or self.download_part_size
+        parts = [(offset, min(part_size, total_bytes - offset))
+                for offset in xrange(0, total_bytes, part_size)]
+        # The ranged requests must all see the same version of a regular
+        # object; a manifest's etag isn't stable enough to be used this way.
+        range_hdrs = {} if is_manifest or not etag else {"If-Match": etag}
+        journal = None
+        if resume:
+            journal = _DownloadJournal(dest_path + self.download_journal_suffix,
+                    {"etag": etag, "bytes": total_bytes, "part_size": part_size,
+                    "last_modified": hdrs.get("last-modified")})
+            done = journal.load()
+            if done and os.path.isfile(dest_path) and (
+                    os.path.getsize(dest_path) == total_bytes):
+                parts = [part for part in parts if part[0] not in done]
+            else:
+                journal.start()
+                done = None
+        else:
+            done = None
+        if done is None:
+            with open(dest_path, "wb") as dest:
+                dest.truncate(total_bytes)
+
+        def download_part(clt, part):
+            offset, length = part
+            hdr = {"Range": "bytes=%s-%s" % (offset, offset + length - 1)}
+            hdr.update(range_hdrs)
+            resp_hdrs, body = clt.connection.get_object(cname, oname,
+                    resp_chunk_size=self.download_chunk_size, headers=hdr)
+            received = 0
+            with open(dest_path, "r+b") as dest:
+                dest.seek(offset)
+                for chunk in body:
+                    received += len(chunk)
+                    if received > length:
+                        break
+                    dest.write(chunk)
+                if journal and received == length:
+                    # Make sure the data is on disk before it is recorded
+                    # as complete.
+                    dest.flush()
+                    os.fsync(dest.fileno())
+            if received != length:
+                raise exc.DownloadFailed("Expected %s bytes at offset %s of "
+                        "'%s', but received %s." % (length, offset, oname,
+                        received))
+            if journal:
+                journal.record(offset)
+
+        errors = self._run_in_parallel(download_part, parts, concurrency)
+        bad_checksum = False
+        if not errors and etag and not is_manifest:
+            if utils.get_checksum(dest_path) != etag:
+                bad_checksum = True
+                errors = [(None, exc.DownloadFailed("The checksum of the "
+                        "downloaded file does not match the etag of '%s'." %
+                        oname))]
+        if journal and not errors:
+            journal.remove()
+        if errors:
+            if journal is None or bad_checksum:
+                # Nothing worth keeping.
+                os.remove(dest_path)
+                if journal:
+                    journal.remove()
+            err = errors[0][1]
+            if isinstance(err, exc.DownloadFailed):
+                raise err
+            raise exc.DownloadFailed("Download of '%s' from container '%s' "
+                    "failed: %s" % (oname, cname, err))
+
+
     @handle_swiftclient_exception
     def get_all_containers(self, limit=None, marker=None, **parms):
         hdrs, conts = self.connection.get_container("")
@@ -823,6 +1400,22 @@ class CFClient(object):
                 if "name" in obj]
 
 
+    def iter_objects(self, container, prefix=None, page_size=None):
+        """
+        Generator that yields a StorageObject for each of the objects in the
+        container whose name starts with 'prefix'. The listing is requested
+        one page of 'page_size' names at a time (the server's limit of 10,000
+        by default) as the objects are consumed, so unlike
+        get_container_objects() the whole listing is never held in memory.
+        """
+        cont = self.get_container(container)
+        for objs in self._iter_listing_pages(cont, prefix=prefix,
+                limit=page_size):
+            for obj in objs:
+                if "name" in obj:
+                    yield StorageObject(self, container=cont, attdict=obj)
+
+
     @handle_swiftclient_exception
     def get_container_object_names(self, container, marker=None, limit=None,
             prefix=None, delimiter=None, full_listing=False):
@@ -1013,6 +1606,116 @@ class CFClient(object):
 
 
 
+class _FileSegment(object):
+    """
+    A read-only file-like view of 'length' bytes of 'fileobj', beginning at
+    'offset'. Several segments can share the same file object, so each
+    seek/read pair is done while holding 'lock'. The MD5 checksum of the
+    segment is calculated as it is read.
+    """
+    def __init__(self, fileobj, offset, length, lock):
+        self.fileobj = fileobj
+        self.offset = offset
+        self.length = length
+        self.lock = lock
+        self._pos = 0
+        self._md5 = hashlib.md5()
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        remaining = self.length - self._pos
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        if size <= 0:
+            return ""
+        with self.lock:
+            self.fileobj.seek(self.offset + self._pos)
+            data = self.fileobj.read(size)
+        self._pos += len(data)
+        if self._md5 is not None:
+            self._md5.update(data)
+        return data
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=0):
+        if whence == 1:
+            pos += self._pos
+        elif whence == 2:
+            pos += self.length
+        self._pos = max(0, min(pos, self.length))
+        # The running checksum is only valid when reading from the start;
+        # swiftclient seeks back to 0 before retrying a failed upload.
+        self._md5 = hashlib.md5() if self._pos == 0 else None
+
+    @property
+    def etag(self):
+        """
+        Returns the MD5 checksum of the segment if it has been read in its
+        entirety from the start; otherwise returns None.
+        """
+        if self._md5 is None or self._pos != self.length:
+            return None
+        return self._md5.hexdigest()
+
+
+
+class _DownloadJournal(object):
+    """
+    Records which parts of a resumable download have been written. The
+    first line of the file describes the object being downloaded; each
+    following line holds the offset of a completed part.
+    """
+    def __init__(self, path, info):
+        self.path = path
+        self.info = info
+        self._lock = threading.Lock()
+
+
+    def load(self):
+        """
+        Returns the set of offsets of the parts that have already been
+        downloaded, or None if there is no journal for this version of the
+        object.
+        """
+        try:
+            with open(self.path, "r") as jfile:
+                lines = jfile.read().splitlines()
+        except IOError:
+            return None
+        try:
+            if not lines or json.loads(lines[0]) != self.info:
+                return None
+            # The last line may have been cut short by a crash.
+            return set(int(line) for line in lines[1:] if line.isdigit())
+        except ValueError:
+            return None
+
+
+    def start(self):
+        """Starts a new, empty journal."""
+        with open(self.path, "w") as jfile:
+            jfile.write("%s\n" % json.dumps(self.info))
+
+
+    def record(self, offset):
+        """Records the part at 'offset' as complete."""
+        with self._lock:
+            with open(self.path, "a") as jfile:
+                jfile.write("%s\n" % offset)
+                jfile.flush()
+                os.fsync(jfile.fileno())
+
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+
 class Connection(_swift_client.Connection):
     """This class wraps the swiftclient connection, adding support for CDN"""
     def __init__(self, *args, **kwargs):
@@ -1100,7 +1803,8 @@ class Connection(_swift_client.Connection):
 
 class FolderUploader(threading.Thread):
     """Threading class to allow for uploading multiple files in the background."""
-    def __init__(self, root_folder, container, ignore, upload_key, client):
+    def __init__(self, root_folder, container, ignore, upload_key, client,
+            concurrency=1):
         self.root_folder = root_folder.rstrip("/")
         if container:
             self.container = client.create_container(container)
@@ -1109,6 +1813,13 @@ class FolderUploader(threading.Thread):
         self.ignore = utils.coerce_string_to_list(ignore)
         self.upload_key = upload_key
         self.client = client
+        self.concurrency = max(1, int(concurrency))
+        # When uploading in parallel, this holds the (path, obj_name) pairs
+        # waiting to be uploaded. It is bounded so that walking a huge tree
+        # doesn't get too far ahead of the workers.
+        self.queue = None
+        # 3-tuples of (path, obj_name, exception) for any failed uploads.
+        self.errors = []
         threading.Thread.__init__(self)
 
     def folder_name_from_path(self, pth):
@@ -1128,13 +1839,94 @@ class FolderUploader(threading.Thread):
                 # Skip folders; os.walk will include them in the next pass.
                 continue
             obj_name = os.path.relpath(full_path, self.base_path)
-            obj_size = os.stat(full_path).st_size
-            self.client.upload_file(self.container, full_path, obj_name=obj_name,
-                    return_none=True)
+            if self.queue is not None:
+                # Parallel upload; hand it off to the workers.
+                self.queue.put((full_path, obj_name))
+                continue
+            try:
+                obj_size = os.stat(full_path).st_size
+                self.client.upload_file(self.container, full_path,
+                        obj_name=obj_name, return_none=True)
+            except Exception as e:
+                # Record the failure and carry on with the other files, as
+                # the parallel workers do.
+                self._record_error(full_path, obj_name, e)
+                continue
             self.client._update_progress(self.upload_key, obj_size)
 
     def run(self):
         """Starts the uploading thread."""
+        try:
+            self._run()
+        finally:
+            self.client._finish_folder_upload(self.upload_key)
+
+    def _run(self):
         root_path, folder_name = os.path.split(self.root_folder)
         self.base_path = os.path.join(root_path, folder_name)
-        os.path.walk(self.root_folder, self.upload_files_in_folder, None)
+        if self.concurrency == 1:
+            try:
+                os.path.walk(self.root_folder, self.upload_files_in_folder,
+                        None)
+            except Exception as e:
+                self._record_error(None, None, e)
+            return
+        self.queue = Queue.Queue(maxsize=self.concurrency * 2)
+        workers = [_FolderUploadWorker(self) for num in xrange(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        try:
+            os.path.walk(self.root_folder, self.upload_files_in_folder, None)
+        except Exception as e:
+            self._record_error(None, None, e)
+        finally:
+            # One sentinel per worker tells them that there is no more work.
+            for worker in workers:
+                self.queue.put(None)
+            for worker in workers:
+                worker.join()
+
+    def _record_error(self, full_path, obj_name, err):
+        """
+        Keeps track of a failed upload, both here and in the client's status
+        for the upload, where get_upload_errors() can find it.
+        """
+        self.errors.append((full_path, obj_name, err))
+        self.client._add_upload_error(self.upload_key, full_path, obj_name,
+                err)
+
+
+
+class _FolderUploadWorker(threading.Thread):
+    """
+    Uploads the files placed in the queue of a FolderUploader, using its own
+    connection to Cloud Files.
+    """
+    def __init__(self, uploader):
+        self.uploader = uploader
+        threading.Thread.__init__(self)
+
+    def run(self):
+        uploader = self.uploader
+        try:
+            client = uploader.client._get_worker_client()
+        except Exception as e:
+            # Without a connection nothing can be uploaded, but the queue
+            # still has to be drained so that the walk is never blocked.
+            uploader._record_error(None, None, e)
+            client = None
+        while True:
+            item = uploader.queue.get()
+            if item is None:
+                break
+            full_path, obj_name = item
+            try:
+                if client is None or client._should_abort_folder_upload(
+                        uploader.upload_key):
+                    continue
+                obj_size = os.stat(full_path).st_size
+                client.upload_file(uploader.container, full_path,
+                        obj_name=obj_name, return_none=True)
+                client._update_progress(uploader.upload_key, obj_size)
+            except Exception as e:
+                uploader._record_error(full_path, obj_name, e)
@@ -18,7 +18,13 @@
 #    under the License.
 
 
+import datetime
+import email.utils
+
+from swiftclient import client as _swift_client
+
 import pyrax
+from pyrax.cf_wrapper.storage_object import StorageObject
 from pyrax import exceptions as exc
 
 # Used to indicate values that are lazy-loaded
@@ -29,6 +35,21 @@ class Fault(object):
 FAULT = Fault()
 
 
+def _listing_timestamp(val):
+    """
+    The HEAD response returns the 'Last-Modified' value as an RFC 1123 date,
+    while container listings use ISO 8601. This converts the former to the
+    latter so that StorageObjects have the same format no matter how they
+    were created.
+    """
+    if not val:
+        return None
+    parsed = email.utils.parsedate(val)
+    if parsed is None:
+        return val
+    return datetime.datetime(*parsed[:6]).isoformat()
+
+
 class Container(object):
     """Represents a CloudFiles container."""
     def __init__(self, client, name, object_count=None, total_bytes=None):
@@ -98,6 +119,16 @@ class Container(object):
         return objs
 
 
+    def iter_objects(self, prefix=None, page_size=None):
+        """
+        Generator that yields the StorageObjects in this container, fetching
+        the listing one page at a time. See the client's iter_objects()
+        method for details.
+        """
+        return self.client.iter_objects(self, prefix=prefix,
+                page_size=page_size)
+
+
     def get_object(self, name):
         """
         Return the StorageObject in this container with the
@@ -107,16 +138,42 @@ class Container(object):
             name = name.decode(pyrax.encoding)
         ret = self._object_cache.get(name)
         if not ret:
-            objs = [obj for obj in self.client.get_container_objects(self.name)
-                    if obj.name == name]
-            try:
-                ret = objs[0]
-            except IndexError:
-                raise exc.NoSuchObject("No object with the name '%s' exists" % name)
+            ret = self._fetch_object(name)
             self._object_cache[name] = ret
         return ret
 
 
+    def _fetch_object(self, name):
+        """
+        Creates the StorageObject for the specified name from a single HEAD
+        request, so the cost does not depend on the size of the container. If
+        the HEAD request fails for any reason other than the object not
+        existing, the container listing is queried using the name as the
+        prefix instead.
+        """
+        try:
+            hdrs = self.client.connection.head_object(self.name, name)
+        except _swift_client.ClientException as e:
+            if e.http_status == 404:
+                raise exc.NoSuchObject("No object with the name '%s' exists"
+                        % name)
+            hdrs = None
+        if hdrs is not None:
+            return StorageObject(self.client, self, name=name,
+                    total_bytes=int(hdrs.get("content-length", 0)),
+                    content_type=hdrs.get("content-type"),
+                    last_modified=_listing_timestamp(hdrs.get("last-modified")),
+                    etag=hdrs.get("etag", "").strip('"'))
+        # The exact name sorts before any other name that shares its prefix,
+        # so it has to be the first item returned if it exists.
+        objs = [obj for obj in self.client.get_container_objects(self.name,
+                prefix=name, limit=1) if obj.name == name]
+        try:
+            return objs[0]
+        except IndexError:
+            raise exc.NoSuchObject("No object with the name '%s' exists" % name)
+
+
     def get_object_names(self, marker=None, limit=None, prefix=None, delimiter=None,
             full_listing=False):
         """
@@ -128,25 +185,29 @@ class Container(object):
         return [obj.name for obj in objs]
 
 
-    def store_object(self, obj_name, data, content_type=None, etag=None):
+    def store_object(self, obj_name, data, content_type=None, etag=None,
+            return_none=False):
         """
         Creates a new object in this container, and populates it with
-        the given data.
+        the given data. A StorageObject reference to the uploaded file
+        will be returned, unless 'return_none' is set to True.
         """
         return self.client.store_object(self, obj_name, data,
-                content_type=content_type, etag=etag)
+                content_type=content_type, etag=etag, return_none=return_none)
 
 
     def upload_file(self, file_or_path, obj_name=None, content_type=None, etag=None,
-            return_none=False):
+            return_none=False, segment_size=None, concurrency=1):
         """
         Uploads the specified file to this container. If no name is supplied, the
         file's name will be used. Either a file path or an open file-like object
         may be supplied. A StorageObject reference to the uploaded file will be
-        returned, unless 'return_none' is set to True.
+        returned, unless 'return_none' is set to True. See the client's
+        upload_file() for the meaning of 'segment_size' and 'concurrency'.
         """
         return self.client.upload_file(self, file_or_path, obj_name=obj_name,
-                content_type=content_type, etag=etag, return_none=return_none)
+                content_type=content_type, etag=etag, return_none=return_none,
+                segment_size=segment_size, concurrency=concurrency)
 
 
     def delete_object(self, obj):
@@ -155,10 +216,14 @@ class Container(object):
         return self.client.delete_object(self, obj)
 
 
-    def delete_all_objects(self):
-        """Deletes all objects from this container."""
-        for obj_name in self.client.get_container_object_names(self):
-            self.client.delete_object(self, obj_name)
+    def delete_all_objects(self, concurrency=None, use_bulk=None):
+        """
+        Deletes all objects from this container, and returns a dict with the
+        number of objects that were 'deleted' and the number that 'failed'.
+        See the client's delete_all_objects() method for details.
+        """
+        return self.client.delete_all_objects(self, concurrency=concurrency,
+                use_bulk=use_bulk)
 
 
     def remove_from_cache(self, obj):
@@ -167,13 +232,14 @@ class Container(object):
         self._object_cache.pop(nm, None)
 
 
-    def delete(self, del_objects=False):
+    def delete(self, del_objects=False, concurrency=None):
         """
         Deletes this Container. If the container contains objects, the
         command will fail unless 'del_objects' is passed as True. In that
         case, each object will be deleted first, and then the container.
         """
-        return self.client.delete_container(self.name, del_objects=del_objects)
+        return self.client.delete_container(self.name, del_objects=del_objects,
+                concurrency=concurrency)
 
 
     def fetch_object(self, obj_name, include_meta=False, chunk_size=None):
@@ -194,6 +260,17 @@ class Container(object):
                 chunk_size=chunk_size)
 
 
+    def download_object(self, obj_name, dest_path, concurrency=1,
+            part_size=None, resume=False):
+        """
+        Downloads the object to the file at 'dest_path', using up to
+        'concurrency' ranged requests at once. See the client's
+        download_object() method for details.
+        """
+        return self.client.download_object(self, obj_name, dest_path,
+                concurrency=concurrency, part_size=part_size, resume=resume)
+
+
     def get_metadata(self):
         return self.client.get_container_metadata(self)
 
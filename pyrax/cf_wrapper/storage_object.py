@@ -76,6 +76,19 @@ class StorageObject(object):
                 chunk_size=chunk_size)
 
 
+    def download(self, dest_path, concurrency=1, part_size=None,
+            resume=False):
+        """
+        Downloads the object to the file at 'dest_path'. If 'resume' is
+        True, an interrupted download can be continued by calling this
+        again with the same arguments. See the client's download_object()
+        method for details.
+        """
+        self.client.download_object(container=self.container.name,
+                obj_name=self.name, dest_path=dest_path,
+                concurrency=concurrency, part_size=part_size, resume=resume)
+
+
     def delete(self):
         """Deletes the object from storage."""
         self.client.delete_object(container=self.container.name, name=self.name)
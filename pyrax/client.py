@@ -22,6 +22,7 @@ OpenStack Client interface. Handles the REST calls and responses.
 
 import logging
 import os
+import threading
 import time
 import urlparse
 
@@ -61,12 +62,121 @@ def get_auth_system_url(auth_system):
     raise exc.AuthSystemNotFound(auth_system)
 
 
+class HttpPool(object):
+    """
+    A thread-safe pool of httplib2.Http instances, kept separately for each
+    host. Each Http instance holds its own keep-alive connection, so threads
+    that share a client each check out an instance for the length of a
+    request instead of taking turns with a single socket. Idle instances
+    are reused most recently used first, and those that have been idle for
+    longer than 'idle_timeout' seconds are closed.
+    """
+    def __init__(self, factory, max_size=10, idle_timeout=60):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        # Maps each host to a list of (http, last_used) tuples.
+        self._idle = {}
+        # Maps each host to the number of instances, idle or checked out.
+        self._counts = {}
+        self._cond = threading.Condition()
+
+
+    def checkout(self, host):
+        """
+        Returns an Http instance for the host, creating one if none are idle.
+        If 'max_size' instances for the host are already checked out, waits
+        until one is returned.
+        """
+        with self._cond:
+            while True:
+                self._evict_idle()
+                idle = self._idle.get(host)
+                if idle:
+                    return idle.pop()[0]
+                if self._counts.get(host, 0) < self.max_size:
+                    self._counts[host] = self._counts.get(host, 0) + 1
+                    break
+                self._cond.wait()
+        try:
+            return self.factory()
+        except Exception:
+            self._release(host)
+            raise
+
+
+    def checkin(self, host, http, discard=False):
+        """
+        Returns a checked out Http instance to the pool. Pass 'discard=True'
+        if the instance's connection may be in a bad state, and it will be
+        closed instead.
+        """
+        if discard:
+            self._close(http)
+            self._release(host)
+            return
+        with self._cond:
+            self._idle.setdefault(host, []).append((http, time.time()))
+            self._cond.notify()
+
+
+    def clear(self):
+        """Closes all of the idle connections."""
+        with self._cond:
+            for host, idle in self._idle.items():
+                for http, last_used in idle:
+                    self._close(http)
+                self._counts[host] -= len(idle)
+            self._idle.clear()
+            self._cond.notify_all()
+
+
+    def _release(self, host):
+        with self._cond:
+            self._counts[host] -= 1
+            self._cond.notify()
+
+
+    def _evict_idle(self):
+        """Closes the instances that have been idle for too long."""
+        cutoff = time.time() - self.idle_timeout
+        for host, idle in self._idle.items():
+            # The list is ordered by when each instance was returned.
+            stale = 0
+            while stale < len(idle) and idle[stale][1] < cutoff:
+                self._close(idle[stale][0])
+                stale += 1
+            if stale:
+                del idle[:stale]
+                self._counts[host] -= stale
+
+
+    @staticmethod
+    def _close(http):
+        for conn in http.connections.values():
+            try:
+                conn.close()
+            except Exception:
+                pass
+        http.connections.clear()
+
+
+
 class BaseClient(httplib2.Http):
     """
     The base class for all pyrax clients.
     """
     # This will get set by pyrax when the service is started.
     user_agent = None
+    # The maximum number of simultaneous connections to any one host, and
+    # the number of seconds an unused connection is kept open.
+    http_pool_size = 10
+    http_pool_idle_timeout = 60
+    # Settings copied from the client to each pooled Http instance.
+    _http_settings = ("follow_redirects", "follow_all_redirects",
+            "force_exception_to_status_code", "optimistic_concurrency_methods",
+            "ignore_etag", "disable_ssl_certificate_validation", "ca_certs",
+            "proxy_info")
 
     def __init__(self, user, password, tenant_id=None, auth_url=None,
             region_name=None, endpoint_type="publicURL", management_url=None,
@@ -108,6 +218,9 @@ class BaseClient(httplib2.Http):
         ch = logging.StreamHandler()
         self._logger.setLevel(logging.DEBUG)
         self._logger.addHandler(ch)
+        self.http_pool = HttpPool(self._create_http,
+                max_size=self.http_pool_size,
+                idle_timeout=self.http_pool_idle_timeout)
         self._manager = None
         # Hook method for subclasses to create their manager instance
         # without having to override __init__().
@@ -152,8 +265,8 @@ class BaseClient(httplib2.Http):
         """
         Finds all items with attributes matching ``**kwargs``.
 
-        This isn't very efficient: it loads the entire list then filters on
-        the Python side.
+        This isn't very efficient: it pages through every item then filters
+        on the Python side.
         """
         return self._manager.findall(**kwargs)
 
@@ -221,7 +334,18 @@ class BaseClient(httplib2.Http):
             kwargs["headers"]["Content-Type"] = "application/json"
             kwargs["body"] = json.dumps(kwargs["body"])
         self.http_log_req(args, kwargs)
-        resp, body = super(BaseClient, self).request(*args, **kwargs)
+        uri = args[0] if args else kwargs.get("uri", "")
+        host = urlparse.urlsplit(uri)[:2]
+        http = self.http_pool.checkout(host)
+        try:
+            for att in self._http_settings:
+                if hasattr(self, att):
+                    setattr(http, att, getattr(self, att))
+            resp, body = http.request(*args, **kwargs)
+        except Exception:
+            self.http_pool.checkin(host, http, discard=True)
+            raise
+        self.http_pool.checkin(host, http)
         self.http_log_resp(resp, body)
 
         if body:
@@ -237,6 +361,13 @@ class BaseClient(httplib2.Http):
 
         return resp, body
 
+    def _create_http(self):
+        """
+        Creates the Http instances used by the connection pool. They are
+        configured from this client's own settings before each request.
+        """
+        return httplib2.Http(timeout=self.timeout)
+
     def _time_request(self, uri, method, **kwargs):
         """Wraps the request call and records the elapsed time."""
         start_time = time.time()
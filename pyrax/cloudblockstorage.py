@@ -17,10 +17,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from functools import partial
 from functools import wraps
+import threading
 import time
 
 import pyrax
+from pyrax.async_client import call_all
 from pyrax.client import BaseClient
 import pyrax.exceptions as exc
 from pyrax.manager import BaseManager
@@ -31,6 +34,13 @@ import pyrax.utils as utils
 MIN_SIZE = 100
 MAX_SIZE = 1024
 RETRY_INTERVAL = 5
+# The attributes that volume and snapshot listings can be filtered on by the
+# API, and the query parameter for each.
+VOLUME_QUERY_FILTERS = {"name": "display_name", "display_name": "display_name",
+        "status": "status"}
+SNAPSHOT_QUERY_FILTERS = {"name": "display_name",
+        "display_name": "display_name", "status": "status",
+        "volume_id": "volume_id"}
 
 
 def _resolve_id(val):
@@ -126,17 +136,10 @@ class CloudBlockStorageVolume(BaseResource):
     """
     def __init__(self, *args, **kwargs):
         super(CloudBlockStorageVolume, self).__init__(*args, **kwargs)
-        try:
-            region = self.manager.api.region_name
-            self._nova_volumes = pyrax.connect_to_cloudservers(region).volumes
-        except AttributeError:
-            # This will happen in unit testing, where the full pyrax
-            # namespace is not exposed. In that situation, there is
-            # no need for the reference anyway
-            pass
         self._snapshot_manager = BaseManager(self.manager.api,
                 resource_class=CloudBlockStorageSnapshot,
-                response_key="snapshot", uri_base="snapshots")
+                response_key="snapshot", uri_base="snapshots",
+                query_filters=SNAPSHOT_QUERY_FILTERS)
 
 
     def attach_to_instance(self, instance, mountpoint):
@@ -234,17 +237,24 @@ class CloudBlockStorageVolume(BaseResource):
 
     def list_snapshots(self):
         """
-        Returns a list of all snapshots of this volume.
+        Returns a list of all snapshots of this volume. The API is asked for
+        only the snapshots of this volume, rather than listing them all.
         """
-        return [snap for snap in self._snapshot_manager.list()
-                if snap.volume_id == self.id]
+        return self._snapshot_manager.findall(volume_id=self.id)
 
 
-    def delete_all_snapshots(self):
+    def delete_all_snapshots(self, snapshots=None):
         """
-        Locates all snapshots of this volume and deletes them.
+        Locates all snapshots of this volume and deletes them. If the
+        snapshots are already known, they can be passed as 'snapshots'.
+
+        The snapshots are deleted one at a time, since the API rejects the
+        deletion of a snapshot while another snapshot of the same volume is
+        being deleted.
         """
-        for snap in self.list_snapshots():
+        if snapshots is None:
+            snapshots = self.list_snapshots()
+        for snap in snapshots:
             snap.delete()
 
 
@@ -266,6 +276,21 @@ class CloudBlockStorageVolume(BaseResource):
     description = property(_get_description, _set_description, None,
             "Convenience for referencing the display_description.")
 
+    # Attaching and detaching are done through the Cloud Servers API. Its
+    # client is shared by all the volumes of the block storage client, and
+    # is only created when it is first needed. It is looked up in __dict__,
+    # since a missing attribute would otherwise trigger a lazy load.
+    def _get_nova_volumes(self):
+        nova_volumes = self.__dict__.get("_nova_volume_manager")
+        if nova_volumes is None:
+            nova_volumes = self.manager.api._get_nova_volumes()
+        return nova_volumes
+
+    def _set_nova_volumes(self, val):
+        self._nova_volume_manager = val
+
+    _nova_volumes = property(_get_nova_volumes, _set_nova_volumes)
+
 
 class CloudBlockStorageClient(BaseClient):
     """
@@ -278,13 +303,30 @@ class CloudBlockStorageClient(BaseClient):
         """
         self._manager = BaseManager(self,
                 resource_class=CloudBlockStorageVolume, response_key="volume",
-                uri_base="volumes")
+                uri_base="volumes", query_filters=VOLUME_QUERY_FILTERS)
         self._types_manager = BaseManager(self,
                 resource_class=CloudBlockStorageVolumeType,
                 response_key="volume_type", uri_base="types")
         self._snaps_manager = BaseManager(self,
                 resource_class=CloudBlockStorageSnapshot,
-                response_key="snapshot", uri_base="snapshots")
+                response_key="snapshot", uri_base="snapshots",
+                query_filters=SNAPSHOT_QUERY_FILTERS)
+        self._nova_volumes = None
+        self._nova_volumes_lock = threading.Lock()
+
+
+    def _get_nova_volumes(self):
+        """
+        Returns the volume manager of a Cloud Servers client for this
+        client's region, which is needed to attach and detach volumes. The
+        Cloud Servers client is created the first time this is called, and
+        then shared by all the volumes.
+        """
+        with self._nova_volumes_lock:
+            if self._nova_volumes is None:
+                cloudservers = pyrax.connect_to_cloudservers(self.region_name)
+                self._nova_volumes = cloudservers.volumes
+        return self._nova_volumes
 
 
     def create(self, name="", size=None, volume_type=None, description=None,
@@ -312,6 +354,17 @@ class CloudBlockStorageClient(BaseClient):
         return self._snaps_manager.list()
 
 
+    def get_snapshot_index(self):
+        """
+        Returns a dict that maps the ID of each volume to a list of its
+        snapshots, built from a single listing of all the snapshots.
+        """
+        index = {}
+        for snap in self._snaps_manager.iter_all():
+            index.setdefault(snap.volume_id, []).append(snap)
+        return index
+
+
     def _create_body(self, name, size=None, volume_type=None, description=None,
              metadata=None, snapshot_id=None, availability_zone=None,
              volume=None, force=False):
@@ -370,6 +423,33 @@ class CloudBlockStorageClient(BaseClient):
         return volume.delete(force=force)
 
 
+    def delete_volumes(self, volumes, force=False, concurrency=None):
+        """
+        Deletes all of the volumes, making up to 'concurrency' requests at a
+        time; by default this is the size of the HTTP connection pool. The
+        volumes may be CloudBlockStorageVolume objects or IDs.
+
+        When 'force' is True, the volumes are detached, and their snapshots
+        deleted, as with delete_volume(). The snapshots are found with a
+        single listing, rather than one for each volume. The snapshots of
+        different volumes are deleted concurrently, but those of each volume
+        are deleted one at a time.
+        """
+        volumes = [vol if isinstance(vol, CloudBlockStorageVolume)
+                else self._manager.get(vol) for vol in volumes]
+        if concurrency is None:
+            concurrency = self.http_pool_size
+        if force:
+            call_all([vol.detach for vol in volumes], max_workers=concurrency)
+            index = self.get_snapshot_index()
+            # One task per volume, each deleting that volume's snapshots.
+            deletes = [partial(vol.delete_all_snapshots,
+                    snapshots=index[vol.id]) for vol in volumes
+                    if vol.id in index]
+            call_all(deletes, max_workers=concurrency)
+        call_all([vol.delete for vol in volumes], max_workers=concurrency)
+
+
     @assure_volume
     def create_snapshot(self, volume, name=None, description=None, force=False):
         """
@@ -18,12 +18,19 @@
 #    under the License.
 
 from functools import wraps
+from pyrax.async_client import call_all
 from pyrax.client import BaseClient
 import pyrax.exceptions as exc
 from pyrax.manager import BaseManager
 from pyrax.resource import BaseResource
 import pyrax.utils as utils
 
+# The most databases or users that are sent in a single request when they
+# are created in a batch.
+MAX_ITEMS_PER_REQUEST = 50
+# The number of items in each page of the API's listings.
+DEFAULT_PAGE_SIZE = 20
+
 
 def assure_instance(fnc):
     @wraps(fnc)
@@ -60,19 +67,17 @@ class CloudDatabaseInstance(BaseResource):
     """
     This class represents a MySQL instance in the cloud.
     """
-    def __init__(self, *args, **kwargs):
-        super(CloudDatabaseInstance, self).__init__(*args, **kwargs)
-        self._database_manager = BaseManager(self.manager.api,
-                resource_class=CloudDatabaseDatabase, response_key="database",
-                uri_base="instances/%s/databases" % self.id)
-        self._user_manager = BaseManager(self.manager.api,
-                resource_class=CloudDatabaseUser, response_key="user",
-                uri_base="instances/%s/users" % self.id)
-        # Remove the lazy load
-        if not self.loaded:
-            self.get()
+    def _add_details(self, info):
+        """
+        Instances are built from the summary in the listing, and their full
+        details are only loaded when an attribute that isn't in the summary
+        is referenced.
+        """
+        super(CloudDatabaseInstance, self)._add_details(info)
+        volume = self.__dict__.get("volume")
+        if isinstance(volume, dict):
             # Make the volume into an accessible object instead of a dict
-            self.volume = CloudDatabaseVolume(self, self.volume)
+            self.volume = CloudDatabaseVolume(self, volume)
 
 
     def list_databases(self):
@@ -91,12 +96,11 @@ class CloudDatabaseInstance(BaseResource):
         returns a CloudDatabaseDatabase object. If no match is found, a
         NoSuchDatabase exception is raised.
         """
-        try:
-            return [db for db in self.list_databases()
-                    if db.name == name][0]
-        except IndexError:
+        db = self._database_manager.find_by_name(name)
+        if db is None:
             raise exc.NoSuchDatabase("No database by the name '%s' exists." %
                     name)
+        return db
 
 
     def get_user(self, name):
@@ -105,12 +109,11 @@ class CloudDatabaseInstance(BaseResource):
         returns a CloudDatabaseUser object. If no match is found, a
         NoSuchDatabaseUser exception is raised.
         """
-        try:
-            return [user for user in self.list_users()
-                    if user.name == name][0]
-        except IndexError:
+        user = self._user_manager.find_by_name(name)
+        if user is None:
             raise exc.NoSuchDatabaseUser("No user by the name '%s' exists." %
                     name)
+        return user
 
 
     def create_database(self, name, character_set=None, collate=None):
@@ -126,11 +129,32 @@ class CloudDatabaseInstance(BaseResource):
         # Note that passing in non-None values is required for the _create_body
         # method to distinguish between this and the request to create and
         # instance.
-        self._database_manager.create(name=name, character_set=character_set,
-                collate=collate, return_none=True)
-        # Since the API doesn't return the info for creating the database
-        # object, we have to do it manually.
-        return self._database_manager.find(name=name)
+        return self._database_manager.create(name=name,
+                character_set=character_set, collate=collate)
+
+
+    def create_databases(self, databases, character_set=None, collate=None,
+            batch_size=None):
+        """
+        Creates several databases, sending up to 'batch_size' of them in each
+        request. Each database may be a name, or a dict with a 'name' and
+        optionally its own 'character_set' and 'collate'; otherwise the ones
+        passed here are used, with the same defaults as create_database().
+
+        Returns a list of CloudDatabaseDatabase objects. If any of them
+        can't be created, a BatchCreationFailed exception is raised.
+        """
+        entries = []
+        for db in databases:
+            if isinstance(db, basestring):
+                db = {"name": db}
+            entries.append({"name": db["name"],
+                    "character_set": db.get("character_set") or
+                        character_set or "utf8",
+                    "collate": db.get("collate") or collate or
+                        "utf8_general_ci"})
+        return self._database_manager.create_many(entries,
+                batch_size=batch_size)
 
 
     def create_user(self, name, password, database_names):
@@ -142,19 +166,46 @@ class CloudDatabaseInstance(BaseResource):
         that name already exists, a BadRequest (400) exception will
         be raised.
         """
-        if not isinstance(database_names, list):
-            database_names = [database_names]
-        # The API only accepts names, not DB objects
-        database_names = [db if isinstance(db, basestring) else db.name
-                for db in database_names]
+        database_names = self._get_database_names(database_names)
         # Note that passing in non-None values is required for the create_body
         # method to distinguish between this and the request to create and
         # instance.
-        self._user_manager.create(name=name, password=password,
-                database_names=database_names, return_none=True)
-        # Since the API doesn't return the info for creating the user object, we
-        # have to do it manually.
-        return self._user_manager.find(name=name)
+        return self._user_manager.create(name=name, password=password,
+                database_names=database_names)
+
+
+    def create_users(self, users, batch_size=None):
+        """
+        Creates several users, sending up to 'batch_size' of them in each
+        request. Each user is either a dict with the 'name', 'password' and
+        'database_names' of the user, or a (name, password, database_names)
+        tuple.
+
+        Returns a list of CloudDatabaseUser objects. If any of them can't be
+        created, a BatchCreationFailed exception is raised.
+        """
+        entries = []
+        for user in users:
+            if not isinstance(user, dict):
+                name, password, database_names = user
+                user = {"name": name, "password": password,
+                        "database_names": database_names}
+            entries.append({"name": user["name"],
+                    "password": user["password"],
+                    "database_names": self._get_database_names(
+                        user["database_names"])})
+        return self._user_manager.create_many(entries, batch_size=batch_size)
+
+
+    def _get_database_names(self, database_names):
+        """
+        Takes a database or a list of databases, as either names or objects,
+        and returns a list of the names, since the API only accepts names.
+        """
+        if not isinstance(database_names, list):
+            database_names = [database_names]
+        return [db if isinstance(db, basestring) else db.name
+                for db in database_names]
 
 
     def _get_name(self, name_or_obj):
@@ -253,6 +304,38 @@ class CloudDatabaseInstance(BaseResource):
 
     flavor = property(_get_flavor, _set_flavor)
 
+    # The managers for the databases and users are only created when they
+    # are first needed, so that listing instances doesn't create two for
+    # each. They are looked up in __dict__, since a missing attribute would
+    # otherwise trigger a lazy load of the instance.
+    def _get_database_manager(self):
+        mgr = self.__dict__.get("_db_manager")
+        if mgr is None:
+            mgr = self._db_manager = CloudDatabaseEntityManager(
+                    self.manager.api, resource_class=CloudDatabaseDatabase,
+                    response_key="database",
+                    uri_base="instances/%s/databases" % self.id)
+        return mgr
+
+    def _set_database_manager(self, mgr):
+        self._db_manager = mgr
+
+    _database_manager = property(_get_database_manager, _set_database_manager)
+
+    def _get_user_manager(self):
+        mgr = self.__dict__.get("_usr_manager")
+        if mgr is None:
+            mgr = self._usr_manager = CloudDatabaseEntityManager(
+                    self.manager.api, resource_class=CloudDatabaseUser,
+                    response_key="user",
+                    uri_base="instances/%s/users" % self.id)
+        return mgr
+
+    def _set_user_manager(self, mgr):
+        self._usr_manager = mgr
+
+    _user_manager = property(_get_user_manager, _set_user_manager)
+
 
 class CloudDatabaseDatabase(BaseResource):
     """
@@ -290,6 +373,158 @@ class CloudDatabaseFlavor(BaseResource):
     _non_display = ["links"]
 
 
+class CloudDatabaseEntityManager(BaseManager):
+    """
+    Manages the databases or the users of an instance. These are identified
+    by their names, and the manager keeps an index of them by name, so that
+    finding one doesn't require listing them all each time. The index is
+    built by the first full listing, and kept current as they are created
+    and deleted through this manager.
+    """
+    default_page_size = DEFAULT_PAGE_SIZE
+
+    def __init__(self, *args, **kwargs):
+        super(CloudDatabaseEntityManager, self).__init__(*args, **kwargs)
+        self._index = None
+
+
+    def list(self, limit=None, marker=None, filters=None):
+        """
+        Gets a list of items. If no limit, marker or filters are given, every
+        page of the listing is read, and the index is rebuilt from it.
+        """
+        if limit is not None or marker is not None or filters:
+            return super(CloudDatabaseEntityManager, self).list(limit=limit,
+                    marker=marker, filters=filters)
+        items = list(self.iter_all(prefetch=0))
+        self._index = dict((item.name, item) for item in items)
+        return items
+
+
+    def find_by_name(self, name):
+        """
+        Returns the item with the specified name, or None if there is no such
+        item. The items are only listed if the index hasn't been built yet,
+        or if the name isn't in it, in case the item was created elsewhere.
+        """
+        if self._index is None or name not in self._index:
+            self.list()
+        return self._index.get(name)
+
+
+    def create(self, name, *args, **kwargs):
+        """
+        The API doesn't return anything when databases or users are created,
+        so the new item is built from the request body.
+        """
+        body = self.api._create_body(name, *args, **kwargs)
+        self._create("/%s" % self.uri_base, body, return_none=True)
+        return self._add_created(body[self.plural_response_key][0])
+
+
+    def create_many(self, entries, batch_size=None):
+        """
+        Creates several items, sending up to 'batch_size' of them in each
+        request; by default this is MAX_ITEMS_PER_REQUEST. Each entry is a
+        dict of the keyword arguments that create() takes, and the new items
+        are returned in the same order.
+
+        If a request fails, all of the items are listed again to determine
+        which of them exist, and a BatchCreationFailed exception is raised.
+        """
+        if batch_size is None:
+            batch_size = MAX_ITEMS_PER_REQUEST
+        key = self.plural_response_key
+        infos = [self.api._create_body(**entry)[key][0] for entry in entries]
+        created = []
+        for start in xrange(0, len(infos), batch_size):
+            batch = infos[start:start + batch_size]
+            try:
+                self._create("/%s" % self.uri_base, {key: batch},
+                        return_none=True)
+            except exc.ClientException as e:
+                raise self._batch_failure(e, infos, created)
+            created.extend(self._add_created(info) for info in batch)
+        return created
+
+
+    def _batch_failure(self, err, infos, created):
+        """
+        Returns a BatchCreationFailed exception for the error raised while
+        creating the items in 'infos', listing all of the items to determine
+        which of them exist. If they can't be listed, only the items in
+        'created', which were created by earlier requests, are known to exist.
+        """
+        key = self.plural_response_key
+        msg = "Creating the %s failed: %s" % (key, err)
+        names = [info["name"] for info in infos]
+        try:
+            self.list()
+        except Exception:
+            return exc.BatchCreationFailed(msg, created=created,
+                    failed=names[len(created):], cause=err)
+        return exc.BatchCreationFailed(msg,
+                created=[self._index[name] for name in names
+                    if name in self._index],
+                failed=[name for name in names if name not in self._index],
+                cause=err)
+
+
+    def _add_created(self, info):
+        """
+        Builds a new item from the info that was sent to create it, and adds
+        it to the index.
+        """
+        info = dict(info)
+        # Don't hold on to users' passwords.
+        info.pop("password", None)
+        item = self.resource_class(self, info, loaded=True)
+        if self._index is not None:
+            self._index[item.name] = item
+        return item
+
+
+    def delete(self, item):
+        """Deletes the item with the specified name."""
+        super(CloudDatabaseEntityManager, self).delete(item)
+        if self._index is not None:
+            self._index.pop(item, None)
+
+
+class CloudDatabaseManager(BaseManager):
+    """
+    Manages the database instances. Listings are built from the summary
+    that the API returns for each instance; the full details of each are
+    only fetched when needed, unless they are requested with 'details=True'.
+    """
+    default_page_size = DEFAULT_PAGE_SIZE
+
+    def list(self, limit=None, marker=None, filters=None, details=False,
+            concurrency=None):
+        """
+        Gets a list of all instances. If 'details' is True, the full details
+        of every instance are fetched too, with up to 'concurrency' requests
+        at a time.
+        """
+        instances = super(CloudDatabaseManager, self).list(limit=limit,
+                marker=marker, filters=filters)
+        if details:
+            self.load_details(instances, concurrency=concurrency)
+        return instances
+
+
+    def load_details(self, instances, concurrency=None):
+        """
+        Fetches the full details of any of the instances that haven't been
+        loaded yet, making up to 'concurrency' requests at a time. By default
+        this is the size of the client's HTTP connection pool.
+        """
+        if concurrency is None:
+            concurrency = self.api.http_pool_size
+        call_all([inst.get for inst in instances if not inst.loaded],
+                max_workers=concurrency)
+
+
 class CloudDatabaseClient(BaseClient):
     """
     This is the primary class for interacting with Cloud Databases.
@@ -299,13 +534,25 @@ class CloudDatabaseClient(BaseClient):
         Creates a manager to handle the instances, and another
         to handle flavors.
         """
-        self._manager = BaseManager(self, resource_class=CloudDatabaseInstance,
-                response_key="instance", uri_base="instances")
+        self._manager = CloudDatabaseManager(self,
+                resource_class=CloudDatabaseInstance, response_key="instance",
+                uri_base="instances")
         self._flavor_manager = BaseManager(self,
                 resource_class=CloudDatabaseFlavor, response_key="flavor",
                 uri_base="flavors")
 
 
+    def list(self, limit=None, marker=None, details=False, concurrency=None):
+        """
+        Returns a list of all instances. Only the summary of each instance is
+        fetched, and its other details are loaded when first referenced. Pass
+        'details=True' to fetch the full details of every instance, with up
+        to 'concurrency' requests at a time.
+        """
+        return self._manager.list(limit=limit, marker=marker, details=details,
+                concurrency=concurrency)
+
+
     @assure_instance
     def list_databases(self, instance):
         """Returns all databases for the specified instance."""
@@ -320,6 +567,18 @@ class CloudDatabaseClient(BaseClient):
                 collate=collate)
 
 
+    @assure_instance
+    def create_databases(self, instance, databases, character_set=None,
+            collate=None, batch_size=None):
+        """
+        Creates several databases on the given instance, in as few requests
+        as possible.
+        """
+        return instance.create_databases(databases,
+                character_set=character_set, collate=collate,
+                batch_size=batch_size)
+
+
     @assure_instance
     def get_database(self, instance, name):
         """
@@ -352,6 +611,15 @@ class CloudDatabaseClient(BaseClient):
                 database_names=database_names)
 
 
+    @assure_instance
+    def create_users(self, instance, users, batch_size=None):
+        """
+        Creates several users on the given instance, in as few requests as
+        possible.
+        """
+        return instance.create_users(users, batch_size=batch_size)
+
+
     @assure_instance
     def get_user(self, instance, name):
         """
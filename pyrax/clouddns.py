@@ -17,12 +17,23 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import datetime
 from functools import wraps
+import heapq
+import itertools
 import json
+import os
+import random
 import re
+import sys
+import threading
 import time
+import urllib
 
 import pyrax
+from pyrax.async_client import AsyncResult
+from pyrax.async_client import wait_all
 from pyrax.client import BaseClient
 import pyrax.exceptions as exc
 from pyrax.manager import BaseManager
@@ -31,6 +42,76 @@ import pyrax.utils as utils
 
 # How long (in seconds) to wait for a response from async operations
 DEFAULT_TIMEOUT = 5
+# The maximum number of items the DNS API returns in one page.
+DEFAULT_PAGE_SIZE = 100
+# How long (in seconds) to wait before the first status check of an async
+# operation, and the longest wait between later checks.
+DEFAULT_POLL_DELAY = 0.25
+DEFAULT_MAX_POLL_DELAY = 2
+# The most records that are sent in a single add, update or delete request.
+MAX_RECORDS_PER_REQUEST = 100
+# Record types whose data is a host name, and so is compared without regard
+# to case or a trailing dot.
+HOSTNAME_RECORD_TYPES = ("CNAME", "MX", "NS")
+# How far back (in seconds) a DNSMirror asks for changes before the time of
+# its previous sync, to allow for clock differences with the API servers.
+DEFAULT_MIRROR_OVERLAP = 60
+# If more records than this have changed in a domain since the previous
+# sync, a DNSMirror re-lists the domain instead of getting each record.
+MIRROR_RELOAD_THRESHOLD = 50
+# The format of the change times that a DNSMirror stores.
+MIRROR_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _response_body(resp, body):
+    """Result handler for async calls that return the response body."""
+    return body
+
+
+def _response_records(resp, body):
+    """Result handler for async calls that return the response's records."""
+    return body.get("records")
+
+
+def _is_completed(resp, body):
+    """Result handler for async calls that return whether they completed."""
+    return body.get("status") == "COMPLETED"
+
+
+def _record_value(record, attr):
+    """Returns the attribute of a record, which may be an object or a dict."""
+    if isinstance(record, dict):
+        return record.get(attr)
+    return getattr(record, attr, None)
+
+
+def _record_key(record):
+    """Returns the record's type and name, normalized for comparison."""
+    rec_type = (_record_value(record, "type") or "").upper()
+    name = (_record_value(record, "name") or "").lower().rstrip(".")
+    return rec_type, name
+
+
+def _record_data(record):
+    """Returns the record's data, normalized for comparison."""
+    data = "%s" % _record_value(record, "data")
+    if _record_key(record)[0] in HOSTNAME_RECORD_TYPES:
+        data = data.lower().rstrip(".")
+    return data
+
+
+def _record_changes(current, desired):
+    """
+    Returns a dict of the settings in the desired record that differ from
+    the current record. Settings missing from the desired record are left
+    as they are.
+    """
+    changes = {}
+    for attr in ("ttl", "priority", "comment"):
+        val = _record_value(desired, attr)
+        if val is not None and val != _record_value(current, attr):
+            changes[attr] = val
+    return changes
 
 
 def assure_domain(fnc):
@@ -44,6 +125,170 @@ def assure_domain(fnc):
 
 
 
+class PageCursor(object):
+    """
+    Records where a page of listing results falls in the full listing: the
+    URIs of the next and previous pages, and the total number of entries.
+    Every page returned by the listing calls carries its cursor in its
+    'cursor' attribute, and passing that cursor to the matching
+    *_next_page() or *_previous_page() call gets the adjacent page. Since
+    the cursor belongs to the caller, any number of threads can page
+    through listings at the same time.
+    """
+    def __init__(self, service, next_uri=None, prev_uri=None,
+            total_entries=None, domain_id=None):
+        self.service = service
+        self.next_uri = next_uri
+        self.prev_uri = prev_uri
+        self.total_entries = total_entries
+        # Only used for subdomain listings.
+        self.domain_id = domain_id
+
+
+    def __repr__(self):
+        return "<PageCursor %s next=%s prev=%s>" % (self.service,
+                self.next_uri, self.prev_uri)
+
+
+
+class ResultsPage(list):
+    """
+    A list of the results on one page of a listing, with the PageCursor for
+    the page in its 'cursor' attribute.
+    """
+    def __init__(self, items=None, cursor=None):
+        super(ResultsPage, self).__init__(items or [])
+        self.cursor = cursor
+
+
+
+class PollingStrategy(object):
+    """
+    Determines how often the status of an asynchronous DNS call is checked.
+    The first check is made after 'initial_delay' seconds, and each wait
+    after that is 'multiplier' times longer than the last, up to
+    'max_delay' seconds. Each wait is randomly varied by up to 'jitter'
+    (a fraction of the wait), so that many clients waiting at once don't
+    poll in lockstep.
+    """
+    def __init__(self, initial_delay=DEFAULT_POLL_DELAY, multiplier=2,
+            max_delay=DEFAULT_MAX_POLL_DELAY, jitter=0.1):
+        self.initial_delay = initial_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+
+    def delays(self):
+        """Generator that yields the wait before each status check."""
+        delay = self.initial_delay
+        while True:
+            if self.jitter:
+                yield max(0, delay * (1 + random.uniform(-self.jitter,
+                        self.jitter)))
+            else:
+                yield delay
+            delay = min(delay * self.multiplier, self.max_delay)
+
+
+
+class DNSJob(AsyncResult):
+    """
+    The pending result of an asynchronous DNS call that was made without
+    waiting for it to complete. Call result() to wait for the call and get
+    the value that the blocking version of the call would have returned.
+    """
+    def __init__(self, uri, status_uri, error_class=None, has_response=True,
+            process=None, polling=None, timeout=None):
+        super(DNSJob, self).__init__()
+        self.uri = uri
+        self.status_uri = status_uri
+        self.job_id = status_uri.split("/status/")[-1].split("?")[0]
+        self.error_class = error_class
+        self.has_response = has_response
+        self.process = process
+        # The number of status checks made for this job.
+        self.poll_count = 0
+        self.start = time.time()
+        self.deadline = self.start + timeout if timeout else None
+        self._delays = (polling or PollingStrategy()).delays()
+        self._next_poll = None
+        self._schedule(self.start)
+
+
+    def _schedule(self, now):
+        """Sets the time of the next status check, without passing the timeout."""
+        delay = self._delays.next()
+        if self.deadline is not None:
+            delay = min(delay, max(self.deadline - now, 0))
+        self._next_poll = now + delay
+
+
+
+class DNSJobWaiter(object):
+    """
+    Checks the status of any number of outstanding DNSJobs from a single
+    background thread. Each job is checked at the cadence of its own
+    PollingStrategy, so many jobs can be waited on together without a thread
+    or a busy loop for each. The thread exits when there are no jobs left.
+    """
+    def __init__(self, manager):
+        self.manager = manager
+        self._jobs = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+
+    def add(self, job):
+        """Adds the job to those being checked."""
+        with self._cond:
+            heapq.heappush(self._jobs, (job._next_poll, self._counter.next(),
+                    job))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._jobs:
+                        self._thread = None
+                        return
+                    wait = self._jobs[0][0] - time.time()
+                    if wait <= 0:
+                        job = heapq.heappop(self._jobs)[2]
+                        break
+                    self._cond.wait(wait)
+            self._check(job)
+
+
+    def _check(self, job):
+        """Gets the job's status, and either finishes it or re-schedules it."""
+        try:
+            resp, ret_body = self.manager.api.method_get(job.status_uri)
+            job.poll_count += 1
+            now = time.time()
+            timed_out = job.deadline is not None and now > job.deadline
+            if ret_body["status"] == "RUNNING" and not timed_out:
+                job._schedule(now)
+                self.add(job)
+                return
+            value = self.manager._finish_async_call(job.uri, resp, ret_body,
+                    job.error_class, job.has_response, timed_out)
+            if job.process is not None:
+                value = job.process(*value)
+        except Exception:
+            job._set_result(None, sys.exc_info())
+        else:
+            job._set_result(value)
+
+
+
 class CloudDNSRecord(BaseResource):
     """
     This class represents a domain record.
@@ -58,12 +303,14 @@ class CloudDNSRecord(BaseResource):
     comment = None
 
 
-    def update(self, data=None, priority=None, ttl=None, comment=None):
+    def update(self, data=None, priority=None, ttl=None, comment=None,
+            wait=True):
         """
-        Modifies this record.
+        Modifies this record. If 'wait' is False, a DNSJob for the change is
+        returned without waiting for it to complete.
         """
         return self.manager.update_record(self.domain_id, self, data=data,
-                priority=priority, ttl=ttl, comment=comment)
+                priority=priority, ttl=ttl, comment=comment, wait=wait)
 
 
     def get(self):
@@ -73,11 +320,13 @@ class CloudDNSRecord(BaseResource):
         return self.manager.get_record(self.domain_id, self)
 
 
-    def delete(self):
+    def delete(self, wait=True):
         """
-        Deletes an existing record for this domain.
+        Deletes an existing record for this domain. If 'wait' is False, a
+        DNSJob for the deletion is returned without waiting for it to
+        complete.
         """
-        return self.manager.delete_record(self.domain_id, self)
+        return self.manager.delete_record(self.domain_id, self, wait=wait)
 
 
 
@@ -192,7 +441,7 @@ class CloudDNSDomain(BaseResource):
         return matches[0]
 
 
-    def add_records(self, records):
+    def add_records(self, records, wait=True):
         """
         Adds the records to this domain. Each record should be a dict with the
         following keys:
@@ -202,8 +451,11 @@ class CloudDNSDomain(BaseResource):
             - ttl (optional)
             - comment (optional)
             - priority (required for MX and SRV records; forbidden otherwise)
+
+        If 'wait' is False, a DNSJob is returned without waiting for the
+        records to be added; its result() is the list of new records.
         """
-        return self.manager.add_records(self, records)
+        return self.manager.add_records(self, records, wait=wait)
 
     # Create an alias, so that adding a single record is more intuitive
     add_record = add_records
@@ -217,19 +469,112 @@ class CloudDNSDomain(BaseResource):
 
 
     def update_record(self, record, data=None, priority=None,
-            ttl=None, comment=None):
+            ttl=None, comment=None, wait=True):
         """
-        Modifies an existing record for this domain.
+        Modifies an existing record for this domain. If 'wait' is False, a
+        DNSJob for the change is returned without waiting for it to complete.
         """
         return self.manager.update_record(self, record, data=data,
-                priority=priority, ttl=ttl, comment=comment)
+                priority=priority, ttl=ttl, comment=comment, wait=wait)
+
+
+    def delete_record(self, record, wait=True):
+        """
+        Deletes an existing record for this domain. If 'wait' is False, a
+        DNSJob for the deletion is returned without waiting for it to
+        complete.
+        """
+        return self.manager.delete_record(self, record, wait=wait)
+
+
+    def reconcile(self, desired_records, dry_run=False,
+            ignore_types=("NS",)):
+        """
+        Makes the records of this domain match 'desired_records', and returns
+        the ReconcilePlan of the changes. If 'dry_run' is True, the plan is
+        returned without making any changes.
+        """
+        return self.manager.reconcile(self, desired_records, dry_run=dry_run,
+                ignore_types=ignore_types)
+
+
+class ReconcilePlan(object):
+    """
+    The changes needed to make a domain's records match a desired set of
+    records, as computed by reconcile():
+
+        adds: the record dicts to add.
+        updates: (record, changes) tuples, where 'changes' is a dict of the
+            settings to change on the existing CloudDNSRecord.
+        deletes: the CloudDNSRecords to delete.
+        unchanged: the CloudDNSRecords that already match.
+
+    Nothing is changed until apply() is called, so a plan can be inspected
+    as a dry run. The changes are made with one request for each batch of
+    up to MAX_RECORDS_PER_REQUEST records of each kind.
+    """
+    def __init__(self, manager, domain, adds=None, updates=None,
+            deletes=None, unchanged=None):
+        self.manager = manager
+        self.domain = domain
+        self.adds = adds or []
+        self.updates = updates or []
+        self.deletes = deletes or []
+        self.unchanged = unchanged or []
+        self.applied = False
+        self.added_records = []
+
+
+    def __len__(self):
+        return len(self.adds) + len(self.updates) + len(self.deletes)
+
+
+    def __repr__(self):
+        name = getattr(self.domain, "name", self.domain)
+        return ("<ReconcilePlan %s: add=%s, update=%s, delete=%s, "
+                "unchanged=%s>" % (name, len(self.adds), len(self.updates),
+                len(self.deletes), len(self.unchanged)))
+
+
+    def batches(self, batch_size=MAX_RECORDS_PER_REQUEST):
+        """
+        Generator that yields an (action, records) tuple for each request
+        needed to apply the plan, where 'action' is "delete", "update" or
+        "add". Deletions come first, so that records being replaced are gone
+        before their replacements are added.
+        """
+        updates = [self._update_body(record, changes)
+                for record, changes in self.updates]
+        for action, items in (("delete", self.deletes), ("update", updates),
+                ("add", self.adds)):
+            for pos in xrange(0, len(items), batch_size):
+                yield action, items[pos:pos + batch_size]
 
 
-    def delete_record(self, record):
+    def apply(self, batch_size=MAX_RECORDS_PER_REQUEST):
         """
-        Deletes an existing record for this domain.
+        Makes the changes in the plan, and returns the plan. The records that
+        were added are stored in 'added_records'.
         """
-        return self.manager.delete_record(self, record)
+        mgr = self.manager
+        for action, records in self.batches(batch_size):
+            if action == "delete":
+                mgr.delete_records(self.domain, records)
+            elif action == "update":
+                mgr.update_records(self.domain, records)
+            else:
+                self.added_records.extend(mgr.add_records(self.domain,
+                        records))
+        self.applied = True
+        return self
+
+
+    @staticmethod
+    def _update_body(record, changes):
+        body = {"id": record.id, "name": record.name}
+        body.update(changes)
+        return body
+
 
 
 class CloudDNSPTRRecord(object):
@@ -260,14 +605,20 @@ class CloudDNSPTRRecord(object):
 
 
 class CloudDNSManager(BaseManager):
+    query_filters = {"name": "name"}
+
+
     def __init__(self, api, resource_class=None, response_key=None,
             plural_response_key=None, uri_base=None):
         super(CloudDNSManager, self).__init__(api, resource_class=resource_class,
                 response_key=response_key, plural_response_key=plural_response_key,
                 uri_base=uri_base)
-        self._paging = {"domain": {}, "subdomain": {}, "record": {}}
-        self._reset_paging(service="all")
+        # The paging links of the most recent listings made by each thread.
+        self._local = threading.local()
         self._timeout = DEFAULT_TIMEOUT
+        self._polling = PollingStrategy()
+        self._waiter = None
+        self._waiter_lock = threading.Lock()
 
 
     def _set_timeout(self, timeout):
@@ -279,9 +630,46 @@ class CloudDNSManager(BaseManager):
         self._timeout = timeout
 
 
-    def _reset_paging(self, service, body=None):
+    def _set_polling(self, polling):
+        """
+        Changes the PollingStrategy used to check the status of asynchronous
+        calls.
+        """
+        self._polling = polling
+
+
+    def _get_poll_count(self, job=None):
+        """
+        Returns the number of status checks made for the job, or for the
+        current thread's most recent asynchronous call.
+        """
+        if job is None:
+            job = getattr(self._local, "last_job", None)
+            if job is None:
+                return getattr(self._local, "poll_count", 0)
+        return job.poll_count
+
+
+    def _get_paging(self):
+        """
+        Returns the paging links of the most recent listing of each type made
+        by the current thread. These are used by the *_next_page() and
+        *_previous_page() calls when no cursor is passed to them.
+        """
+        paging = getattr(self._local, "paging", None)
+        if paging is None:
+            paging = self._local.paging = {"domain": {}, "subdomain": {},
+                    "record": {}}
+            self._reset_paging(service="all")
+        return paging
+
+    _paging = property(_get_paging)
+
+
+    def _reset_paging(self, service, body=None, domain_id=None):
         """
         Resets the internal attributes when there is no current paging request.
+        Returns a PageCursor for the listing response in 'body'.
         """
         if service == "all":
             for svc in self._paging.keys():
@@ -289,42 +677,89 @@ class CloudDNSManager(BaseManager):
                 svc_dct["next_uri"] = svc_dct["prev_uri"] = None
                 svc_dct["total_entries"] = None
             return
-        svc_dct = self._paging[service]
-        svc_dct["next_uri"] = svc_dct["prev_uri"] = None
-        svc_dct["total_entries"] = None
-        if not body:
-            return
-        svc_dct["total_entries"] = body.get("totalEntries")
-        links = body.get("links")
-        uri_base = self.uri_base
-        if links:
-            for link in links:
+        cursor = PageCursor(service, domain_id=domain_id)
+        if body:
+            cursor.total_entries = body.get("totalEntries")
+            uri_base = self.uri_base
+            for link in body.get("links") or []:
                 href = link["href"]
                 pos = href.index(uri_base)
                 page_uri = href[pos - 1:]
                 if link["rel"] == "next":
-                    svc_dct["next_uri"] = page_uri
+                    cursor.next_uri = page_uri
                 elif link["rel"] == "previous":
-                    svc_dct["prev_uri"] = page_uri
+                    cursor.prev_uri = page_uri
+        svc_dct = self._paging[service]
+        svc_dct["next_uri"] = cursor.next_uri
+        svc_dct["prev_uri"] = cursor.prev_uri
+        svc_dct["total_entries"] = cursor.total_entries
+        svc_dct["domain_id"] = domain_id
+        return cursor
 
 
-    def _get_pagination_qs(self, limit, offset):
+    def _page_uri(self, service, direction, cursor=None):
+        """
+        Returns the URI of the next or previous page (depending on
+        'direction') from the cursor, or from the current thread's most
+        recent listing if no cursor is given. Raises NoMoreResults if there
+        is no such page.
+        """
+        key = "%s_uri" % direction
+        if cursor is not None:
+            uri = getattr(cursor, key)
+        else:
+            uri = self._paging.get(service, {}).get(key)
+        if uri is None:
+            if direction == "next":
+                msg = "There are no more pages of %ss to list." % service
+            else:
+                msg = "There are no previous pages of %ss to list." % service
+            raise exc.NoMoreResults(msg)
+        return uri
+
+
+    def _get_pagination_qs(self, limit, offset, filters=None):
         pagination_items = []
         if limit is not None:
             pagination_items.append("limit=%s" % limit)
         if offset is not None:
             pagination_items.append("offset=%s" % offset)
+        if filters:
+            pagination_items.append(urllib.urlencode(filters))
         qs = "&".join(pagination_items)
         qs = "?%s" % qs if qs else ""
         return qs
 
 
-    def list(self, limit=None, offset=None):
-        """Gets a list of all domains, or optionally a page of domains."""
-        uri = "/%s%s" % (self.uri_base, self._get_pagination_qs(limit, offset))
+    def list(self, limit=None, offset=None, filters=None):
+        """
+        Gets a list of all domains, or optionally a page of domains. The
+        listing can be filtered by passing a dict of query parameters in
+        'filters'.
+        """
+        uri = "/%s%s" % (self.uri_base, self._get_pagination_qs(limit, offset,
+                filters))
         return self._list(uri)
 
 
+    def _iter_pages(self, page_size=None, filters=None):
+        """
+        Domains are paged by offset rather than by marker; this yields each
+        page of domains in turn.
+        """
+        limit = page_size or DEFAULT_PAGE_SIZE
+        offset = 0
+        kwargs = {"filters": filters} if filters else {}
+        while True:
+            page = self.list(limit=limit, offset=offset, **kwargs)
+            if not page:
+                return
+            yield page
+            if len(page) < limit:
+                return
+            offset += len(page)
+
+
     def _list(self, uri, obj_class=None, list_all=False):
         """
         Handles the communication with the API when getting
@@ -335,42 +770,36 @@ class CloudDNSManager(BaseManager):
             obj_class = self.resource_class
 
         data = resp_body[self.plural_response_key]
-        ret = [obj_class(self, res, loaded=False)
-                for res in data if res]
-        self._reset_paging("domain", resp_body)
+        ret = ResultsPage([obj_class(self, res, loaded=False)
+                for res in data if res])
+        ret.cursor = self._reset_paging("domain", resp_body)
         if list_all:
-            dom_paging = self._paging.get("domain", {})
-            while dom_paging.get("next_uri"):
-                next_uri = dom_paging.get("next_uri")
-                ret.extend(self._list(uri=next_uri, obj_class=obj_class,
-                        list_all=False))
+            while ret.cursor.next_uri:
+                page = self._list(uri=ret.cursor.next_uri,
+                        obj_class=obj_class, list_all=False)
+                ret.extend(page)
+                ret.cursor = page.cursor
         return ret
 
 
-    def list_previous_page(self):
+    def list_previous_page(self, cursor=None):
         """
         When paging through results, this will return the previous page, using
         the same limit. If there are no more results, a NoMoreResults exception
-        will be raised.
+        will be raised. Pass the 'cursor' of a page to get the page before it;
+        otherwise the most recent listing made by this thread is used.
         """
-        uri = self._paging.get("domain", {}).get("prev_uri")
-        if uri is None:
-            raise exc.NoMoreResults("There are no previous pages of domains "
-                    "to list.")
-        return self._list(uri)
+        return self._list(self._page_uri("domain", "prev", cursor))
 
 
-    def list_next_page(self):
+    def list_next_page(self, cursor=None):
         """
         When paging through results, this will return the next page, using the
         same limit. If there are no more results, a NoMoreResults exception
-        will be raised.
+        will be raised. Pass the 'cursor' of a page to get the page after it;
+        otherwise the most recent listing made by this thread is used.
         """
-        uri = self._paging.get("domain", {}).get("next_uri")
-        if uri is None:
-            raise exc.NoMoreResults("There are no more pages of domains to "
-                    "list.")
-        return self._list(uri)
+        return self._list(self._page_uri("domain", "next", cursor))
 
 
     def _get(self, uri):
@@ -399,6 +828,80 @@ class CloudDNSManager(BaseManager):
         and body will be returned to the calling method, which will have
         to handle the result.
         """
+        _resp, ret_body, massagedURL = self._start_async_call(uri, body,
+                method, *args, **kwargs)
+        # Each thread's most recent count is kept for get_poll_count().
+        poll_count = self._local.poll_count = 0
+        self._local.last_job = None
+        start = time.time()
+        timed_out = False
+        delays = self._polling.delays()
+        while (ret_body["status"] == "RUNNING") and not timed_out:
+            delay = delays.next()
+            if self._timeout:
+                # Don't sleep past the timeout.
+                remaining = self._timeout - (time.time() - start)
+                delay = min(delay, max(remaining, 0))
+            time.sleep(delay)
+            _resp, ret_body = self.api.method_get(massagedURL)
+            poll_count += 1
+            self._local.poll_count = poll_count
+            if self._timeout:
+                timed_out = ((time.time() - start) > self._timeout)
+        return self._finish_async_call(uri, _resp, ret_body, error_class,
+                has_response, timed_out)
+
+
+    def _submit_async_call(self, uri, body=None, method="GET",
+            error_class=None, has_response=True, process=None, *args,
+            **kwargs):
+        """
+        Makes the same request as _async_call(), but returns a DNSJob
+        instead of waiting for the call to complete. The job's status is
+        checked by this manager's DNSJobWaiter. If 'process' is given, the
+        job's result is process(resp, body) instead of (resp, body).
+        """
+        _resp, ret_body, massagedURL = self._start_async_call(uri, body,
+                method, *args, **kwargs)
+        job = self._local.last_job = DNSJob(uri, massagedURL,
+                error_class=error_class, has_response=has_response,
+                process=process, polling=self._polling, timeout=self._timeout)
+        if ret_body["status"] != "RUNNING":
+            try:
+                value = self._finish_async_call(uri, _resp, ret_body,
+                        error_class, has_response, False)
+                if process is not None:
+                    value = process(*value)
+            except Exception:
+                job._set_result(None, sys.exc_info())
+            else:
+                job._set_result(value)
+            return job
+        with self._waiter_lock:
+            if self._waiter is None:
+                self._waiter = DNSJobWaiter(self)
+        self._waiter.add(job)
+        return job
+
+
+    def _call_or_submit(self, process, uri, wait=True, **kwargs):
+        """
+        If 'wait' is True, makes the asynchronous call, waits for it to
+        complete, and returns process(resp, body). Otherwise returns a DNSJob
+        whose result will be that value.
+        """
+        if not wait:
+            return self._submit_async_call(uri, process=process, **kwargs)
+        resp, ret_body = self._async_call(uri, **kwargs)
+        return process(resp, ret_body)
+
+
+    def _start_async_call(self, uri, body, method, *args, **kwargs):
+        """
+        Makes the initial request of an asynchronous call. Returns the
+        response headers and body, along with the URI for checking the
+        status of the call.
+        """
         api_methods = {
                 "GET": self.api.method_get,
                 "POST": self.api.method_post,
@@ -412,12 +915,15 @@ class CloudDNSManager(BaseManager):
             _resp, ret_body = api_method(uri, body=body, *args, **kwargs)
         callbackURL = ret_body["callbackUrl"].split("/status/")[-1]
         massagedURL = "/status/%s?showDetails=true" % callbackURL
-        start = time.time()
-        timed_out = False
-        while (ret_body["status"] == "RUNNING") and not timed_out:
-            _resp, ret_body = self.api.method_get(massagedURL)
-            if self._timeout:
-                timed_out = ((time.time() - start) > self._timeout)
+        return _resp, ret_body, massagedURL
+
+
+    def _finish_async_call(self, uri, _resp, ret_body, error_class,
+            has_response, timed_out):
+        """
+        Handles the final status of an asynchronous call, raising an error if
+        it failed or timed out.
+        """
         if error_class and (ret_body["status"] == "ERROR"):
             # This call will handle raising the error.
             self._process_async_error(ret_body, error_class)
@@ -425,14 +931,8 @@ class CloudDNSManager(BaseManager):
             raise exc.DNSCallTimedOut("The API call to '%s' did not complete "
                     "after %s seconds." % (uri, self._timeout))
         if has_response:
-            ret = _resp, ret_body["response"]
-        else:
-            ret = _resp, ret_body
-        try:
-            body = json.loads(body)
-        except Exception:
-            pass
-        return ret
+            return _resp, ret_body["response"]
+        return _resp, ret_body
 
 
     def _process_async_error(self, ret_body, error_class):
@@ -503,26 +1003,6 @@ class CloudDNSManager(BaseManager):
                 error_class=exc.DomainDeletionFailed, has_response=False)
 
 
-    def findall(self, **kwargs):
-        """
-        Finds all items with attributes matching ``**kwargs``.
-
-        Normally this isn't very efficient, since the default action is to
-        load the entire list and then filter on the Python side, but the DNS
-        API provides a more efficient search option when filtering on name.
-        So if the filter is on name, use that; otherwise, use the default.
-        """
-        if (len(kwargs) == 1) and ("name" in kwargs):
-            # Filtering on name; use the more efficient method.
-            nm = kwargs["name"]
-            uri = "/%s?name=%s" % (self.uri_base, nm)
-            matches = self._list(uri, list_all=True)
-            return [match for match in matches
-                if match.name == nm]
-        else:
-            return super(CloudDNSManager, self).findall(**kwargs)
-
-
     def changes_since(self, domain, date_or_datetime):
         """
         Gets the changes for a domain since the specified date/datetime.
@@ -631,37 +1111,47 @@ class CloudDNSManager(BaseManager):
 
     def _list_subdomains(self, uri, domain_id):
         resp, body = self.api.method_get(uri)
-        self._reset_paging("subdomain", body)
+        cursor = self._reset_paging("subdomain", body, domain_id=domain_id)
         subdomains = body.get("domains", [])
-        return [CloudDNSDomain(self, subdomain, loaded=False)
+        return ResultsPage([CloudDNSDomain(self, subdomain, loaded=False)
                 for subdomain in subdomains
-                if subdomain["id"] != domain_id]
+                if subdomain["id"] != domain_id], cursor)
 
 
-    def list_subdomains_previous_page(self):
+    def list_subdomains_previous_page(self, cursor=None):
         """
         When paging through subdomain results, this will return the previous
         page, using the same limit. If there are no more results, a
-        NoMoreResults exception will be raised.
+        NoMoreResults exception will be raised. Pass the 'cursor' of a page
+        to get the page before it; otherwise the most recent listing made by
+        this thread is used.
         """
-        uri = self._paging.get("subdomain", {}).get("prev_uri")
-        if uri is None:
-            raise exc.NoMoreResults("There are no previous pages of subdomains "
-                    "to list.")
-        return self._list_subdomains(uri)
+        uri = self._page_uri("subdomain", "prev", cursor)
+        return self._list_subdomains(uri,
+                self._cursor_domain_id("subdomain", cursor))
 
 
-    def list_subdomains_next_page(self):
+    def list_subdomains_next_page(self, cursor=None):
         """
         When paging through subdomain results, this will return the next page,
         using the same limit. If there are no more results, a NoMoreResults
-        exception will be raised.
+        exception will be raised. Pass the 'cursor' of a page to get the page
+        after it; otherwise the most recent listing made by this thread is
+        used.
         """
-        uri = self._paging.get("subdomain", {}).get("next_uri")
-        if uri is None:
-            raise exc.NoMoreResults("There are no more pages of subdomains "
-                    "to list.")
-        return self._list_subdomains(uri)
+        uri = self._page_uri("subdomain", "next", cursor)
+        return self._list_subdomains(uri,
+                self._cursor_domain_id("subdomain", cursor))
+
+
+    def _cursor_domain_id(self, service, cursor=None):
+        """
+        Returns the ID of the parent domain for the cursor, or for the
+        current thread's most recent listing if no cursor is given.
+        """
+        if cursor is not None:
+            return cursor.domain_id
+        return self._paging.get(service, {}).get("domain_id")
 
 
     def list_records(self, domain, limit=None, offset=None):
@@ -675,7 +1165,7 @@ class CloudDNSManager(BaseManager):
 
     def _list_records(self, uri):
         resp, body = self.api.method_get(uri)
-        self._reset_paging("record", body)
+        cursor = self._reset_paging("record", body)
         # The domain ID will be in the URL
         pat = "domains/([^/]+)/records"
         mtch = re.search(pat, uri)
@@ -683,33 +1173,30 @@ class CloudDNSManager(BaseManager):
         records = body.get("records", [])
         for record in records:
             record["domain_id"] = dom_id
-        return [CloudDNSRecord(self, record, loaded=False)
-                for record in records if record]
+        return ResultsPage([CloudDNSRecord(self, record, loaded=False)
+                for record in records if record], cursor)
 
 
-    def list_records_previous_page(self):
+    def list_records_previous_page(self, cursor=None):
         """
         When paging through record results, this will return the previous page,
         using the same limit. If there are no more results, a NoMoreResults
-        exception will be raised.
+        exception will be raised. Pass the 'cursor' of a page to get the page
+        before it; otherwise the most recent listing made by this thread is
+        used.
         """
-        uri = self._paging.get("record", {}).get("prev_uri")
-        if uri is None:
-            raise exc.NoMoreResults("There are no previous pages of records "
-                    "to list.")
-        return self._list_records(uri)
+        return self._list_records(self._page_uri("record", "prev", cursor))
 
 
-    def list_records_next_page(self):
+    def list_records_next_page(self, cursor=None):
         """
         When paging through record results, this will return the next page,
         using the same limit. If there are no more results, a NoMoreResults
-        exception will be raised.
+        exception will be raised. Pass the 'cursor' of a page to get the page
+        after it; otherwise the most recent listing made by this thread is
+        used.
         """
-        uri = self._paging.get("record", {}).get("next_uri")
-        if uri is None:
-            raise exc.NoMoreResults("There are no more pages of records to list.")
-        return self._list_records(uri)
+        return self._list_records(self._page_uri("record", "next", cursor))
 
 
     def search_records(self, domain, record_type, name=None, data=None):
@@ -729,11 +1216,10 @@ class CloudDNSManager(BaseManager):
             uri = "%s&%s" % (uri, query_string)
         resp, body = self.api.method_get(uri)
         records = body.get("records", [])
-        self._reset_paging("record", body)
-        rec_paging = self._paging.get("record", {})
-        while rec_paging.get("next_uri"):
-            resp, body = self.api.method_get(rec_paging.get("next_uri"))
-            self._reset_paging("record", body)
+        cursor = self._reset_paging("record", body)
+        while cursor.next_uri:
+            resp, body = self.api.method_get(cursor.next_uri)
+            cursor = self._reset_paging("record", body)
             records.extend(body.get("records", []))
         for record in records:
             record["domain_id"] = dom_id
@@ -741,7 +1227,7 @@ class CloudDNSManager(BaseManager):
                 for record in records if record]
 
 
-    def add_records(self, domain, records):
+    def add_records(self, domain, records, wait=True):
         """
         Adds the records to this domain. Each record should be a dict with the
         following keys:
@@ -751,6 +1237,9 @@ class CloudDNSManager(BaseManager):
             - ttl (optional)
             - comment (optional)
             - priority (required for MX and SRV records; forbidden otherwise)
+
+        If 'wait' is False, a DNSJob is returned without waiting for the
+        records to be added; its result() is the list of new records.
         """
         if isinstance(records, dict):
             # Single record passed
@@ -758,13 +1247,17 @@ class CloudDNSManager(BaseManager):
         dom_id = utils.get_id(domain)
         uri = "/domains/%s/records" % dom_id
         body = {"records": records}
-        resp, ret_body = self._async_call(uri, method="POST", body=body,
-                error_class=exc.DomainRecordAdditionFailed, has_response=False)
-        records = ret_body.get("response", {}).get("records", [])
-        for record in records:
-            record["domain_id"] = dom_id
-        return [CloudDNSRecord(self, record, loaded=False)
-                for record in records if record]
+
+        def process(resp, ret_body):
+            records = ret_body.get("response", {}).get("records", [])
+            for record in records:
+                record["domain_id"] = dom_id
+            return [CloudDNSRecord(self, record, loaded=False)
+                    for record in records if record]
+
+        return self._call_or_submit(process, uri, wait=wait, method="POST",
+                body=body, error_class=exc.DomainRecordAdditionFailed,
+                has_response=False)
 
 
     def get_record(self, domain, record):
@@ -778,9 +1271,10 @@ class CloudDNSManager(BaseManager):
 
 
     def update_record(self, domain, record, data=None, priority=None,
-            ttl=None, comment=None):
+            ttl=None, comment=None, wait=True):
         """
-        Modifies an existing record for a domain.
+        Modifies an existing record for a domain. If 'wait' is False, a DNSJob
+        for the change is returned without waiting for it to complete.
         """
         rec_id = utils.get_id(record)
         uri = "/domains/%s/records/%s" % (utils.get_id(domain), rec_id)
@@ -789,20 +1283,111 @@ class CloudDNSManager(BaseManager):
                 ("comment", comment))
         opts = [(k, v) for k, v in all_opts if v is not None]
         body.update(dict(opts))
-        resp, ret_body = self._async_call(uri, method="PUT", body=body,
+        return self._call_or_submit(_response_body, uri, wait=wait,
+                method="PUT", body=body,
                 error_class=exc.DomainRecordUpdateFailed, has_response=False)
-        return ret_body
 
 
-    def delete_record(self, domain, record):
+    def delete_record(self, domain, record, wait=True):
         """
-        Deletes an existing record for a domain.
+        Deletes an existing record for a domain. If 'wait' is False, a DNSJob
+        for the deletion is returned without waiting for it to complete.
         """
         uri = "/domains/%s/records/%s" % (utils.get_id(domain),
                 utils.get_id(record))
-        resp, ret_body = self._async_call(uri, method="DELETE",
-                error_class=exc.DomainRecordDeletionFailed, has_response=False)
-        return ret_body
+        return self._call_or_submit(_response_body, uri, wait=wait,
+                method="DELETE", error_class=exc.DomainRecordDeletionFailed,
+                has_response=False)
+
+
+    def update_records(self, domain, records, wait=True):
+        """
+        Modifies several existing records for a domain in a single call. Each
+        record should be a dict with the record's 'id' and 'name', and any
+        of 'data', 'priority', 'ttl' and 'comment' to change. If 'wait' is
+        False, a DNSJob for the change is returned without waiting for it to
+        complete.
+        """
+        uri = "/domains/%s/records" % utils.get_id(domain)
+        body = {"records": records}
+        return self._call_or_submit(_response_body, uri, wait=wait,
+                method="PUT", body=body,
+                error_class=exc.DomainRecordUpdateFailed, has_response=False)
+
+
+    def delete_records(self, domain, records, wait=True):
+        """
+        Deletes several existing records for a domain in a single call. If
+        'wait' is False, a DNSJob for the deletion is returned without
+        waiting for it to complete.
+        """
+        ids = "&".join("id=%s" % utils.get_id(record) for record in records)
+        uri = "/domains/%s/records?%s" % (utils.get_id(domain), ids)
+        return self._call_or_submit(_response_body, uri, wait=wait,
+                method="DELETE", error_class=exc.DomainRecordDeletionFailed,
+                has_response=False)
+
+
+    def reconcile(self, domain, desired_records, dry_run=False,
+            ignore_types=("NS",)):
+        """
+        Compares the current records of the domain with 'desired_records',
+        a list of record dicts in the format used by add_records(), and
+        returns a ReconcilePlan of the fewest changes that make them match.
+        Unless 'dry_run' is True, the plan is then applied.
+
+        Records are matched on their type, name and data. Where the desired
+        record has a different ttl, priority or comment, the existing record
+        is updated; settings that the desired record leaves out are not
+        changed. Leftover records of the same type and name are updated to
+        the new data instead of being deleted and added again. Records of the
+        types in 'ignore_types' are left alone; by default these are the NS
+        records, which are managed by the DNS service.
+        """
+        ignore_types = set(typ.upper() for typ in (ignore_types or ()))
+        current = {}
+        for record in RecordResultsIterator(self, domain=domain):
+            key = _record_key(record)
+            if key[0] not in ignore_types:
+                current.setdefault(key, []).append(record)
+        desired = {}
+        seen = set()
+        for record in desired_records:
+            key = _record_key(record)
+            if key[0] in ignore_types or (key, _record_data(record)) in seen:
+                continue
+            seen.add((key, _record_data(record)))
+            desired.setdefault(key, []).append(record)
+        plan = ReconcilePlan(self, domain)
+        for key in sorted(set(current) | set(desired)):
+            existing = current.get(key, [])
+            missing = []
+            for want in desired.get(key, []):
+                data = _record_data(want)
+                match = None
+                for have in existing:
+                    if _record_data(have) == data:
+                        match = have
+                        break
+                if match is None:
+                    missing.append(want)
+                    continue
+                existing.remove(match)
+                changes = _record_changes(match, want)
+                if changes:
+                    plan.updates.append((match, changes))
+                else:
+                    plan.unchanged.append(match)
+            # Change the data of leftover records rather than replacing them.
+            for have, want in zip(existing, missing):
+                changes = _record_changes(have, want)
+                changes["data"] = _record_value(want, "data")
+                plan.updates.append((have, changes))
+            plan.adds.extend(missing[len(existing):])
+            plan.deletes.extend(existing[len(missing):])
+        if not dry_run:
+            plan.apply()
+        return plan
 
 
     def _get_ptr_details(self, device, device_type):
@@ -862,9 +1447,11 @@ class CloudDNSManager(BaseManager):
         return records
 
 
-    def add_ptr_records(self, device, records):
+    def add_ptr_records(self, device, records, wait=True):
         """
-        Adds one or more PTR records to the specified device.
+        Adds one or more PTR records to the specified device. If 'wait' is
+        False, a DNSJob is returned without waiting for the records to be
+        added.
         """
         device_type = self._resolve_device_type(device)
         href, svc_name = self._get_ptr_details(device, device_type)
@@ -890,21 +1477,19 @@ class CloudDNSManager(BaseManager):
         # The Rackspace DNS team is working on changing this to return a 403
         # instead; when that happens this kludge can go away.
         try:
-            _resp, ret_body = self._async_call(uri, body=body, method="POST",
+            return self._call_or_submit(_response_records, uri, wait=wait,
+                    body=body, method="POST",
                     error_class=exc.PTRRecordCreationFailed)
         except exc.EndpointNotFound:
             raise exc.InvalidPTRRecord("The domain/IP address information is not "
                     "valid for this device.")
-        return ret_body.get("records")
-        records = [CloudDNSPTRRecord(rec, device)
-                for rec in ret_body.get("records", [])]
-        return records
 
 
     def update_ptr_record(self, device, record, domain_name, data=None,
-            ttl=None, comment=None):
+            ttl=None, comment=None, wait=True):
         """
-        Updates a PTR record with the supplied values.
+        Updates a PTR record with the supplied values. If 'wait' is False, a
+        DNSJob for the change is returned without waiting for it to complete.
         """
         device_type = self._resolve_device_type(device)
         href, svc_name = self._get_ptr_details(device, device_type)
@@ -932,28 +1517,29 @@ class CloudDNSManager(BaseManager):
                 }}
         uri = "/rdns"
         try:
-            _resp, ret_body = self._async_call(uri, body=body, method="PUT",
-                    has_response=False, error_class=exc.PTRRecordUpdateFailed)
+            return self._call_or_submit(_is_completed, uri, wait=wait,
+                    body=body, method="PUT", has_response=False,
+                    error_class=exc.PTRRecordUpdateFailed)
         except exc.EndpointNotFound as e:
             raise exc.InvalidPTRRecord("The record domain/IP address "
                     "information is not valid for this device.")
-        return ret_body.get("status") == "COMPLETED"
 
 
-    def delete_ptr_records(self, device, ip_address=None):
+    def delete_ptr_records(self, device, ip_address=None, wait=True):
         """
         Deletes the PTR records for the specified device. If 'ip_address' is
         supplied, only the PTR records with that IP address will be deleted.
+        If 'wait' is False, a DNSJob for the deletion is returned without
+        waiting for it to complete.
         """
         device_type = self._resolve_device_type(device)
         href, svc_name = self._get_ptr_details(device, device_type)
         uri = "/rdns/%s?href=%s" % (svc_name, href)
         if ip_address:
             uri = "%s&ip=%s" % (uri, ip_address)
-        _resp, ret_body = self._async_call(uri, method="DELETE",
-                has_response=False,
+        return self._call_or_submit(_is_completed, uri, wait=wait,
+                method="DELETE", has_response=False,
                 error_class=exc.PTRRecordDeletionFailed)
-        return ret_body.get("status") == "COMPLETED"
 
 
 
@@ -1004,28 +1590,59 @@ class CloudDNSClient(BaseClient):
         self._manager._set_timeout(timeout)
 
 
+    def set_polling(self, initial_delay=DEFAULT_POLL_DELAY, multiplier=2,
+            max_delay=DEFAULT_MAX_POLL_DELAY, jitter=0.1):
+        """
+        Sets how often calls check the status of the DNS system while waiting
+        for a response. The first check is made after 'initial_delay'
+        seconds; each later wait is 'multiplier' times longer, up to
+        'max_delay' seconds, and is randomly varied by up to the fraction
+        'jitter'.
+        """
+        self._manager._set_polling(PollingStrategy(initial_delay=initial_delay,
+                multiplier=multiplier, max_delay=max_delay, jitter=jitter))
+
+
+    def get_poll_count(self, job=None):
+        """
+        Returns the number of status checks made for the specified DNSJob,
+        or if no job is specified, for the most recent asynchronous call made
+        by the current thread. The count for a call made with wait=False
+        keeps increasing until the job has finished.
+        """
+        return self._manager._get_poll_count(job)
+
+
     def list(self, limit=None, offset=None):
         """Returns a list of all resources."""
         return self._manager.list(limit=limit, offset=offset)
 
 
-    def list_previous_page(self):
-        """Returns the previous page of results."""
-        return self._manager.list_previous_page()
+    def list_previous_page(self, cursor=None):
+        """
+        Returns the previous page of results. Pass the 'cursor' of a page to
+        get the page before it.
+        """
+        return self._manager.list_previous_page(cursor=cursor)
 
 
-    def list_next_page(self):
-        """Returns the next page of results."""
-        return self._manager.list_next_page()
+    def list_next_page(self, cursor=None):
+        """
+        Returns the next page of results. Pass the 'cursor' of a page to
+        get the page after it.
+        """
+        return self._manager.list_next_page(cursor=cursor)
 
 
-    def get_domain_iterator(self):
+    def get_domain_iterator(self, prefetch=False):
         """
         Returns an iterator that will return each available domain. If there are
         more than the limit of 100 domains, the iterator will continue to fetch
-        domains from the API until all domains have been returned.
+        domains from the API until all domains have been returned. If
+        'prefetch' is True, each page is requested in the background while
+        the previous one is being consumed.
         """
-        return DomainResultsIterator(self._manager)
+        return DomainResultsIterator(self._manager, prefetch=prefetch)
 
 
     @assure_domain
@@ -1115,24 +1732,33 @@ class CloudDNSClient(BaseClient):
         return domain.list_subdomains(limit=limit, offset=offset)
 
 
-    def get_subdomain_iterator(self, domain, limit=None, offset=None):
+    def get_subdomain_iterator(self, domain, limit=None, offset=None,
+            prefetch=False):
         """
         Returns an iterator that will return each available subdomain for the
         specified domain. If there are more than the limit of 100 subdomains,
         the iterator will continue to fetch subdomains from the API until all
-        subdomains have been returned.
+        subdomains have been returned. If 'prefetch' is True, each page is
+        requested in the background while the previous one is being consumed.
         """
-        return SubdomainResultsIterator(self._manager, domain=domain)
+        return SubdomainResultsIterator(self._manager, domain=domain,
+                prefetch=prefetch)
 
 
-    def list_subdomains_previous_page(self):
-        """Returns the previous page of subdomain results."""
-        return self._manager.list_subdomains_previous_page()
+    def list_subdomains_previous_page(self, cursor=None):
+        """
+        Returns the previous page of subdomain results. Pass the 'cursor' of a
+        page to get the page before it.
+        """
+        return self._manager.list_subdomains_previous_page(cursor=cursor)
 
 
-    def list_subdomains_next_page(self):
-        """Returns the next page of subdomain results."""
-        return self._manager.list_subdomains_next_page()
+    def list_subdomains_next_page(self, cursor=None):
+        """
+        Returns the next page of subdomain results. Pass the 'cursor' of a page to
+        get the page after it.
+        """
+        return self._manager.list_subdomains_next_page(cursor=cursor)
 
 
     @assure_domain
@@ -1143,24 +1769,32 @@ class CloudDNSClient(BaseClient):
         return domain.list_records(limit=limit, offset=offset)
 
 
-    def get_record_iterator(self, domain):
+    def get_record_iterator(self, domain, prefetch=False):
         """
         Returns an iterator that will return each available DNS record for the
         specified domain. If there are more than the limit of 100 records, the
         iterator will continue to fetch records from the API until all records
-        have been returned.
+        have been returned. If 'prefetch' is True, each page is requested in
+        the background while the previous one is being consumed.
         """
-        return RecordResultsIterator(self._manager, domain=domain)
+        return RecordResultsIterator(self._manager, domain=domain,
+                prefetch=prefetch)
 
 
-    def list_records_previous_page(self):
-        """Returns the previous page of record results."""
-        return self._manager.list_records_previous_page()
+    def list_records_previous_page(self, cursor=None):
+        """
+        Returns the previous page of record results. Pass the 'cursor' of a page to
+        get the page before it.
+        """
+        return self._manager.list_records_previous_page(cursor=cursor)
 
 
-    def list_records_next_page(self):
-        """Returns the next page of record results."""
-        return self._manager.list_records_next_page()
+    def list_records_next_page(self, cursor=None):
+        """
+        Returns the next page of record results. Pass the 'cursor' of a page to
+        get the page after it.
+        """
+        return self._manager.list_records_next_page(cursor=cursor)
 
 
     @assure_domain
@@ -1188,7 +1822,7 @@ class CloudDNSClient(BaseClient):
 
 
     @assure_domain
-    def add_records(self, domain, records):
+    def add_records(self, domain, records, wait=True):
         """
         Adds the records to this domain. Each record should be a dict with the
         following keys:
@@ -1198,8 +1832,11 @@ class CloudDNSClient(BaseClient):
             - ttl (optional)
             - comment (optional)
             - priority (required for MX and SRV records; forbidden otherwise)
+
+        If 'wait' is False, a DNSJob is returned without waiting for the
+        records to be added; its result() is the list of new records.
         """
-        return domain.add_records(records)
+        return domain.add_records(records, wait=wait)
 
     #Create an alias, so that adding a single record is more intuitive
     add_record = add_records
@@ -1207,20 +1844,48 @@ class CloudDNSClient(BaseClient):
 
     @assure_domain
     def update_record(self, domain, record, data=None, priority=None,
-            ttl=None, comment=None):
+            ttl=None, comment=None, wait=True):
         """
-        Modifies an existing record for a domain.
+        Modifies an existing record for a domain. If 'wait' is False, a DNSJob
+        for the change is returned without waiting for it to complete.
         """
         return domain.update_record(record, data=data,
-                priority=priority, ttl=ttl, comment=comment)
+                priority=priority, ttl=ttl, comment=comment, wait=wait)
 
 
     @assure_domain
-    def delete_record(self, domain, record):
+    def delete_record(self, domain, record, wait=True):
         """
-        Deletes an existing record for this domain.
+        Deletes an existing record for this domain. If 'wait' is False, a
+        DNSJob for the deletion is returned without waiting for it to
+        complete.
         """
-        return domain.delete_record(record)
+        return domain.delete_record(record, wait=wait)
+
+
+    def get_mirror(self, domains=None, bootstrap=True):
+        """
+        Returns a DNSMirror holding a local copy of the records of the
+        specified domains, or of all domains if 'domains' is None. Unless
+        'bootstrap' is False, the records are loaded before it is returned.
+        """
+        mirror = DNSMirror(self._manager, domains=domains)
+        if bootstrap:
+            mirror.bootstrap()
+        return mirror
+
+
+    @assure_domain
+    def reconcile(self, domain, desired_records, dry_run=False,
+            ignore_types=("NS",)):
+        """
+        Makes the records of the domain match 'desired_records', a list of
+        record dicts in the format used by add_records(), with the fewest
+        changes, made in batches. Returns the ReconcilePlan of the changes;
+        if 'dry_run' is True, the plan is returned without making them.
+        """
+        return domain.reconcile(desired_records, dry_run=dry_run,
+                ignore_types=ignore_types)
 
 
     def list_ptr_records(self, device):
@@ -1230,28 +1895,43 @@ class CloudDNSClient(BaseClient):
         return self._manager.list_ptr_records(device)
 
 
-    def add_ptr_records(self, device, records):
+    def add_ptr_records(self, device, records, wait=True):
         """
-        Adds one or more PTR records to the specified device.
+        Adds one or more PTR records to the specified device. If 'wait' is
+        False, a DNSJob is returned without waiting for the records to be
+        added.
         """
-        return self._manager.add_ptr_records(device, records)
+        return self._manager.add_ptr_records(device, records, wait=wait)
 
 
     def update_ptr_record(self, device, record, domain_name, data=None,
-            ttl=None, comment=None):
+            ttl=None, comment=None, wait=True):
         """
-        Updates a PTR record with the supplied values.
+        Updates a PTR record with the supplied values. If 'wait' is False, a
+        DNSJob for the change is returned without waiting for it to complete.
         """
         return self._manager.update_ptr_record(device, record, domain_name,
-                data=data, ttl=ttl, comment=comment)
+                data=data, ttl=ttl, comment=comment, wait=wait)
 
 
-    def delete_ptr_records(self, device, ip_address=None):
+    def delete_ptr_records(self, device, ip_address=None, wait=True):
         """
         Deletes the PTR records for the specified device. If 'ip_address'
         is supplied, only the PTR records with that IP address will be deleted.
+        If 'wait' is False, a DNSJob for the deletion is returned without
+        waiting for it to complete.
         """
-        return self._manager.delete_ptr_records(device, ip_address=ip_address)
+        return self._manager.delete_ptr_records(device, ip_address=ip_address,
+                wait=wait)
+
+
+    def wait_for_jobs(self, jobs, timeout=None):
+        """
+        Waits for all of the DNSJobs returned by calls made with wait=False,
+        and returns a list of their results in the same order. The first
+        exception raised by any of the jobs is re-raised.
+        """
+        return wait_all(jobs, timeout=timeout)
 
 
     def get_absolute_limits(self):
@@ -1280,21 +1960,285 @@ class CloudDNSClient(BaseClient):
 
 
 
+class DNSMirror(object):
+    """
+    A local copy of the records of one or more domains, indexed by domain,
+    record type and record name, so that find_record() and search_records()
+    can be answered without calling the API.
+
+    bootstrap() loads every record with one listing of each domain. After
+    that, sync() keeps the copy current by asking each domain for its
+    changes since the previous sync, and re-reading only the records that
+    changed. Call start() to sync in a background thread every 'interval'
+    seconds. The mirror can be written to disk with save() and read back
+    with DNSMirror.load(), after which a sync() brings it up to date.
+    """
+    def __init__(self, manager, domains=None, overlap=DEFAULT_MIRROR_OVERLAP):
+        self.manager = manager
+        self.domains = domains
+        self.overlap = overlap
+        self.last_sync = None
+        self.last_error = None
+        self._lock = threading.RLock()
+        # domain ID -> {record ID: record info}
+        self._records = {}
+        # (domain ID, record type, record name) -> set of record IDs
+        self._index = {}
+        # domain ID -> time of the last listing or sync of the domain
+        self._since = {}
+        self._stopped = threading.Event()
+        self._thread = None
+
+
+    def bootstrap(self):
+        """Loads all the records of the mirrored domains."""
+        domains = self.domains
+        if domains is None:
+            domains = DomainResultsIterator(self.manager)
+        for domain in domains:
+            self.load_domain(domain)
+        self.last_sync = self._now()
+
+
+    def load_domain(self, domain):
+        """Replaces the copy of the domain's records with a fresh listing."""
+        start = self._now()
+        dom_id = self._domain_id(domain)
+        records = [record._info for record in RecordResultsIterator(
+                self.manager, domain=dom_id)]
+        with self._lock:
+            self._drop_domain(dom_id)
+            self._records[dom_id] = {}
+            for info in records:
+                self._put(dom_id, info)
+            self._since[dom_id] = start
+
+
+    def sync(self):
+        """
+        Applies the changes made to each mirrored domain since it was last
+        synced, and returns the number of changes applied. If all domains
+        are mirrored, they are listed again: domains created since the last
+        sync are loaded, and those that no longer exist are dropped, each
+        counting as one change.
+        """
+        count = 0
+        dom_ids = self._since.keys()
+        if self.domains is None:
+            listed = [self._domain_id(domain)
+                    for domain in DomainResultsIterator(self.manager)]
+            with self._lock:
+                for dom_id in set(dom_ids) - set(listed):
+                    self._drop_domain(dom_id)
+                    count += 1
+            for dom_id in set(listed) - set(dom_ids):
+                self.load_domain(dom_id)
+                count += 1
+            dom_ids = set(listed) & set(dom_ids)
+        for dom_id in dom_ids:
+            count += self._sync_domain(dom_id)
+        self.last_sync = self._now()
+        return count
+
+
+    def _sync_domain(self, dom_id):
+        start = self._now()
+        since = self._since[dom_id] - datetime.timedelta(seconds=self.overlap)
+        changes = self.manager.changes_since(dom_id,
+                since.strftime(MIRROR_TIME_FORMAT))
+        record_changes = [change for change in changes
+                if change.get("targetType") == "Record"]
+        for change in changes:
+            if (change.get("targetType") == "Domain" and
+                    change.get("action") == "delete"):
+                with self._lock:
+                    self._drop_domain(dom_id)
+                return len(changes)
+        if len(record_changes) > MIRROR_RELOAD_THRESHOLD:
+            self.load_domain(dom_id)
+            return len(changes)
+        for change in record_changes:
+            rec_id = change["targetId"]
+            if change.get("action") == "delete":
+                info = None
+            else:
+                try:
+                    info = self.manager.get_record(dom_id, rec_id)
+                except exc.NotFound:
+                    # Deleted by a later change.
+                    info = None
+            with self._lock:
+                self._remove(dom_id, rec_id)
+                if info is not None:
+                    self._put(dom_id, info)
+        with self._lock:
+            if dom_id in self._since:
+                self._since[dom_id] = start
+        return len(changes)
+
+
+    def start(self, interval=60):
+        """Syncs the mirror every 'interval' seconds in a background thread."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval, ))
+        self._thread.daemon = True
+        self._thread.start()
+
+
+    def stop(self):
+        """Stops the background syncing started by start()."""
+        thread, self._thread = self._thread, None
+        self._stopped.set()
+        if thread is not None:
+            thread.join()
+
+
+    def _run(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                self.sync()
+            except Exception as e:
+                # Keep syncing; the next attempt covers the missed changes.
+                self.last_error = e
+
+
+    def search_records(self, domain, record_type, name=None, data=None):
+        """
+        Returns a list of all the domain's records that match the supplied
+        search criteria, in the same way as the API's search_records().
+        """
+        dom_id = self._domain_id(domain)
+        rec_type = record_type.upper()
+        with self._lock:
+            records = self._records.get(dom_id, {})
+            if name:
+                key = (dom_id, rec_type, name.lower().rstrip("."))
+                infos = [records[rec_id]
+                        for rec_id in self._index.get(key, ())]
+            else:
+                infos = [info for info in records.values()
+                        if _record_key(info)[0] == rec_type]
+        if data is not None:
+            infos = [info for info in infos if info.get("data") == data]
+        return [CloudDNSRecord(self.manager, dict(info), loaded=False)
+                for info in infos]
+
+
+    def find_record(self, domain, record_type, name=None, data=None):
+        """
+        Returns the single record of the domain that matches the supplied
+        search criteria.
+
+        If no record matches, a DomainRecordNotFound exception will be raised.
+        If more than one matches, a DomainRecordNotUnique exception will
+        be raised.
+        """
+        matches = self.search_records(domain, record_type, name=name,
+                data=data)
+        if not matches:
+            raise exc.DomainRecordNotFound
+        elif len(matches) > 1:
+            raise exc.DomainRecordNotUnique
+        return matches[0]
+
+
+    def save(self, path):
+        """Writes the mirror to the file at 'path'."""
+        with self._lock:
+            state = {"domains": dict((dom_id, {
+                    "since": self._since[dom_id].strftime(MIRROR_TIME_FORMAT),
+                    "records": records.values()})
+                    for dom_id, records in self._records.items())}
+            data = json.dumps(state)
+        # Write to a new file first, so that a failure doesn't leave a
+        # partial copy in place of the previous one.
+        tmp_path = "%s.tmp" % path
+        with open(tmp_path, "w") as tmp:
+            tmp.write(data)
+        os.rename(tmp_path, path)
+
+
+    @classmethod
+    def load(cls, manager, path, **kwargs):
+        """
+        Creates a mirror from a file written by save(). Call sync() on it to
+        apply any changes made since it was saved.
+        """
+        with open(path) as saved:
+            state = json.load(saved)
+        mirror = cls(manager, **kwargs)
+        with mirror._lock:
+            for dom_id, dom_state in state["domains"].items():
+                mirror._records[dom_id] = {}
+                for info in dom_state["records"]:
+                    mirror._put(dom_id, info)
+                mirror._since[dom_id] = datetime.datetime.strptime(
+                        dom_state["since"], MIRROR_TIME_FORMAT)
+        mirror.domains = mirror._records.keys()
+        return mirror
+
+
+    def _put(self, dom_id, info):
+        info = dict(info, domain_id=dom_id)
+        self._records.setdefault(dom_id, {})[info["id"]] = info
+        key = (dom_id, ) + _record_key(info)
+        self._index.setdefault(key, set()).add(info["id"])
+
+
+    def _remove(self, dom_id, rec_id):
+        info = self._records.get(dom_id, {}).pop(rec_id, None)
+        if info is None:
+            return
+        key = (dom_id, ) + _record_key(info)
+        ids = self._index.get(key)
+        if ids is not None:
+            ids.discard(rec_id)
+            if not ids:
+                del self._index[key]
+
+
+    def _drop_domain(self, dom_id):
+        for rec_id in self._records.get(dom_id, {}).keys():
+            self._remove(dom_id, rec_id)
+        self._records.pop(dom_id, None)
+        self._since.pop(dom_id, None)
+
+
+    @staticmethod
+    def _domain_id(domain):
+        # Domain IDs are kept as strings, since they are keys in the saved
+        # JSON.
+        return "%s" % utils.get_id(domain)
+
+
+    @staticmethod
+    def _now():
+        return datetime.datetime.utcnow().replace(microsecond=0)
+
+
+
 class ResultsIterator(object):
     """
     This object will iterate over all the results for a given
     type of listing, no matter how many items exist.
 
+    If 'prefetch' is True, the next page of results is requested in a
+    background thread while the current page is being consumed.
+
     This is an abstract class; subclasses must define the
     _init_methods() method.
     """
-    def __init__(self, manager, domain=None):
+    def __init__(self, manager, domain=None, prefetch=False):
         self.manager = manager
         self.domain = domain
         self.domain_id = utils.get_id(domain) if domain else None
-        self.results = []
+        self.results = collections.deque()
         self.next_uri = ""
         self.extra_args = tuple()
+        self.prefetch = prefetch
+        self._pending = None
         self._init_methods()
 
 
@@ -1312,33 +2256,63 @@ class ResultsIterator(object):
     def next(self):
         """
         Return the next available item. If there are no more items in the
-        local 'results' list, check if there is a 'next_uri' value. If so,
+        local 'results' buffer, check if there is a 'next_uri' value. If so,
         use that to get the next page of results from the API, and return
         the first item from that query.
         """
-        try:
-            return self.results.pop(0)
-        except IndexError:
-            if self.next_uri is None:
+        if not self.results:
+            if self._pending is not None:
+                pending, self._pending = self._pending, None
+                page, self.next_uri = pending.result()
+            elif self.next_uri is None:
                 raise StopIteration()
             else:
-                if not self.next_uri:
-                    if self.domain:
-                        self.results = self.list_method(self.domain)
-                    else:
-                        self.results = self.list_method()
-                else:
-                    args = self.extra_args
-                    self.results = self._list_method(self.next_uri, *args)
-                self.next_uri = self.manager._paging.get(
-                        self.paging_service, {}).get("next_uri")
+                page, self.next_uri = self._fetch_page(self.next_uri)
+            self.results.extend(page)
+            if self.prefetch and self.next_uri:
+                self._start_prefetch(self.next_uri)
         # We should have more results.
         try:
-            return self.results.pop(0)
+            return self.results.popleft()
         except IndexError:
             raise StopIteration()
 
 
+    def _fetch_page(self, next_uri):
+        """
+        Gets the page of results at 'next_uri', or the first page if that is
+        empty. Returns the results and the URI of the page after them.
+        """
+        if not next_uri:
+            if self.domain:
+                results = self.list_method(self.domain)
+            else:
+                results = self.list_method()
+        else:
+            args = self.extra_args
+            results = self._list_method(next_uri, *args)
+        cursor = getattr(results, "cursor", None)
+        return results, cursor.next_uri if cursor else None
+
+
+    def _start_prefetch(self, next_uri):
+        """Starts getting the page at 'next_uri' in a background thread."""
+        pending = AsyncResult()
+
+        def fetch():
+            try:
+                value = self._fetch_page(next_uri)
+            except Exception:
+                pending._set_result(None, sys.exc_info())
+            else:
+                pending._set_result(value)
+
+        thread = threading.Thread(target=fetch)
+        thread.daemon = True
+        thread.start()
+        self._pending = pending
+
+
 class DomainResultsIterator(ResultsIterator):
     """
     ResultsIterator subclass for iterating over all domains.
@@ -53,6 +53,11 @@ class CloudMonitoringManager(BaseManager):
     Created to override the methods _list, _get, and
     _create to change body[self.response_key] to body.
     """
+    # Listings return 100 items by default, and each page starts with the
+    # item named by the marker.
+    default_page_size = 100
+    inclusive_marker = True
+
     def _list(self, uri, obj_class=None, body=None):
         """
         Handles the communication with the API when gettings
@@ -29,6 +29,9 @@ class PyraxException(Exception):
 class AccessListIDNotFound(PyraxException):
     pass
 
+class AsyncCallTimedOut(PyraxException):
+    pass
+
 class AuthenticationFailed(PyraxException):
     pass
 
@@ -68,6 +71,9 @@ class DomainRecordUpdateFailed(PyraxException):
 class DomainUpdateFailed(PyraxException):
     pass
 
+class DownloadFailed(PyraxException):
+    pass
+
 class EndpointNotFound(PyraxException):
     pass
 
@@ -243,6 +249,19 @@ class AmbiguousEndpoints(PyraxException):
         return "AmbiguousEndpoints: %s" % repr(self.endpoints)
 
 
+class BatchCreationFailed(PyraxException):
+    """
+    Not every item in a batch could be created. The items that exist after
+    the attempt are in 'created', and the names of the rest are in 'failed'.
+    The exception raised by the request that failed is in 'cause'.
+    """
+    def __init__(self, message, created=None, failed=None, cause=None):
+        super(BatchCreationFailed, self).__init__(message)
+        self.created = created or []
+        self.failed = failed or []
+        self.cause = cause
+
+
 class ClientException(PyraxException):
     """
     The base exception class for all exceptions this library raises.
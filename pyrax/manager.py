@@ -24,6 +24,10 @@ Base utilities to build API operation managers and objects on top of.
 import contextlib
 import hashlib
 import os
+import Queue
+import sys
+import threading
+import urllib
 
 import pyrax.exceptions as exc
 import pyrax.utils as utils
@@ -47,11 +51,24 @@ class BaseManager(object):
     response_key = None
     plural_response_key = None
     uri_base = None
+    # Maps the attributes that the API can filter listings on to the query
+    # parameter used for each; findall() sends filters on these attributes
+    # to the API instead of applying them to the full listing.
+    query_filters = {}
+    # The number of items requested per page when iterating over a listing
+    # without an explicit page size. Set this to the API's default page size
+    # where it is known, so that a short page can be recognized as the last
+    # one without requesting another. If it is None, such listings are
+    # assumed to fit in a single page, and only one request is made.
+    default_page_size = None
+    # True if the API includes the item named by the marker at the start of
+    # the next page, rather than starting after it.
+    inclusive_marker = False
     _hooks_map = {}
 
 
     def __init__(self, api, resource_class=None, response_key=None,
-            plural_response_key=None, uri_base=None):
+            plural_response_key=None, uri_base=None, query_filters=None):
         self.api = api
         self.resource_class = resource_class
         self.response_key = response_key
@@ -61,22 +78,134 @@ class BaseManager(object):
             # Default to adding 's'
             self.plural_response_key = "%ss" % response_key
         self.uri_base = uri_base
+        if query_filters is not None:
+            self.query_filters = query_filters
 
 
-    def list(self, limit=None, marker=None):
-        """Gets a list of all items."""
+    def list(self, limit=None, marker=None, filters=None):
+        """
+        Gets a list of all items. 'filters' is an optional dict of query
+        parameters used to filter the listing.
+        """
         uri = "/%s" % self.uri_base
         pagination_items = []
         if limit is not None:
             pagination_items.append("limit=%s" % limit)
         if marker is not None:
             pagination_items.append("marker=%s" % marker)
+        if filters:
+            pagination_items.append(urllib.urlencode(filters))
         pagination = "&".join(pagination_items)
         if pagination:
             uri = "%s?%s" % (uri, pagination)
         return self._list(uri)
 
 
+    def iter_all(self, page_size=None, prefetch=1, filters=None):
+        """
+        Generator that yields every item, following the pagination markers
+        from one page to the next until the listing is exhausted. Each page
+        holds up to 'page_size' items; if that is not specified,
+        self.default_page_size is used. If neither is known, only the single
+        page returned by list() is read. 'filters' is passed to list() for
+        each page.
+
+        While the items of one page are being consumed, up to 'prefetch'
+        further pages are requested in a background thread. Pass
+        'prefetch=0' to fetch each page only when it is needed.
+        """
+        if prefetch < 1:
+            for page in self._iter_pages(page_size, filters=filters):
+                for item in page:
+                    yield item
+            return
+        pages = Queue.Queue(maxsize=prefetch)
+        stopped = threading.Event()
+
+        def put(val):
+            # Give up if the consumer has gone away.
+            while not stopped.is_set():
+                try:
+                    pages.put(val, timeout=0.1)
+                    return True
+                except Queue.Full:
+                    pass
+            return False
+
+        def fetch():
+            try:
+                for page in self._iter_pages(page_size, filters=filters):
+                    if not put((page, None)):
+                        return
+            except Exception:
+                put((None, sys.exc_info()))
+                return
+            put((None, None))
+
+        fetcher = threading.Thread(target=fetch)
+        fetcher.daemon = True
+        fetcher.start()
+        try:
+            while True:
+                page, exc_info = pages.get()
+                if exc_info:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+                if page is None:
+                    return
+                for item in page:
+                    yield item
+        finally:
+            stopped.set()
+
+
+    def _iter_pages(self, page_size=None, filters=None):
+        """
+        Generator that yields each page of items in turn, using the ID of the
+        last item on each page as the marker for the next. It stops at an
+        empty page, at a page shorter than the requested size, or at a page
+        that repeats the previous one, as happens with APIs that ignore the
+        marker. Without a page size there is no way to tell whether a page is
+        the last, so only the first page is read.
+        """
+        page_size = page_size or self.default_page_size
+        marker = None
+        last_ids = set()
+        kwargs = {"filters": filters} if filters else {}
+        while True:
+            page = self.list(limit=page_size, marker=marker, **kwargs)
+            num_items = len(page)
+            if (self.inclusive_marker and page and marker is not None and
+                    self._marker_for(page[0]) == marker):
+                # The last item of the previous page is repeated.
+                page = page[1:]
+            if not page:
+                return
+            ids = set(self._marker_for(item) for item in page)
+            if ids & last_ids:
+                return
+            yield page
+            if page_size is None or num_items < page_size:
+                return
+            last_ids = ids
+            marker = self._marker_for(page[-1])
+
+
+    @staticmethod
+    def _marker_for(item):
+        """
+        Returns the value used as the pagination marker for the item: its ID,
+        or its name for resources such as database users that have no ID.
+        This reads the listing data directly, so that resources that are not
+        fully loaded are not fetched just to get their marker.
+        """
+        info = getattr(item, "_info", None)
+        if isinstance(info, dict):
+            marker = info.get("id", info.get("name"))
+            if marker is not None:
+                return marker
+        return utils.get_id(item)
+
+
     def get(self, item):
         """Gets a specific item."""
         uri = "/%s/%s" % (self.uri_base, utils.get_id(item))
@@ -201,13 +330,29 @@ class BaseManager(object):
         """
         Finds all items with attributes matching ``**kwargs``.
 
-        This isn't very efficient: it loads the entire list then filters on
-        the Python side.
+        Filters on the attributes listed in self.query_filters are sent to
+        the API, so that only the matching items are listed. Any other
+        filters are applied on the Python side, which isn't very efficient,
+        since it means paging through every item that the API returns.
         """
+        query = {}
+        searches = []
+        for attr, value in kwargs.items():
+            if attr in self.query_filters:
+                query[self.query_filters[attr]] = value
+            else:
+                searches.append((attr, value))
         found = []
-        searches = kwargs.items()
-
-        for obj in self.list():
+        # Search results are usually consumed at once, so there's nothing
+        # to gain from fetching pages in the background.
+        for obj in self.iter_all(filters=query, prefetch=0):
+            # The API's filter may be looser than an exact match, so check
+            # the pushed-down filters against the listing data where it
+            # includes them. This never needs an extra request.
+            info = getattr(obj, "_info", None) or {}
+            if any(info[param] != value for param, value in query.items()
+                    if param in info):
+                continue
             try:
                 if all(getattr(obj, attr) == value
                         for (attr, value) in searches):
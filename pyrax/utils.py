@@ -4,6 +4,7 @@
 import datetime
 import fnmatch
 import hashlib
+import mmap
 import os
 import random
 import re
@@ -26,6 +27,9 @@ import pyrax
 import pyrax.exceptions as exc
 
 
+# Number of bytes read at a time when computing checksums.
+CHECKSUM_BLOCK_SIZE = 65536
+
 
 class SelfDeletingTempfile(object):
     """
@@ -89,7 +93,16 @@ class SelfDeletingTempDirectory(object):
         shutil.rmtree(self.name)
 
 
-def get_checksum(content, encoding="utf8"):
+def _update_checksum(md, chunk, encoding):
+    """Adds the chunk to the hash, encoding it first if it is unicode."""
+    try:
+        md.update(chunk)
+    except UnicodeEncodeError:
+        md.update(chunk.encode(encoding))
+
+
+def get_checksum(content, encoding="utf8", block_size=CHECKSUM_BLOCK_SIZE,
+        use_mmap=False):
     """
     Returns the MD5 checksum in hex for the given content. If 'content'
     is a file-like object, the content will be obtained from its read()
@@ -97,22 +110,33 @@ def get_checksum(content, encoding="utf8"):
     contents used. Otherwise, 'content' is assumed to be the string whose
     checksum is desired. If the content is unicode, it will be encoded
     using the specified encoding.
+
+    Files and file-like objects are read 'block_size' bytes at a time, so
+    the whole content never has to be held in memory. For file paths you
+    may pass 'use_mmap=True' to hash the file through a read-only memory
+    map instead of through read() calls.
     """
+    md = hashlib.md5()
     if hasattr(content, "read"):
         pos = content.tell()
         content.seek(0)
-        txt = content.read()
+        for chunk in iter(lambda: content.read(block_size), ""):
+            _update_checksum(md, chunk, encoding)
         content.seek(pos)
     elif os.path.isfile(content):
         with open(content, "rb") as ff:
-            txt = ff.read()
+            if use_mmap and os.fstat(ff.fileno()).st_size:
+                mm = mmap.mmap(ff.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    for offset in xrange(0, len(mm), block_size):
+                        md.update(mm[offset:offset + block_size])
+                finally:
+                    mm.close()
+            else:
+                for chunk in iter(lambda: ff.read(block_size), ""):
+                    md.update(chunk)
     else:
-        txt = content
-    md = hashlib.md5()
-    try:
-        md.update(txt)
-    except UnicodeEncodeError:
-        md.update(txt.encode(encoding))
+        _update_checksum(md, content, encoding)
     return md.hexdigest()
 
 
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright 2012 Rackspace
+
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compares the throughput and peak memory use of the ways of computing a
+file's checksum:
+
+    whole   the file is read into memory and then hashed
+    chunked pyrax.utils.get_checksum(), reading in blocks (the default)
+    mmap    pyrax.utils.get_checksum(use_mmap=True)
+
+Usage: checksum_benchmark.py [size_in_MB] [path]
+
+By default a 1024MB file of random data is created in the temp directory and
+removed afterwards; pass a path to benchmark an existing file instead. Each
+method is run in a separate process, so that its peak RSS is its own.
+"""
+
+import hashlib
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pyrax.utils as utils
+
+METHODS = ("whole", "chunked", "mmap")
+MB = 1024 * 1024
+
+
+def peak_rss_mb():
+    """Returns the peak RSS of this process in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, while OS X reports bytes.
+    if sys.platform == "darwin":
+        return rss / MB
+    return rss / 1024
+
+
+def checksum(method, path):
+    if method == "whole":
+        with open(path, "rb") as ff:
+            return hashlib.md5(ff.read()).hexdigest()
+    return utils.get_checksum(path, use_mmap=(method == "mmap"))
+
+
+def run_one(method, path):
+    """Runs in the child process; prints 'seconds peak_rss_mb checksum'."""
+    start = time.time()
+    chksum = checksum(method, path)
+    elapsed = time.time() - start
+    print elapsed, peak_rss_mb(), chksum
+
+
+def create_file(size_mb):
+    fd, path = tempfile.mkstemp(prefix="checksum_benchmark_")
+    with os.fdopen(fd, "wb") as ff:
+        for num in xrange(size_mb):
+            ff.write(os.urandom(MB))
+    return path
+
+
+def main(args):
+    size_mb = int(args[0]) if args else 1024
+    if len(args) > 1:
+        path = args[1]
+        remove = False
+    else:
+        print "Creating a %sMB file of random data..." % size_mb
+        path = create_file(size_mb)
+        remove = True
+    size_mb = os.stat(path).st_size / float(MB)
+    try:
+        checksums = set()
+        print "%-8s %10s %14s" % ("method", "MB/s", "peak RSS (MB)")
+        for method in METHODS:
+            out = subprocess.check_output([sys.executable, __file__, "--run",
+                    method, path])
+            elapsed, rss, chksum = out.split()
+            checksums.add(chksum)
+            print "%-8s %10.1f %14s" % (method, size_mb / float(elapsed), rss)
+        if len(checksums) != 1:
+            print "ERROR: the methods produced different checksums:", checksums
+            return 1
+        print "All methods produced checksum", checksums.pop()
+    finally:
+        if remove:
+            os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        run_one(sys.argv[2], sys.argv[3])
+    else:
+        sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import BaseHTTPServer
+import json
+import SocketServer
+import threading
+import unittest
+import urlparse
+
+from mock import MagicMock as Mock
+from mock import patch
+
+import pyrax.async_client as async_client
+from pyrax.client import BaseClient
+import pyrax.exceptions as exc
+from pyrax.manager import BaseManager
+from pyrax.resource import BaseResource
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers requests for a single 'widget' resource type."""
+    protocol_version = "HTTP/1.1"
+    widgets = {"1": {"id": "1", "name": "first"},
+            "2": {"id": "2", "name": "second"}}
+
+    def _respond(self, status, body=None):
+        data = json.dumps(body) if body is not None else ""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        if path == "/widgets":
+            params = urlparse.parse_qs(query)
+            marker = params.get("marker", [""])[0]
+            widgets = [self.widgets[wid] for wid in sorted(self.widgets)
+                    if wid > marker]
+            return self._respond(200, {"widgets": widgets})
+        wid = self.path.split("/")[-1]
+        if wid in self.widgets:
+            return self._respond(200, {"widget": self.widgets[wid]})
+        self._respond(404, {"itemNotFound": {"message": "No such widget",
+                "code": 404}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path.endswith("/action"):
+            return self._respond(202, body)
+        widget = {"id": "3", "name": body["widget"]["name"]}
+        self._respond(202, {"widget": widget})
+
+    def do_DELETE(self):
+        self._respond(204)
+
+    def log_message(self, *args):
+        pass
+
+
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+
+class AsyncClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(("127.0.0.1", 0), StubHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        save_conf = BaseClient._configure_manager
+        BaseClient._configure_manager = Mock()
+        clt = BaseClient(user="fake", password="fake", tenant_id="fake",
+                auth_url="http://example.com",
+                management_url="http://127.0.0.1:%s" % self.server.server_port,
+                auth_token="fake")
+        BaseClient._configure_manager = save_conf
+        clt.user_agent = "pyrax-test"
+        clt._create_body = lambda name: {"widget": {"name": name}}
+        clt._manager = BaseManager(clt, resource_class=BaseResource,
+                response_key="widget", uri_base="widgets")
+        self.client = clt
+        self.async_client = async_client.AsyncBaseClient(clt, max_workers=4)
+
+    def tearDown(self):
+        self.async_client.shutdown()
+        # Close the keep-alive connections so that the handlers exit.
+        self.client.http_pool.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_list_get(self):
+        aclt = self.async_client
+        listing = aclt.list()
+        gets = [aclt.get(wid) for wid in ("1", "2")]
+        self.assertEqual(sorted(obj.id for obj in listing.result(5)),
+                ["1", "2"])
+        first, second = async_client.wait_all(gets, timeout=5)
+        self.assertTrue(isinstance(first, BaseResource))
+        self.assertEqual((first.name, second.name), ("first", "second"))
+
+    def test_create_delete_action(self):
+        aclt = self.async_client
+        created = aclt.create("third").result(5)
+        self.assertEqual(created.id, "3")
+        self.assertEqual(created.name, "third")
+        self.assertEqual(aclt.delete("3").result(5), None)
+        resp, body = aclt.action("1", "reboot", {"type": "soft"}).result(5)
+        self.assertEqual(resp.status, 202)
+        self.assertEqual(body, {"reboot": {"type": "soft"}})
+
+    def test_error(self):
+        res = self.async_client.get("missing")
+        self.assertRaises(exc.NotFound, res.result, 5)
+        err = res.exception(5)
+        self.assertEqual(err.code, 404)
+        self.assertEqual(err.message, "No such widget")
+
+    def test_wrap_manager(self):
+        other = BaseManager(self.client, resource_class=BaseResource,
+                response_key="widget", uri_base="widgets")
+        amgr = self.async_client.wrap_manager(other)
+        self.assertEqual(amgr.get("2").result(5).name, "second")
+        self.assertEqual(len(amgr.findall(name="first").result(5)), 1)
+
+    def test_submit(self):
+        res = self.async_client.submit("get", "1")
+        self.assertEqual(res.result(5).name, "first")
+        res = self.async_client.submit(lambda x: x * 2, 21)
+        self.assertEqual(res.result(5), 42)
+
+    def test_call_all(self):
+        threads = set()
+
+        def fnc(val):
+            threads.add(threading.current_thread())
+            return val * 2
+
+        fncs = [lambda val=val: fnc(val) for val in range(5)]
+        self.assertEqual(async_client.call_all(fncs, max_workers=3),
+                [0, 2, 4, 6, 8])
+        self.assertFalse(threading.current_thread() in threads)
+        threads.clear()
+        self.assertEqual(async_client.call_all(fncs, max_workers=1),
+                [0, 2, 4, 6, 8])
+        self.assertEqual(threads, set([threading.current_thread()]))
+
+    def test_call_all_error(self):
+        called = []
+
+        def fail():
+            raise exc.NotFound(404)
+
+        fncs = [lambda: called.append(1), fail, lambda: called.append(3)]
+        self.assertRaises(exc.NotFound, async_client.call_all, fncs,
+                max_workers=2)
+        self.assertEqual(sorted(called), [1, 3])
+
+    def test_executor_green_only_when_patched(self):
+        fake_eventlet = Mock()
+        with patch.object(async_client, "eventlet", fake_eventlet):
+            fake_eventlet.patcher.is_monkey_patched.return_value = False
+            executor = async_client.AsyncExecutor(max_workers=2)
+            self.assertIsNone(executor._green_pool)
+            self.assertEqual(executor.submit(lambda: 42).result(5), 42)
+            executor.shutdown()
+            fake_eventlet.patcher.is_monkey_patched.assert_called_with(
+                    "thread")
+            # Callers can opt in to green threads explicitly...
+            executor = async_client.AsyncExecutor(max_workers=2,
+                    use_green=True)
+            self.assertIs(executor._green_pool,
+                    fake_eventlet.GreenPool.return_value)
+            fake_eventlet.GreenPool.assert_called_once_with(2)
+            # ...and they are used by default once threading is patched.
+            fake_eventlet.patcher.is_monkey_patched.return_value = True
+            executor = async_client.AsyncExecutor(max_workers=2)
+            self.assertIsNotNone(executor._green_pool)
+            executor = async_client.AsyncExecutor(max_workers=2,
+                    use_green=False)
+            self.assertIsNone(executor._green_pool)
+        with patch.object(async_client, "eventlet", None):
+            executor = async_client.AsyncExecutor(max_workers=2,
+                    use_green=True)
+            self.assertIsNone(executor._green_pool)
+
+    def test_callback(self):
+        received = []
+        done = threading.Event()
+
+        def callback(res):
+            received.append(res.result())
+            done.set()
+
+        blocker = threading.Event()
+        res = self.async_client.submit(blocker.wait)
+        self.assertFalse(res.done())
+        self.assertRaises(exc.AsyncCallTimedOut, res.result, 0.01)
+        res.add_done_callback(callback)
+        blocker.set()
+        done.wait(5)
+        self.assertEqual(received, [True])
+        # Callbacks added after the call finishes are run immediately.
+        res.add_done_callback(callback)
+        self.assertEqual(received, [True, True])
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,12 +2,15 @@
 # -*- coding: utf-8 -*-
 
 import os
+import StringIO
 import unittest
+import urllib
 
 from mock import patch
 from mock import MagicMock as Mock
 
 import pyrax
+from pyrax.cf_wrapper.client import _bulk_delete
 from pyrax.cf_wrapper.client import _swift_client
 from pyrax.cf_wrapper.container import Container
 import pyrax.utils as utils
@@ -255,19 +258,135 @@ class CF_ClientTest(unittest.TestCase):
 
     def test_delete_container(self):
         client = self.client
+        client.connection.head_container = Mock()
         client.connection.delete_container = Mock()
-        client.get_container_object_names = Mock()
-        client.get_container_object_names.return_value = ["o1", "o2", "o3"]
-        client.delete_object = Mock()
+        client.connection.get_container = Mock(side_effect=[({},
+                [{"name": "o1"}, {"name": "o2"}, {"name": "o3"}]), ({}, [])])
+        client.connection.get_capabilities = Mock(return_value={})
+        client.connection.delete_object = Mock()
         client.delete_container(self.cont_name)
-        self.assertEqual(client.get_container_object_names.call_count, 0)
+        self.assertEqual(client.connection.get_container.call_count, 0)
         client.connection.delete_container.assert_called_with(self.cont_name)
         # Now call with del_objects=True
-        client.delete_container(self.cont_name, True)
-        self.assertEqual(client.get_container_object_names.call_count, 1)
-        self.assertEqual(client.delete_object.call_count, 3)
+        client.delete_container(self.cont_name, True, concurrency=1)
+        self.assertEqual(client.connection.get_container.call_count, 2)
+        self.assertEqual(client.connection.delete_object.call_count, 3)
         client.connection.delete_container.assert_called_with(self.cont_name)
 
+    def test_delete_all_objects(self):
+        client = self.client
+        client.connection.head_container = Mock()
+        pages = [[{"name": "o%s" % num} for num in xrange(pg * 4, pg * 4 + 4)]
+                for pg in xrange(3)]
+        client.connection.get_container = Mock(
+                side_effect=[({}, page) for page in pages] + [({}, [])])
+        client.connection.get_capabilities = Mock(return_value={})
+        notfound = _swift_client.ClientException("", http_status=404)
+        failure = _swift_client.ClientException("", http_status=409)
+
+        def fake_delete(cont, name):
+            if name == "o5":
+                raise notfound
+            if name == "o9":
+                raise failure
+
+        client.connection.delete_object = Mock(side_effect=fake_delete)
+        gwc = client._get_worker_client
+        client._get_worker_client = Mock(return_value=client)
+        ret = client.delete_all_objects(self.cont_name, concurrency=3)
+        self.assertEqual(ret, {"deleted": 11, "failed": 1,
+                "errors": [("o9", failure)]})
+        self.assertEqual(client.connection.delete_object.call_count, 12)
+        self.assertEqual(client._get_worker_client.call_count, 3)
+        # The whole listing was followed, page by page.
+        markers = [cl[1]["marker"]
+                for cl in client.connection.get_container.call_args_list]
+        self.assertEqual(markers, [None, "o3", "o7", "o11"])
+        client._get_worker_client = gwc
+
+    def test_delete_all_objects_bulk(self):
+        client = self.client
+        client.connection.head_container = Mock()
+        names = [u"o%s\u00e9" % num for num in xrange(5)]
+        client.connection.get_container = Mock(side_effect=[({},
+                [{"name": name} for name in names]), ({}, [])])
+        client.connection.get_capabilities = Mock(return_value={
+                "bulk_delete": {"max_deletes_per_request": 2}})
+        client.connection.delete_object = Mock()
+        bodies = []
+
+        def fake_retry(reset, fnc, data):
+            self.assertEqual(fnc.__name__, "_bulk_delete")
+            bodies.append(data)
+            num = len(data.split("\n"))
+            if len(bodies) == 1:
+                return {"Number Deleted": num - 1, "Number Not Found": 0,
+                        "Response Status": "400 Bad Request",
+                        "Errors": [["/x/y", "409 Conflict"]]}
+            return {"Number Deleted": num - 1, "Number Not Found": 1,
+                    "Response Status": "200 OK", "Errors": []}
+
+        client.connection._retry = Mock(side_effect=fake_retry)
+        ret = client.delete_all_objects(self.cont_name, concurrency=1)
+        self.assertEqual(ret, {"deleted": 4, "failed": 1,
+                "errors": [("y", "409 Conflict")]})
+        self.assertEqual(len(bodies), 3)
+        self.assertEqual(bodies[2], "/%s/o4%%C3%%A9" %
+                urllib.quote(self.cont_name.encode("utf-8")))
+        self.assertFalse(client.connection.delete_object.called)
+        # Bulk deletes can be turned off.
+        client.connection.get_container = Mock(side_effect=[({},
+                [{"name": name} for name in names]), ({}, [])])
+        ret = client.delete_all_objects(self.cont_name, concurrency=1,
+                use_bulk=False)
+        self.assertEqual(ret, {"deleted": 5, "failed": 0, "errors": []})
+        self.assertEqual(client.connection.delete_object.call_count, 5)
+
+    def test_delete_all_objects_bulk_batch_failed(self):
+        client = self.client
+        client.connection.head_container = Mock()
+        client.connection.get_container = Mock(side_effect=[({},
+                [{"name": "o%s" % num} for num in xrange(3)]), ({}, [])])
+        client.connection.get_capabilities = Mock(return_value={
+                "bulk_delete": {"max_deletes_per_request": 10}})
+        # The middleware reports a failed batch in the body of a 200.
+        client.connection._retry = Mock(return_value={"Number Deleted": 0,
+                "Number Not Found": 0, "Response Status": "401 Unauthorized",
+                "Response Body": "", "Errors": []})
+        ret = client.delete_all_objects(self.cont_name, concurrency=1)
+        self.assertEqual(ret, {"deleted": 0, "failed": 3,
+                "errors": [(None, "401 Unauthorized")]})
+
+    def test_get_bulk_delete_max(self):
+        client = self.client
+        client.connection.url = "https://example.com/v1/acct"
+        client.connection.get_capabilities = Mock(side_effect=[
+                exc.ClientException(500), {"bulk_delete":
+                {"max_deletes_per_request": 5}}])
+        # A failed lookup falls back to individual deletes, and is retried.
+        self.assertEqual(client._get_bulk_delete_max(), 0)
+        self.assertEqual(client._get_bulk_delete_max(), 5)
+        self.assertEqual(client._get_bulk_delete_max(), 5)
+        # The storage URL is passed, and the result is cached.
+        client.connection.get_capabilities.assert_called_with(
+                "https://example.com/v1/acct")
+        self.assertEqual(client.connection.get_capabilities.call_count, 2)
+
+    def test_bulk_delete_request(self):
+        conn = Mock()
+        resp = conn.getresponse.return_value
+        resp.status = 200
+        resp.read.return_value = '{"Number Deleted": 1, "Errors": []}'
+        parsed = Mock(path="/v1/acct")
+        ret = _bulk_delete("url", "token", "/c/o", http_conn=(parsed, conn))
+        self.assertEqual(ret["Number Deleted"], 1)
+        args = conn.request.call_args[0]
+        self.assertEqual(args[:3], ("DELETE", "/v1/acct?bulk-delete", "/c/o"))
+        self.assertEqual(args[3]["X-Auth-Token"], "token")
+        resp.status = 404
+        self.assertRaises(_swift_client.ClientException, _bulk_delete, "url",
+                "token", "/c/o", http_conn=(parsed, conn))
+
     @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
     def test_delete_object(self):
         client = self.client
@@ -296,9 +415,7 @@ class CF_ClientTest(unittest.TestCase):
         client = self.client
         client.connection.head_container = Mock()
         cont = client.get_container(self.cont_name)
-        cont.client.connection.get_container = Mock()
-        cont.client.connection.get_container.return_value = ({},
-                [{"name": "o1"}, {"name": "o2"}])
+        cont.client.connection.head_object = Mock(return_value={})
         obj = client.get_object(self.cont_name, "o1")
         self.assertEqual(obj.name, "o1")
 
@@ -316,6 +433,82 @@ class CF_ClientTest(unittest.TestCase):
         self.assertEqual(client.connection.put_object.call_count, 1)
         client.get_object = gobj
 
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_store_object_no_tempfile(self):
+        client = self.client
+        client.connection.head_container = Mock()
+        client.connection.put_object = Mock()
+        content = u"something with ü†ƒ-8"
+        encoded = content.encode("utf-8")
+        with patch.object(utils, "SelfDeletingTempfile") as sdt:
+            with patch("tempfile.SpooledTemporaryFile") as stf:
+                ret = client.store_object(self.cont_name, self.obj_name,
+                        content, return_none=True)
+                self.assertFalse(sdt.called)
+                self.assertFalse(stf.called)
+        self.assertIsNone(ret)
+        client.connection.put_object.assert_called_once_with(self.cont_name,
+                self.obj_name, contents=encoded, content_length=len(encoded),
+                content_type=None, etag=None)
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_store_object_buffers(self):
+        client = self.client
+        client.connection.head_container = Mock()
+        client.connection.put_object = Mock()
+        content = "0123456789"
+        for data in (bytearray(content), memoryview(content),
+                ["0123", u"456", "789"]):
+            client.store_object(self.cont_name, self.obj_name, data,
+                    return_none=True)
+            kwargs = client.connection.put_object.call_args[1]
+            self.assertEqual(kwargs["contents"], content)
+            self.assertEqual(kwargs["content_length"], 10)
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_store_object_file_like(self):
+        client = self.client
+        client.connection.head_container = Mock()
+        client.connection.put_object = Mock()
+        fileobj = StringIO.StringIO("0123456789")
+        fileobj.seek(4)
+        client.store_object(self.cont_name, self.obj_name, fileobj,
+                return_none=True)
+        kwargs = client.connection.put_object.call_args[1]
+        self.assert_(kwargs["contents"] is fileobj)
+        self.assertEqual(kwargs["content_length"], 6)
+        self.assertFalse(fileobj.closed)
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_store_object_unsized_stream(self):
+        client = self.client
+        client.connection.head_container = Mock()
+        received = []
+
+        def fake_put(cont, name, contents=None, content_length=None,
+                content_type=None, etag=None):
+            received.append((contents.read(), content_length))
+
+        client.connection.put_object = Mock(side_effect=fake_put)
+        gen = (chunk for chunk in ("abc", u"def", "ghi"))
+        client.store_object(self.cont_name, self.obj_name, gen,
+                return_none=True)
+        self.assertEqual(received, [("abcdefghi", 9)])
+
+        class Pipe(object):
+            def __init__(self, data):
+                self.data = StringIO.StringIO(data)
+
+            def read(self, size=-1):
+                return self.data.read(size)
+
+        received[:] = []
+        client.spool_size = 4
+        client.store_object(self.cont_name, self.obj_name, Pipe("0123456789"),
+                return_none=True)
+        self.assertEqual(received, [("0123456789", 10)])
+        del client.spool_size
+
     @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
     def test_upload_file(self):
         client = self.client
@@ -357,6 +550,115 @@ class CF_ClientTest(unittest.TestCase):
             self.assertEqual(client.connection.put_object.call_count, 3)
         client.get_object = gobj
 
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_upload_file_segments(self):
+        client = self.client
+        client.connection.head_container = Mock()
+        stored = {}
+
+        def fake_put(cont, name, contents=None, content_length=None,
+                content_type=None, headers=None, etag=None):
+            if contents is None:
+                stored[name] = headers
+                return None
+            data = contents.read(content_length)
+            stored[name] = data
+            return utils.get_checksum(data)
+
+        client.connection.put_object = Mock(side_effect=fake_put)
+        cont = client.get_container(self.cont_name)
+        contents = "0123456789" * 10
+        with utils.SelfDeletingTempfile() as tmpname:
+            with open(tmpname, "wb") as tmp:
+                tmp.write(contents)
+            client.upload_file(cont, tmpname, obj_name="big", segment_size=30,
+                    return_none=True)
+        self.assertEqual(client.connection.put_object.call_count, 5)
+        self.assertEqual(stored["big.1"], contents[:30])
+        self.assertEqual(stored["big.4"], contents[90:])
+        self.assertEqual("".join(stored["big.%s" % num] for num in range(1, 5)),
+                contents)
+        manifest = stored["big"]["X-Object-Manifest"]
+        self.assert_(manifest.endswith("/big."))
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_upload_file_segments_concurrent(self):
+        client = self.client
+        client.connection.head_container = Mock()
+        stored = {}
+
+        def fake_put(cont, name, contents=None, content_length=None,
+                content_type=None, headers=None, etag=None):
+            if contents is not None:
+                # Read in small chunks to interleave the threads.
+                chunks = []
+                chunk = contents.read(7)
+                while chunk:
+                    chunks.append(chunk)
+                    chunk = contents.read(7)
+                stored[name] = "".join(chunks)
+                return utils.get_checksum(stored[name])
+
+        client.connection.put_object = Mock(side_effect=fake_put)
+        gwc = client._get_worker_client
+        client._get_worker_client = Mock(return_value=client)
+        cont = client.get_container(self.cont_name)
+        contents = "".join(chr(65 + (num % 26)) for num in xrange(1000))
+        with utils.SelfDeletingTempfile() as tmpname:
+            with open(tmpname, "wb") as tmp:
+                tmp.write(contents)
+            client.upload_file(cont, tmpname, obj_name="big", segment_size=64,
+                    concurrency=4, return_none=True)
+        self.assertEqual(client._get_worker_client.call_count, 4)
+        names = sorted(nm for nm in stored)
+        self.assertEqual(len(names), 16)
+        self.assertEqual("".join(stored[nm] for nm in names), contents)
+        client._get_worker_client = gwc
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_upload_file_segments_bad_etag(self):
+        client = self.client
+        client.connection.head_container = Mock()
+
+        def fake_put(cont, name, contents=None, content_length=None,
+                content_type=None, headers=None, etag=None):
+            if contents is not None:
+                contents.read(content_length)
+                return "0000"
+
+        client.connection.put_object = Mock(side_effect=fake_put)
+        cont = client.get_container(self.cont_name)
+        with utils.SelfDeletingTempfile() as tmpname:
+            with open(tmpname, "wb") as tmp:
+                tmp.write("x" * 100)
+            self.assertRaises(exc.UploadFailed, client.upload_file, cont,
+                    tmpname, obj_name="big", segment_size=30)
+        # The manifest must not be written if a segment failed.
+        self.assertEqual(client.connection.put_object.call_count, 4)
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_upload_file_segments_no_worker_client(self):
+        client = self.client
+        client.connection.head_container = Mock()
+        client.connection.put_object = Mock()
+        gwc = client._get_worker_client
+        err = exc.AuthenticationFailed("bad")
+        # One of the two workers can't get a client.
+        client._get_worker_client = Mock(side_effect=[client, err])
+        cont = client.get_container(self.cont_name)
+        with utils.SelfDeletingTempfile() as tmpname:
+            with open(tmpname, "wb") as tmp:
+                tmp.write("x" * 100)
+            self.assertRaises(exc.AuthenticationFailed, client.upload_file,
+                    cont, tmpname, obj_name="big", segment_size=30,
+                    concurrency=2)
+        # The other worker uploaded every segment, but the manifest was not
+        # written.
+        self.assertEqual(client.connection.put_object.call_count, 4)
+        for cl in client.connection.put_object.call_args_list:
+            self.assertTrue(cl[1]["contents"] is not None)
+        client._get_worker_client = gwc
+
     @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
     def test_upload_folder_bad_folder(self):
         self.assertRaises(exc.FolderNotFound, self.client.upload_folder,
@@ -376,11 +678,11 @@ class CF_ClientTest(unittest.TestCase):
         upload_key, total_bytes = client.upload_folder(test_folder,
                 ignore=pat1)
         client._upload_folder_in_background.assert_called_with(test_folder,
-                None, [pat1], upload_key)
+                None, [pat1], upload_key, concurrency=1)
         upload_key, total_bytes = client.upload_folder(test_folder,
                 ignore=[pat1, pat2])
         client._upload_folder_in_background.assert_called_with(test_folder,
-                None, [pat1, pat2], upload_key)
+                None, [pat1, pat2], upload_key, concurrency=1)
         client._upload_folder_in_background = bg
         os.path.isdir = opi
 
@@ -454,6 +756,8 @@ class CF_ClientTest(unittest.TestCase):
         client._should_abort_folder_upload = Mock(return_value=False)
         upprog = client._update_progress
         client._update_progress = Mock()
+        finup = client._finish_folder_upload
+        client._finish_folder_upload = Mock()
         num_files = 10
         fake_upload_key = "abcd"
         with utils.SelfDeletingTempDirectory() as tmpdir:
@@ -467,10 +771,174 @@ class CF_ClientTest(unittest.TestCase):
             # different method
             uploader.actual_run()
             self.assertEqual(client.upload_file.call_count, num_files)
+            client._finish_folder_upload.assert_called_once_with(
+                    fake_upload_key)
         client.get_object = gobj
         client.upload_file = up
         client._should_abort_folder_upload = safu
         client._update_progress = upprog
+        client._finish_folder_upload = finup
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_upload_folder_concurrent(self):
+        client = self.client
+        up = client.upload_file
+        client.upload_file = Mock()
+        client.connection.head_container = Mock()
+        client.connection.put_container = Mock()
+        cont = client.create_container(utils.random_name())
+        gwc = client._get_worker_client
+        client._get_worker_client = Mock(return_value=client)
+        fake_upload_key = "abcd"
+        client.folder_upload_status = {fake_upload_key: {"continue": True,
+                "uploaded": 0}}
+        num_files = 10
+        with utils.SelfDeletingTempDirectory() as tmpdir:
+            for idx in xrange(num_files):
+                nm = "file%s" % idx
+                pth = os.path.join(tmpdir, nm)
+                open(pth, "w").write("test")
+            uploader = FakeFolderUploader(tmpdir, cont, "", fake_upload_key,
+                    client, concurrency=4)
+            uploader.actual_run()
+            self.assertEqual(client.upload_file.call_count, num_files)
+            self.assertEqual(client._get_worker_client.call_count, 4)
+            self.assertEqual(client.get_uploaded(fake_upload_key),
+                    num_files * len("test"))
+        client.upload_file = up
+        client._get_worker_client = gwc
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_upload_folder_concurrent_cancel(self):
+        client = self.client
+        up = client.upload_file
+        client.upload_file = Mock()
+        client.connection.head_container = Mock()
+        client.connection.put_container = Mock()
+        cont = client.create_container(utils.random_name())
+        gwc = client._get_worker_client
+        client._get_worker_client = Mock(return_value=client)
+        fake_upload_key = "abcd"
+        client.folder_upload_status = {fake_upload_key: {"continue": False,
+                "uploaded": 0}}
+        with utils.SelfDeletingTempDirectory() as tmpdir:
+            for idx in xrange(5):
+                pth = os.path.join(tmpdir, "file%s" % idx)
+                open(pth, "w").write("test")
+            uploader = FakeFolderUploader(tmpdir, cont, "", fake_upload_key,
+                    client, concurrency=3)
+            uploader.actual_run()
+            self.assertEqual(client.upload_file.call_count, 0)
+        client.upload_file = up
+        client._get_worker_client = gwc
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_upload_folder_concurrent_errors(self):
+        client = self.client
+        up = client.upload_file
+        client.connection.head_container = Mock()
+        client.connection.put_container = Mock()
+        cont = client.create_container(utils.random_name())
+        gwc = client._get_worker_client
+        client._get_worker_client = Mock(return_value=client)
+        fake_upload_key = "abcd"
+        client.folder_upload_status = {fake_upload_key: {"continue": True,
+                "uploaded": 0, "errors": [], "done": False}}
+        err = exc.UploadFailed("bad")
+
+        def fake_upload(cont, pth, obj_name=None, return_none=False):
+            if obj_name == "file1":
+                raise err
+
+        client.upload_file = fake_upload
+        with utils.SelfDeletingTempDirectory() as tmpdir:
+            for idx in xrange(5):
+                pth = os.path.join(tmpdir, "file%s" % idx)
+                open(pth, "w").write("test")
+            uploader = FakeFolderUploader(tmpdir, cont, "", fake_upload_key,
+                    client, concurrency=3)
+            uploader.actual_run()
+            self.assertEqual(client.get_uploaded(fake_upload_key),
+                    4 * len("test"))
+            errors = client.get_upload_errors(fake_upload_key)
+            self.assertEqual(errors, [(os.path.join(tmpdir, "file1"),
+                    "file1", err)])
+            self.assertEqual(uploader.errors, errors)
+            self.assertTrue(client.is_folder_upload_done(fake_upload_key))
+        client.upload_file = up
+        client._get_worker_client = gwc
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_upload_folder_serial_errors(self):
+        client = self.client
+        up = client.upload_file
+        client.connection.head_container = Mock()
+        client.connection.put_container = Mock()
+        cont = client.create_container(utils.random_name())
+        fake_upload_key = "abcd"
+        client.folder_upload_status = {fake_upload_key: {"continue": True,
+                "uploaded": 0, "errors": [], "done": False}}
+        err = exc.UploadFailed("bad")
+
+        def fake_upload(cont, pth, obj_name=None, return_none=False):
+            if obj_name.endswith("file1"):
+                raise err
+
+        client.upload_file = fake_upload
+        with utils.SelfDeletingTempDirectory() as tmpdir:
+            for idx in xrange(3):
+                pth = os.path.join(tmpdir, "file%s" % idx)
+                open(pth, "w").write("test")
+            uploader = FakeFolderUploader(tmpdir, cont, "", fake_upload_key,
+                    client)
+            uploader.actual_run()
+            # The other files are still uploaded.
+            self.assertEqual(client.get_uploaded(fake_upload_key),
+                    2 * len("test"))
+            self.assertEqual(client.get_upload_errors(fake_upload_key),
+                    [(os.path.join(tmpdir, "file1"), "file1", err)])
+            self.assertTrue(client.is_folder_upload_done(fake_upload_key))
+        client.upload_file = up
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_upload_folder_concurrent_no_worker_client(self):
+        client = self.client
+        up = client.upload_file
+        client.upload_file = Mock()
+        client.connection.head_container = Mock()
+        client.connection.put_container = Mock()
+        cont = client.create_container(utils.random_name())
+        gwc = client._get_worker_client
+        err = exc.AuthenticationFailed("bad")
+        client._get_worker_client = Mock(side_effect=err)
+        fake_upload_key = "abcd"
+        client.folder_upload_status = {fake_upload_key: {"continue": True,
+                "uploaded": 0, "errors": [], "done": False}}
+        with utils.SelfDeletingTempDirectory() as tmpdir:
+            # More files than the queue holds, so the walk would block if
+            # the workers stopped draining it.
+            for idx in xrange(20):
+                pth = os.path.join(tmpdir, "file%s" % idx)
+                open(pth, "w").write("test")
+            uploader = FakeFolderUploader(tmpdir, cont, "", fake_upload_key,
+                    client, concurrency=2)
+            uploader.actual_run()
+            self.assertEqual(client.upload_file.call_count, 0)
+            self.assertEqual(client.get_upload_errors(fake_upload_key),
+                    [(None, None, err), (None, None, err)])
+            self.assertTrue(client.is_folder_upload_done(fake_upload_key))
+        client.upload_file = up
+        client._get_worker_client = gwc
+
+    def test_get_worker_client(self):
+        client = self.client
+        conn = client.connection
+        wclt = client._get_worker_client()
+        self.assertFalse(wclt is client)
+        self.assertFalse(wclt.connection is conn)
+        self.assertEqual(wclt.connection.url, conn.url)
+        self.assertEqual(wclt.connection.token, conn.token)
+        self.assert_(client.connection is conn)
 
     @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
     def test_valid_upload_key(self):
@@ -486,7 +954,7 @@ class CF_ClientTest(unittest.TestCase):
         clt.upload_file = Mock()
         clt.connection.head_container = Mock()
         clt.connection.put_container = Mock()
-        clt.get_container_objects = Mock(return_value=[])
+        clt.connection.get_container = Mock(return_value=({}, []))
         cont_name = utils.random_name(8)
         cont = clt.create_container(cont_name)
         num_files = 7
@@ -506,7 +974,7 @@ class CF_ClientTest(unittest.TestCase):
         clt.upload_file = Mock()
         clt.connection.head_container = Mock()
         clt.connection.put_container = Mock()
-        clt.get_container_objects = Mock(return_value=[])
+        clt.connection.get_container = Mock(return_value=({}, []))
         cont_name = utils.random_name(8)
         cont = clt.create_container(cont_name)
         num_vis_files = 4
@@ -532,7 +1000,7 @@ class CF_ClientTest(unittest.TestCase):
         clt.upload_file = Mock()
         clt.connection.head_container = Mock()
         clt.connection.put_container = Mock()
-        clt.get_container_objects = Mock(return_value=[])
+        clt.connection.get_container = Mock(return_value=({}, []))
         cont_name = utils.random_name(8)
         cont = clt.create_container(cont_name)
         num_files = 3
@@ -554,20 +1022,85 @@ class CF_ClientTest(unittest.TestCase):
         clt.upload_file = up
 
     @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
-    def test_delete_objects_not_in_list(self):
+    def test_sync_folder_to_container_diff(self):
+        clt = self.client
+        up = clt.upload_file
+        clt.upload_file = Mock()
+        clt.delete_object = Mock()
+        clt.connection.head_container = Mock()
+        clt.connection.put_container = Mock()
+        cont_name = utils.random_name(8)
+        cont = clt.create_container(cont_name)
+        same_etag = utils.get_checksum("test")
+        remote = [{"name": "same", "hash": same_etag, "bytes": 4,
+                    "last_modified": "2013-01-01T00:00:00.000000"},
+                {"name": "changed", "hash": "0000", "bytes": 4,
+                    "last_modified": "2013-01-01T00:00:00.000000"},
+                {"name": "remote_only", "hash": "0000", "bytes": 4,
+                    "last_modified": "2013-01-01T00:00:00.000000"}]
+        clt.connection.get_container = Mock(side_effect=[({}, remote),
+                ({}, [])])
+        with utils.SelfDeletingTempDirectory() as tmpdir:
+            for nm in ("same", "changed", "local_only"):
+                pth = os.path.join(tmpdir, nm)
+                open(pth, "w").write("test")
+            actions = clt.sync_folder_to_container(tmpdir, cont, delete=True,
+                    ignore_timestamps=True)
+            plan = dict((act[2], act[0]) for act in actions)
+            self.assertEqual(plan, {"same": "skip", "changed": "upload",
+                    "local_only": "upload", "remote_only": "delete"})
+            self.assertEqual(clt.upload_file.call_count, 2)
+            clt.delete_object.assert_called_once_with(cont, "remote_only")
+        # The listing is paged with the last name as the marker.
+        self.assertEqual(clt.connection.get_container.call_count, 2)
+        clt.connection.get_container.assert_called_with(cont_name,
+                marker="remote_only", prefix=None, limit=None)
+        clt.upload_file = up
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_sync_folder_to_container_size_first(self):
+        clt = self.client
+        clt.connection.head_container = Mock()
+        clt.connection.put_container = Mock()
+        cont = clt.create_container(utils.random_name(8))
+        remote = {"same": (utils.get_checksum("test"), None, 4),
+                "resized": ("0000", None, 10)}
+        sav = utils.get_checksum
+        utils.get_checksum = Mock(side_effect=sav)
+        try:
+            with utils.SelfDeletingTempDirectory() as tmpdir:
+                for nm in ("same", "resized", "local_only"):
+                    open(os.path.join(tmpdir, nm), "w").write("test")
+                actions = clt._sync_folder_to_container(tmpdir, cont, remote,
+                        delete=False, include_hidden=False, ignore=None,
+                        ignore_timestamps=True)
+                # Only the file whose size matches is checksummed.
+                utils.get_checksum.assert_called_once_with(
+                        os.path.join(tmpdir, "same"))
+        finally:
+            utils.get_checksum = sav
+        plan = dict((act[2], (act[0], act[3])) for act in actions)
+        self.assertEqual(plan, {"same": ("skip", remote["same"][0]),
+                "resized": ("upload", None), "local_only": ("upload", None)})
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_iter_objects(self):
         client = self.client
         client.connection.head_container = Mock()
-        cont = client.get_container(self.cont_name)
-        objs = [FakeStorageObject(client, cont, name="First"),
-                FakeStorageObject(client, cont, name="Second")]
-        cont.get_objects = Mock(return_value=objs)
-        good_names = ["First", "Third"]
-        client._local_files = good_names
-        client.delete_object = Mock()
-        client._delete_objects_not_in_list(cont)
-        client.delete_object.assert_called_with(container=cont.name,
-                name="Second")
-
+        pages = [[{"name": "o1", "bytes": 1}, {"subdir": "sub/"},
+                {"name": "o2", "bytes": 2}], [{"name": "o3", "bytes": 3}], []]
+        client.connection.get_container = Mock(
+                side_effect=[({}, page) for page in pages])
+        objs = client.iter_objects(self.cont_name, prefix="o", page_size=3)
+        first = objs.next()
+        self.assertEqual(first.name, "o1")
+        # Only the first page has been requested so far.
+        self.assertEqual(client.connection.get_container.call_count, 1)
+        rest = list(objs)
+        self.assertEqual([obj.name for obj in rest], ["o2", "o3"])
+        self.assertEqual(rest[1].total_bytes, 3)
+        client.connection.get_container.assert_called_with(self.cont_name,
+                marker="o3", prefix="o", limit=3)
 
     @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
     def test_copy_object(self):
@@ -575,9 +1108,7 @@ class CF_ClientTest(unittest.TestCase):
         client.connection.head_container = Mock()
         cont = client.get_container(self.cont_name)
         client.connection.put_object = Mock()
-        cont.client.connection.get_container = Mock()
-        cont.client.connection.get_container.return_value = ({},
-                [{"name": "o1"}, {"name": "o2"}])
+        cont.client.connection.head_object = Mock(return_value={})
         client.copy_object(self.cont_name, "o1", "newcont")
         client.connection.put_object.assert_called_with("newcont", "o1",
                 contents=None, headers={"X-Copy-From": "/%s/o1" %
@@ -589,9 +1120,7 @@ class CF_ClientTest(unittest.TestCase):
         client.connection.head_container = Mock()
         cont = client.get_container(self.cont_name)
         client.connection.put_object = Mock(return_value="0000")
-        cont.client.connection.get_container = Mock()
-        cont.client.connection.get_container.return_value = ({},
-                [{"name": "o1"}, {"name": "o2"}])
+        cont.client.connection.head_object = Mock(return_value={})
         client.delete_object = Mock()
         client.move_object(self.cont_name, "o1", "newcont")
         client.connection.put_object.assert_called_with("newcont", "o1",
@@ -605,9 +1134,7 @@ class CF_ClientTest(unittest.TestCase):
         client.connection.head_container = Mock()
         cont = client.get_container(self.cont_name)
         client.connection.put_object = Mock(return_value="0000")
-        cont.client.connection.get_container = Mock()
-        cont.client.connection.get_container.return_value = ({},
-                [{"name": "o1"}, {"name": "o2"}])
+        cont.client.connection.head_object = Mock(return_value={})
         client.change_object_content_type(self.cont_name, "o1",
                 "something/else")
         client.connection.put_object.assert_called_with(self.cont_name, "o1",
@@ -623,6 +1150,141 @@ class CF_ClientTest(unittest.TestCase):
         self.assertEqual(len(resp), 2)
         self.assertEqual(resp[1], text)
 
+    def _fake_ranged_get(self, content, requests=None):
+        def fake_get(cont, obj, resp_chunk_size=None, headers=None):
+            if requests is not None:
+                requests.append(headers)
+            start, end = headers["Range"].split("=")[1].split("-")
+            data = content[int(start):int(end) + 1]
+            chunks = [data[pos:pos + 3] for pos in xrange(0, len(data), 3)]
+            return ({}, iter(chunks))
+        return fake_get
+
+    def test_download_object(self):
+        client = self.client
+        content = utils.random_name(100, ascii_only=True)
+        etag = utils.get_checksum(content)
+        client.connection.head_object = Mock(return_value={
+                "content-length": "100", "etag": etag})
+        requests = []
+        client.connection.get_object = Mock(
+                side_effect=self._fake_ranged_get(content, requests))
+        gwc = client._get_worker_client
+        client._get_worker_client = Mock(return_value=client)
+        with utils.SelfDeletingTempfile() as tmpname:
+            client.download_object(self.cont_name, self.obj_name, tmpname,
+                    concurrency=3, part_size=30)
+            with open(tmpname, "rb") as ff:
+                self.assertEqual(ff.read(), content)
+        self.assertEqual(client._get_worker_client.call_count, 3)
+        self.assertEqual(sorted(hdr["Range"] for hdr in requests),
+                ["bytes=0-29", "bytes=30-59", "bytes=60-89", "bytes=90-99"])
+        self.assert_(all(hdr["If-Match"] == etag for hdr in requests))
+        client._get_worker_client = gwc
+
+    def test_download_object_bad_etag(self):
+        client = self.client
+        content = "0123456789"
+        client.connection.head_object = Mock(return_value={
+                "content-length": "10", "etag": "0000"})
+        client.connection.get_object = Mock(
+                side_effect=self._fake_ranged_get(content))
+        with utils.SelfDeletingTempDirectory() as tmpdir:
+            tmpname = os.path.join(tmpdir, "dl")
+            self.assertRaises(exc.DownloadFailed, client.download_object,
+                    self.cont_name, self.obj_name, tmpname, part_size=4)
+            self.assertFalse(os.path.exists(tmpname))
+
+    def test_download_object_short_part(self):
+        client = self.client
+        client.connection.head_object = Mock(return_value={
+                "content-length": "10", "etag": "0000"})
+        client.connection.get_object = Mock(return_value=({}, iter(["abc"])))
+        with utils.SelfDeletingTempDirectory() as tmpdir:
+            tmpname = os.path.join(tmpdir, "dl")
+            self.assertRaises(exc.DownloadFailed, client.download_object,
+                    self.cont_name, self.obj_name, tmpname, part_size=4)
+            self.assertFalse(os.path.exists(tmpname))
+
+    def test_download_object_manifest(self):
+        client = self.client
+        content = "0123456789"
+        client.connection.head_object = Mock(return_value={
+                "content-length": "10", "etag": '"0000"',
+                "x-object-manifest": "cont/obj."})
+        requests = []
+        client.connection.get_object = Mock(
+                side_effect=self._fake_ranged_get(content, requests))
+        with utils.SelfDeletingTempfile() as tmpname:
+            client.download_object(self.cont_name, self.obj_name, tmpname,
+                    part_size=4)
+            with open(tmpname, "rb") as ff:
+                self.assertEqual(ff.read(), content)
+        self.assertFalse([hdr for hdr in requests if "If-Match" in hdr])
+
+    def test_download_object_resume(self):
+        client = self.client
+        content = utils.random_name(100, ascii_only=True)
+        client.connection.head_object = Mock(return_value={
+                "content-length": "100", "etag": utils.get_checksum(content),
+                "last-modified": "Wed, 10 Oct 2012 16:06:25 GMT"})
+        requests = []
+        good_get = self._fake_ranged_get(content, requests)
+
+        def flaky_get(cont, obj, resp_chunk_size=None, headers=None):
+            if headers["Range"] == "bytes=60-89":
+                return ({}, iter([content[60:65]]))
+            return good_get(cont, obj, resp_chunk_size=resp_chunk_size,
+                    headers=headers)
+
+        client.connection.get_object = Mock(side_effect=flaky_get)
+        with utils.SelfDeletingTempDirectory() as tmpdir:
+            tmpname = os.path.join(tmpdir, "dl")
+            journal = tmpname + client.download_journal_suffix
+            self.assertRaises(exc.DownloadFailed, client.download_object,
+                    self.cont_name, self.obj_name, tmpname, part_size=30,
+                    resume=True)
+            # The partial download is kept for the next attempt.
+            self.assert_(os.path.exists(tmpname))
+            self.assert_(os.path.exists(journal))
+            requests[:] = []
+            client.connection.get_object = Mock(side_effect=good_get)
+            client.download_object(self.cont_name, self.obj_name, tmpname,
+                    part_size=30, resume=True)
+            self.assertEqual([hdr["Range"] for hdr in requests],
+                    ["bytes=60-89"])
+            with open(tmpname, "rb") as ff:
+                self.assertEqual(ff.read(), content)
+            self.assertFalse(os.path.exists(journal))
+
+    def test_download_object_resume_changed(self):
+        client = self.client
+        content = "0123456789"
+        client.connection.head_object = Mock(return_value={
+                "content-length": "10", "etag": utils.get_checksum(content)})
+        requests = []
+        client.connection.get_object = Mock(
+                side_effect=self._fake_ranged_get(content, requests))
+        with utils.SelfDeletingTempDirectory() as tmpdir:
+            tmpname = os.path.join(tmpdir, "dl")
+            journal = tmpname + client.download_journal_suffix
+            with open(tmpname, "wb") as ff:
+                ff.write("x" * 10)
+            with open(journal, "w") as ff:
+                ff.write('{"etag": "old"}\n0\n5\n')
+            client.download_object(self.cont_name, self.obj_name, tmpname,
+                    part_size=5, resume=True)
+            self.assertEqual(len(requests), 2)
+            with open(tmpname, "rb") as ff:
+                self.assertEqual(ff.read(), content)
+
+    def test_download_object_missing(self):
+        client = self.client
+        client.connection.head_object = Mock(
+                side_effect=_swift_client.ClientException("", http_status=404))
+        self.assertRaises(exc.NoSuchObject, client.download_object,
+                self.cont_name, self.obj_name, "/tmp/nowhere")
+
     @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
     def test_get_all_containers(self):
         client = self.client
@@ -9,6 +9,7 @@ from mock import patch
 from mock import MagicMock as Mock
 
 import pyrax
+from pyrax.cf_wrapper.client import _swift_client
 from pyrax.cf_wrapper.container import Container
 import pyrax.utils as utils
 import pyrax.exceptions as exc
@@ -123,15 +124,55 @@ class CF_ContainerTest(unittest.TestCase):
         self.assertEqual(len(objs), 2)
         self.assert_("o1" in [objs[0].name, objs[1].name])
 
+    def test_iter_objects(self):
+        cont = self.container
+        cont.client.iter_objects = Mock(return_value=iter([]))
+        cont.iter_objects(prefix="p", page_size=5)
+        cont.client.iter_objects.assert_called_once_with(cont, prefix="p",
+                page_size=5)
+
     @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
     def test_get_object(self):
         cont = self.container
         cont.client.connection.get_container = Mock()
-        cont.client.connection.get_container.return_value = ({},
-                [{"name": "o1"}, {"name": "o2"}])
+        cont.client.connection.head_object = Mock()
+        cont.client.connection.head_object.return_value = {
+                "content-length": "42", "content-type": "text/plain",
+                "etag": "0000", "last-modified": "Tue, 16 Apr 2013 18:51:27 GMT"}
+        obj = cont.get_object("o2")
+        self.assertEqual(obj.name, "o2")
+        self.assertEqual(obj.total_bytes, 42)
+        self.assertEqual(obj.etag, "0000")
+        self.assertEqual(obj.last_modified, "2013-04-16T18:51:27")
+        cont.client.connection.head_object.assert_called_once_with(
+                cont.name, "o2")
+        self.assertEqual(cont.client.connection.get_container.call_count, 0)
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_get_object_missing(self):
+        cont = self.container
+        cont.client.connection.get_container = Mock()
+        cont.client.connection.head_object = Mock(
+                side_effect=_swift_client.ClientException("", http_status=404))
         self.assertRaises(exc.NoSuchObject, cont.get_object, "missing")
+        self.assertEqual(cont.client.connection.get_container.call_count, 0)
+
+    @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
+    def test_get_object_listing_fallback(self):
+        cont = self.container
+        cont.client.connection.head_object = Mock(
+                side_effect=_swift_client.ClientException("", http_status=500))
+        cont.client.connection.get_container = Mock()
+        cont.client.connection.get_container.return_value = ({},
+                [{"name": "o2"}])
         obj = cont.get_object("o2")
         self.assertEqual(obj.name, "o2")
+        cont.client.connection.get_container.assert_called_once_with(
+                cont.name, marker=None, limit=1, prefix="o2", delimiter=None,
+                full_listing=False)
+        cont.client.connection.get_container.return_value = ({},
+                [{"name": "o2/sub"}])
+        self.assertRaises(exc.NoSuchObject, cont.get_object, "o3")
 
     @patch('pyrax.cf_wrapper.client.Container', new=FakeContainer)
     def test_store_object(self):
@@ -181,11 +222,13 @@ class CF_ContainerTest(unittest.TestCase):
         client = cont.client
         cont.client.connection.head_container = Mock()
         cont.client.connection.delete_object = Mock()
-        cont.client.get_container_object_names = Mock(
-                return_value=[self.obj_name])
-        cont.delete_all_objects()
+        cont.client.connection.get_container = Mock(side_effect=[
+                ({}, [{"name": self.obj_name}]), ({}, [])])
+        cont.client.connection.get_capabilities = Mock(return_value={})
+        ret = cont.delete_all_objects(concurrency=1)
         cont.client.connection.delete_object.assert_called_with(
                 self.cont_name, self.obj_name)
+        self.assertEqual(ret, {"deleted": 1, "failed": 0, "errors": []})
 
     def test_delete(self):
         cont = self.container
@@ -53,7 +53,9 @@ class CF_StorageObjectTest(unittest.TestCase):
         self.client.connection.head_object = Mock()
         objs = [{"name": self.obj_name, "content_type": "test/test",
                 "bytes": 444, "hash": "abcdef0123456789"}]
-        self.client.connection.head_object.return_value = ({}, objs)
+        self.client.connection.head_object.return_value = {
+                "content-type": "test/test", "content-length": "444",
+                "etag": "abcdef0123456789"}
         self.client.connection.get_container.return_value = ({}, objs)
         self.storage_object = self.client.get_object(self.container, "testobj")
         self.client._container_cache = {}
@@ -105,6 +107,15 @@ class CF_StorageObjectTest(unittest.TestCase):
         ret = obj.get(include_meta=True)
         self.assertEqual(ret, (meta, data))
 
+    def test_download(self):
+        obj = self.storage_object
+        obj.client.download_object = Mock()
+        obj.download("/tmp/dest", concurrency=4, resume=True)
+        obj.client.download_object.assert_called_once_with(
+                container=obj.container.name, obj_name=obj.name,
+                dest_path="/tmp/dest", concurrency=4, part_size=None,
+                resume=True)
+
     def test_delete(self):
         obj = self.storage_object
         obj.client.connection.delete_object = Mock()
@@ -6,6 +6,8 @@ import httplib2
 import json
 import os
 import pkg_resources
+import threading
+import time
 import unittest
 import urllib2
 
@@ -247,6 +249,64 @@ class ClientTest(unittest.TestCase):
         exc.from_response = savexc
         httplib2.Http.request = sav
 
+    def test_request_pooled(self):
+        clt = self.client
+        clt.http_log_debug = False
+        fakeresp = fakes.FakeResponse()
+        fakeresp.status = 200
+        sav = httplib2.Http.request
+        httplib2.Http.request = Mock(return_value=(fakeresp, ""))
+        clt.follow_all_redirects = True
+        clt.request("http://example.com/a", "GET")
+        clt.request("http://example.com/b", "GET")
+        clt.request("http://other.com/", "GET")
+        idle = clt.http_pool._idle
+        self.assertEqual(len(idle[("http", "example.com")]), 1)
+        self.assertEqual(len(idle[("http", "other.com")]), 1)
+        http = idle[("http", "example.com")][0][0]
+        self.assertTrue(http.follow_all_redirects)
+        self.assertFalse(http is clt)
+        # A connection that fails is not returned to the pool.
+        httplib2.Http.request = Mock(side_effect=IOError)
+        self.assertRaises(IOError, clt.request, "http://example.com/a", "GET")
+        self.assertEqual(len(idle[("http", "example.com")]), 0)
+        self.assertEqual(clt.http_pool._counts[("http", "example.com")], 0)
+        httplib2.Http.request = sav
+
+    def test_http_pool_max_size(self):
+        pool = client.HttpPool(Mock, max_size=2)
+        host = ("https", "example.com")
+        first = pool.checkout(host)
+        second = pool.checkout(host)
+        self.assertFalse(first is second)
+        received = []
+        waiter = threading.Thread(target=lambda:
+                received.append(pool.checkout(host)))
+        waiter.start()
+        waiter.join(0.1)
+        # Both instances are in use, so the third checkout has to wait.
+        self.assertTrue(waiter.is_alive())
+        pool.checkin(host, first)
+        waiter.join(5)
+        self.assertEqual(received, [first])
+        self.assertEqual(pool._counts[host], 2)
+
+    def test_http_pool_idle_timeout(self):
+        pool = client.HttpPool(Mock, idle_timeout=30)
+        host = ("https", "example.com")
+        conn = Mock()
+        old = Mock(connections={"a": conn})
+        new = Mock(connections={})
+        pool._idle[host] = [(old, time.time() - 60), (new, time.time())]
+        pool._counts[host] = 2
+        self.assertTrue(pool.checkout(host) is new)
+        conn.close.assert_called_once_with()
+        self.assertEqual(pool._counts[host], 1)
+        pool.checkin(host, new)
+        pool.clear()
+        self.assertEqual(pool._counts[host], 0)
+        self.assertEqual(pool._idle, {})
+
     def test_time_request(self):
         clt = self.client
         sav = clt.request
@@ -2,11 +2,14 @@
 # -*- coding: utf-8 -*-
 
 import random
+import threading
+import time
 import unittest
 
 from mock import patch
 from mock import MagicMock as Mock
 
+import pyrax
 import pyrax.cloudblockstorage
 from pyrax.cloudblockstorage import CloudBlockStorageClient
 from pyrax.cloudblockstorage import CloudBlockStorageVolume
@@ -98,6 +101,23 @@ class CloudBlockStorageTest(unittest.TestCase):
         vol = CloudBlockStorageVolume(fakes.FakeManager(), {})
         self.assertTrue(isinstance(vol, CloudBlockStorageVolume))
 
+    def test_nova_volumes_shared(self):
+        clt = self.client
+        clt.region_name = "DFW"
+        sav = pyrax.connect_to_cloudservers
+        pyrax.connect_to_cloudservers = Mock()
+        vol1 = CloudBlockStorageVolume(clt._manager, {"id": "1"}, loaded=True)
+        vol2 = CloudBlockStorageVolume(clt._manager, {"id": "2"}, loaded=True)
+        self.assertFalse(pyrax.connect_to_cloudservers.called)
+        nova_volumes = pyrax.connect_to_cloudservers.return_value.volumes
+        vol1.attach_to_instance("srv", "/dev/xvdb")
+        vol2.attach_to_instance("srv", "/dev/xvdc")
+        pyrax.connect_to_cloudservers.assert_called_once_with("DFW")
+        nova_volumes.create_server_volume.assert_any_call("srv", "2",
+                "/dev/xvdc")
+        self.assertTrue(vol1._nova_volumes is vol2._nova_volumes)
+        pyrax.connect_to_cloudservers = sav
+
     def test_attach_to_instance(self):
         vol = self.volume
         inst = fakes.FakeServer()
@@ -290,6 +310,121 @@ class CloudBlockStorageTest(unittest.TestCase):
         vol.detach.assert_called_once_with()
         vol.delete_all_snapshots.assert_called_once_with()
 
+    def test_volume_list_snapshots(self):
+        clt = self.client
+        vol = CloudBlockStorageVolume(clt._manager, {"id": "v1"}, loaded=True)
+        mgr = vol._snapshot_manager
+        snaps = [CloudBlockStorageSnapshot(mgr, {"id": "s1",
+                "volume_id": "v1"}), CloudBlockStorageSnapshot(mgr,
+                {"id": "s2", "volume_id": "v2"})]
+        mgr.list = Mock(side_effect=[snaps, []])
+        ret = vol.list_snapshots()
+        self.assertEqual([snap.id for snap in ret], ["s1"])
+        mgr.list.assert_any_call(limit=None, marker=None,
+                filters={"volume_id": "v1"})
+
+    def test_volume_delete_all_snapshots(self):
+        vol = self.volume
+        snaps = [Mock() for idx in range(3)]
+        vol.list_snapshots = Mock(return_value=snaps)
+        vol.delete_all_snapshots()
+        vol.list_snapshots.assert_called_once_with()
+        for snap in snaps:
+            snap.delete.assert_called_once_with()
+
+    def test_volume_delete_all_snapshots_passed(self):
+        vol = self.volume
+        snaps = [Mock() for idx in range(2)]
+        vol.list_snapshots = Mock()
+        vol.delete_all_snapshots(snapshots=snaps)
+        self.assertFalse(vol.list_snapshots.called)
+        for snap in snaps:
+            snap.delete.assert_called_once_with()
+
+    def test_client_get_snapshot_index(self):
+        clt = self.client
+        snaps = [fakes.FakeBlockStorageSnapshot() for idx in range(3)]
+        for snap, vol_id in zip(snaps, ("v1", "v2", "v1")):
+            snap.volume_id = vol_id
+        clt._snaps_manager.iter_all = Mock(return_value=iter(snaps))
+        index = clt.get_snapshot_index()
+        self.assertEqual(index, {"v1": [snaps[0], snaps[2]],
+                "v2": [snaps[1]]})
+
+    def test_client_delete_volumes(self):
+        clt = self.client
+        vols = [fakes.FakeBlockStorageVolume() for idx in range(2)]
+        for vol in vols:
+            vol.delete = Mock()
+            vol.detach = Mock()
+        clt.get_snapshot_index = Mock()
+        clt.delete_volumes(vols, concurrency=2)
+        self.assertFalse(clt.get_snapshot_index.called)
+        for vol in vols:
+            vol.delete.assert_called_once_with()
+            self.assertFalse(vol.detach.called)
+
+    def test_client_delete_volumes_force(self):
+        clt = self.client
+        vols = [fakes.FakeBlockStorageVolume() for idx in range(2)]
+        for vol in vols:
+            vol.delete = Mock()
+            vol.detach = Mock()
+        snap = Mock()
+        other = Mock()
+        clt.get_snapshot_index = Mock(return_value={vols[0].id: [snap],
+                "other": [other]})
+        clt._manager.get = Mock(return_value=vols[1])
+        clt.delete_volumes([vols[0], vols[1].id], force=True, concurrency=2)
+        clt._manager.get.assert_called_once_with(vols[1].id)
+        clt.get_snapshot_index.assert_called_once_with()
+        snap.delete.assert_called_once_with()
+        self.assertFalse(other.delete.called)
+        for vol in vols:
+            vol.detach.assert_called_once_with()
+            vol.delete.assert_called_once_with()
+
+    def test_client_delete_volumes_force_many_snapshots(self):
+        clt = self.client
+        vols = [fakes.FakeBlockStorageVolume() for idx in range(3)]
+        index = {}
+        active = {}
+        deleted = []
+        overlaps = []
+        lock = threading.Lock()
+        for vol in vols:
+            vol.delete = Mock()
+            vol.detach = Mock()
+            active[vol.id] = 0
+            index[vol.id] = []
+            for num in range(4):
+                snap = Mock()
+
+                def delete(vol_id=vol.id, name="%s-%s" % (vol.id, num)):
+                    # The API rejects a second concurrent delete for the
+                    # snapshots of one volume.
+                    with lock:
+                        active[vol_id] += 1
+                        if active[vol_id] > 1:
+                            overlaps.append(name)
+                    time.sleep(0.01)
+                    with lock:
+                        active[vol_id] -= 1
+                        deleted.append(name)
+
+                snap.delete = Mock(side_effect=delete)
+                index[vol.id].append(snap)
+        clt.get_snapshot_index = Mock(return_value=index)
+        clt.delete_volumes(vols, force=True, concurrency=3)
+        self.assertEqual(overlaps, [])
+        self.assertEqual(len(deleted), 12)
+        for vol in vols:
+            # Each volume's snapshots were deleted in order.
+            self.assertEqual([name for name in deleted
+                    if name.rsplit("-", 1)[0] == vol.id],
+                    ["%s-%s" % (vol.id, num) for num in range(4)])
+            vol.delete.assert_called_once_with()
+
     def test_client_create_snapshot(self):
         clt = self.client
         vol = self.volume
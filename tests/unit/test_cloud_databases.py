@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import unittest
+import urlparse
 
 from mock import patch
 from mock import MagicMock as Mock
@@ -11,6 +12,8 @@ from pyrax import CloudDatabaseDatabase
 from pyrax import CloudDatabaseFlavor
 from pyrax import CloudDatabaseInstance
 from pyrax import CloudDatabaseUser
+from pyrax.clouddatabases import CloudDatabaseEntityManager
+from pyrax.clouddatabases import CloudDatabaseVolume
 from pyrax.clouddatabases import assure_instance
 import pyrax.exceptions as exc
 import pyrax.utils as utils
@@ -54,6 +57,54 @@ class CloudDatabasesTest(unittest.TestCase):
                 "volume": {"size": 1, "used": 0.2}})
         self.assertTrue(isinstance(inst, CloudDatabaseInstance))
 
+    @patch("pyrax.manager.BaseManager", new=fakes.FakeManager)
+    def test_instance_lazy_load(self):
+        mgr = fakes.FakeManager()
+        full = CloudDatabaseInstance(mgr, {"id": 42, "hostname": "fake",
+                "volume": {"size": 1, "used": 0.2}}, loaded=True)
+        mgr.get = Mock(return_value=full)
+        inst = CloudDatabaseInstance(mgr, {"id": 42, "name": "fake"},
+                loaded=False)
+        self.assertFalse(mgr.get.called)
+        self.assertEqual(inst.hostname, "fake")
+        mgr.get.assert_called_once_with(inst)
+        self.assertTrue(isinstance(inst.volume, CloudDatabaseVolume))
+        self.assertEqual(inst.volume.used, 0.2)
+
+    def test_list_no_details(self):
+        clt = self.client
+        mgr = clt._manager
+        mgr.api.method_get = Mock(return_value=(None,
+                {"instances": [{"id": idx} for idx in range(3)]}))
+        mgr.get = Mock()
+        ret = clt.list()
+        self.assertEqual(len(ret), 3)
+        self.assertEqual(mgr.api.method_get.call_count, 1)
+        self.assertFalse(mgr.get.called)
+
+    def test_list_details(self):
+        clt = self.client
+        mgr = clt._manager
+        insts = [CloudDatabaseInstance(mgr, {"id": idx}, loaded=False)
+                for idx in range(3)]
+        mgr._list = Mock(return_value=insts)
+        mgr.get = Mock(side_effect=lambda inst: CloudDatabaseInstance(mgr,
+                {"id": inst.id, "hostname": "host%s" % inst.id}, loaded=True))
+        ret = clt.list(details=True, concurrency=2)
+        self.assertEqual(mgr.get.call_count, 3)
+        self.assertEqual([inst.hostname for inst in ret],
+                ["host0", "host1", "host2"])
+        self.assertTrue(all(inst.loaded for inst in ret))
+
+    def test_load_details_serial(self):
+        mgr = self.client._manager
+        insts = [CloudDatabaseInstance(mgr, {"id": idx}, loaded=False)
+                for idx in range(2)]
+        insts[0].loaded = True
+        mgr.get = Mock(return_value=None)
+        mgr.load_details(insts, concurrency=1)
+        mgr.get.assert_called_once_with(insts[1])
+
     def test_list_databases(self):
         inst = self.instance
         sav = inst._database_manager.list
@@ -70,28 +121,57 @@ class CloudDatabasesTest(unittest.TestCase):
         inst._user_manager.list.assert_called_once_with()
         inst._user_manager.list = sav
 
+    def _entity_manager(self, resource_class, response_key, names):
+        mgr = CloudDatabaseEntityManager(self.client,
+                resource_class=resource_class, response_key=response_key,
+                uri_base="instances/fake/%ss" % response_key)
+        mgr._list = Mock(return_value=[resource_class(mgr, {"name": name})
+                for name in names])
+        return mgr
+
+    def _paged_entity_manager(self, resource_class, response_key, names):
+        mgr = self._entity_manager(resource_class, response_key, [])
+
+        def fake_list(uri):
+            query = urlparse.parse_qs(urlparse.urlparse(uri).query)
+            limit = int(query.get("limit", [20])[0])
+            marker = query.get("marker", [None])[0]
+            start = names.index(marker) + 1 if marker else 0
+            return [resource_class(mgr, {"name": name})
+                    for name in names[start:start + limit]]
+
+        mgr._list = Mock(side_effect=fake_list)
+        return mgr
+
+    def test_entity_manager_index_all_pages(self):
+        names = ["db%02d" % num for num in xrange(45)]
+        mgr = self._paged_entity_manager(CloudDatabaseDatabase, "database",
+                names)
+        self.assertEqual([db.name for db in mgr.list()], names)
+        self.assertEqual(mgr.find_by_name("db44").name, "db44")
+        # Three pages of 20; the short third page ends the listing.
+        self.assertEqual(mgr._list.call_count, 3)
+        self.assertEqual(mgr._list.call_args_list[1][0][0],
+                "/instances/fake/databases?limit=20&marker=db19")
+
     def test_get_database(self):
         inst = self.instance
-        sav = inst.list_databases
-        db1 = fakes.FakeEntity()
-        db1.name = "a"
-        db2 = fakes.FakeEntity()
-        db2.name = "b"
-        inst.list_databases = Mock(return_value=[db1, db2])
+        inst._database_manager = self._entity_manager(CloudDatabaseDatabase,
+                "database", ["a", "b"])
         ret = inst.get_database("a")
-        self.assertEqual(ret, db1)
-        inst.list_databases = sav
+        self.assertEqual(ret.name, "a")
+        self.assertTrue(inst.get_database("b") is not None)
+        # The second lookup uses the index.
+        self.assertEqual(inst._database_manager._list.call_count, 1)
 
     def test_get_database_bad(self):
         inst = self.instance
-        sav = inst.list_databases
-        db1 = fakes.FakeEntity()
-        db1.name = "a"
-        db2 = fakes.FakeEntity()
-        db2.name = "b"
-        inst.list_databases = Mock(return_value=[db1, db2])
+        inst._database_manager = self._entity_manager(CloudDatabaseDatabase,
+                "database", ["a", "b"])
+        inst.get_database("a")
         self.assertRaises(exc.NoSuchDatabase, inst.get_database, "z")
-        inst.list_databases = sav
+        # A name missing from the index is looked up again.
+        self.assertEqual(inst._database_manager._list.call_count, 2)
 
     def test_create_database(self):
         inst = self.instance
@@ -99,8 +179,7 @@ class CloudDatabasesTest(unittest.TestCase):
         inst._database_manager.create = Mock()
         db = inst.create_database(name="test")
         inst._database_manager.create.assert_called_once_with(name="test",
-                character_set="utf8", collate="utf8_general_ci",
-                return_none=True)
+                character_set="utf8", collate="utf8_general_ci")
         inst._database_manager.create = sav
 
     def test_create_user(self):
@@ -110,10 +189,135 @@ class CloudDatabasesTest(unittest.TestCase):
         inst.create_user(name="test", password="testpw",
                 database_names="testdb")
         inst._user_manager.create.assert_called_once_with(name="test",
-                password="testpw",
-        database_names=["testdb"], return_none=True)
+                password="testpw", database_names=["testdb"])
         inst._user_manager.create = sav
 
+    def test_entity_manager_create(self):
+        mgr = self._entity_manager(CloudDatabaseUser, "user", ["a"])
+        mgr.find_by_name("a")
+        mgr.api.method_post = Mock(return_value=(None, None))
+        user = mgr.create(name="test", password="testpw",
+                database_names=["testdb"])
+        mgr.api.method_post.assert_called_once_with("/instances/fake/users",
+                body={"users": [{"name": "test", "password": "testpw",
+                "databases": [{"name": "testdb"}]}]})
+        self.assertTrue(isinstance(user, CloudDatabaseUser))
+        self.assertEqual(user.name, "test")
+        self.assertEqual(user.databases, [{"name": "testdb"}])
+        self.assertFalse(hasattr(user, "password"))
+        self.assertTrue(mgr.find_by_name("test") is user)
+        self.assertEqual(mgr._list.call_count, 1)
+
+    def test_create_databases(self):
+        inst = self.instance
+        mgr = inst._database_manager = self._entity_manager(
+                CloudDatabaseDatabase, "database", [])
+        mgr.api.method_post = Mock(return_value=(None, None))
+        dbs = inst.create_databases(["a", {"name": "b", "collate": "c1"},
+                "c"], character_set="latin1", batch_size=2)
+        self.assertEqual([db.name for db in dbs], ["a", "b", "c"])
+        self.assertEqual(mgr.api.method_post.call_count, 2)
+        uri = "/instances/fake/databases"
+        mgr.api.method_post.assert_any_call(uri, body={"databases": [
+                {"name": "a", "character_set": "latin1",
+                "collate": "utf8_general_ci"},
+                {"name": "b", "character_set": "latin1", "collate": "c1"}]})
+        mgr.api.method_post.assert_any_call(uri, body={"databases": [
+                {"name": "c", "character_set": "latin1",
+                "collate": "utf8_general_ci"}]})
+
+    def test_create_users(self):
+        inst = self.instance
+        mgr = inst._user_manager = self._entity_manager(CloudDatabaseUser,
+                "user", [])
+        mgr.api.method_post = Mock(return_value=(None, None))
+        db = CloudDatabaseDatabase(None, {"name": "db2"})
+        users = inst.create_users([("a", "pw", "db1"),
+                {"name": "b", "password": "pw", "database_names": [db]}])
+        mgr.api.method_post.assert_called_once_with(
+                "/instances/fake/users", body={"users": [
+                {"name": "a", "password": "pw",
+                "databases": [{"name": "db1"}]},
+                {"name": "b", "password": "pw",
+                "databases": [{"name": "db2"}]}]})
+        self.assertEqual([user.name for user in users], ["a", "b"])
+        self.assertFalse(hasattr(users[0], "password"))
+
+    def test_create_databases_failed(self):
+        inst = self.instance
+        mgr = inst._database_manager = self._entity_manager(
+                CloudDatabaseDatabase, "database", [])
+        mgr.api.method_post = Mock(side_effect=[(None, None),
+                exc.BadRequest(400)])
+        mgr._list.return_value = [CloudDatabaseDatabase(mgr, {"name": nm})
+                for nm in ("a", "b")]
+        try:
+            inst.create_databases(["a", "b", "c"], batch_size=2)
+        except exc.BatchCreationFailed as e:
+            self.assertEqual([db.name for db in e.created], ["a", "b"])
+            self.assertEqual(e.failed, ["c"])
+        else:
+            self.fail("BatchCreationFailed was not raised")
+        self.assertEqual(mgr._list.call_count, 1)
+
+    def test_create_databases_failed_second_chunk(self):
+        inst = self.instance
+        # Enough databases that the new ones are on the second page.
+        names = ["db%02d" % num for num in xrange(25)] + ["a", "b"]
+        mgr = inst._database_manager = self._paged_entity_manager(
+                CloudDatabaseDatabase, "database", names)
+        err = exc.BadRequest(400)
+        mgr.api.method_post = Mock(side_effect=[(None, None), err])
+        try:
+            inst.create_databases(["a", "b", "c", "d"], batch_size=2)
+        except exc.BatchCreationFailed as e:
+            self.assertEqual([db.name for db in e.created], ["a", "b"])
+            self.assertEqual(e.failed, ["c", "d"])
+            self.assertTrue(e.cause is err)
+        else:
+            self.fail("BatchCreationFailed was not raised")
+        self.assertEqual(mgr._list.call_count, 2)
+
+    def test_create_databases_failed_no_listing(self):
+        inst = self.instance
+        mgr = inst._database_manager = self._entity_manager(
+                CloudDatabaseDatabase, "database", [])
+        err = exc.BadRequest(400)
+        mgr.api.method_post = Mock(side_effect=[(None, None), err])
+        mgr._list.side_effect = exc.OverLimit(413)
+        try:
+            inst.create_databases(["a", "b", "c"], batch_size=2)
+        except exc.BatchCreationFailed as e:
+            # The original error is kept, and the first request's databases
+            # are known to exist.
+            self.assertTrue(e.cause is err)
+            self.assertEqual([db.name for db in e.created], ["a", "b"])
+            self.assertEqual(e.failed, ["c"])
+        else:
+            self.fail("BatchCreationFailed was not raised")
+
+    def test_entity_manager_delete(self):
+        mgr = self._entity_manager(CloudDatabaseDatabase, "database",
+                ["a", "b"])
+        db = mgr.find_by_name("a")
+        mgr.api.method_delete = Mock(return_value=(None, None))
+        db.delete()
+        mgr.api.method_delete.assert_called_once_with(
+                "/instances/fake/databases/a")
+        mgr._list.return_value = [mgr._list.return_value[1]]
+        self.assertEqual(mgr.find_by_name("a"), None)
+        self.assertEqual(mgr._list.call_count, 2)
+
+    def test_sub_managers_lazy(self):
+        inst = CloudDatabaseInstance(self.client._manager, {"id": "fake"},
+                loaded=True)
+        self.assertFalse("_db_manager" in inst.__dict__)
+        self.assertFalse("_usr_manager" in inst.__dict__)
+        mgr = inst._database_manager
+        self.assertTrue(inst._database_manager is mgr)
+        self.assertEqual(mgr.uri_base, "instances/fake/databases")
+        self.assertEqual(inst._user_manager.uri_base, "instances/fake/users")
+
     def test_delete_database(self):
         inst = self.instance
         sav = inst._database_manager.delete
@@ -265,6 +469,23 @@ class CloudDatabasesTest(unittest.TestCase):
         inst.list_users.assert_called_once_with()
         inst.list_users = sav
 
+    def test_create_databases_for_instance(self):
+        clt = self.client
+        inst = self.instance
+        inst.create_databases = Mock(return_value=["db"])
+        ret = clt.create_databases(inst, ["a", "b"], batch_size=10)
+        self.assertEqual(ret, ["db"])
+        inst.create_databases.assert_called_once_with(["a", "b"],
+                character_set=None, collate=None, batch_size=10)
+
+    def test_create_users_for_instance(self):
+        clt = self.client
+        inst = self.instance
+        inst.create_users = Mock()
+        users = [("a", "pw", ["db"])]
+        clt.create_users(inst, users)
+        inst.create_users.assert_called_once_with(users, batch_size=None)
+
     def test_create_user_for_instance(self):
         clt = self.client
         inst = self.instance
@@ -312,10 +533,10 @@ class CloudDatabasesTest(unittest.TestCase):
         inst = self.instance
         good_name = utils.random_name()
         bad_name = utils.random_name()
-        user = fakes.FakeDatabaseUser(manager=None, info={"name": good_name})
-        inst.list_users = Mock(return_value=[user])
+        inst._user_manager = self._entity_manager(CloudDatabaseUser, "user",
+                [good_name])
         returned = inst.get_user(good_name)
-        self.assertEqual(returned, user)
+        self.assertEqual(returned.name, good_name)
         self.assertRaises(exc.NoSuchDatabaseUser, inst.get_user, bad_name)
 
     @patch("pyrax.manager.BaseManager", new=fakes.FakeManager)
@@ -1,7 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import datetime
+import os
 import random
+import threading
 import time
 import unittest
 
@@ -16,8 +19,14 @@ from pyrax.clouddns import CloudDNSClient
 from pyrax.clouddns import CloudDNSDomain
 from pyrax.clouddns import CloudDNSManager
 from pyrax.clouddns import CloudDNSRecord
+from pyrax.clouddns import DEFAULT_PAGE_SIZE
 from pyrax.clouddns import ResultsIterator
+from pyrax.clouddns import ResultsPage
+from pyrax.clouddns import DNSJob
+from pyrax.clouddns import DNSMirror
 from pyrax.clouddns import DomainResultsIterator
+from pyrax.clouddns import PageCursor
+from pyrax.clouddns import PollingStrategy
 from pyrax.clouddns import SubdomainResultsIterator
 from pyrax.clouddns import RecordResultsIterator
 import pyrax.exceptions as exc
@@ -62,6 +71,24 @@ class CloudDNSTest(unittest.TestCase):
         clt.set_timeout(new_timeout)
         self.assertEqual(mgr._timeout, new_timeout)
 
+    def test_set_polling(self):
+        clt = self.client
+        mgr = clt._manager
+        clt.set_polling(initial_delay=1, multiplier=3, max_delay=10, jitter=0)
+        self.assertEqual(mgr._polling.initial_delay, 1)
+        self.assertEqual(mgr._polling.multiplier, 3)
+        self.assertEqual(mgr._polling.max_delay, 10)
+        self.assertEqual(mgr._polling.jitter, 0)
+
+    def test_polling_strategy_delays(self):
+        delays = PollingStrategy(initial_delay=0.5, multiplier=2, max_delay=3,
+                jitter=0).delays()
+        self.assertEqual([delays.next() for i in range(5)],
+                [0.5, 1, 2, 3, 3])
+        delays = PollingStrategy(initial_delay=1, jitter=0.1).delays()
+        first = delays.next()
+        self.assertTrue(0.9 <= first <= 1.1)
+
     def test_reset_paging_all(self):
         clt = self.client
         mgr = clt._manager
@@ -94,6 +121,61 @@ class CloudDNSTest(unittest.TestCase):
         self.assertEqual(mgr._paging["domain"]["prev_uri"], "/domains/%s" %
                 uri_string_prev)
 
+    def test_reset_paging_cursor(self):
+        clt = self.client
+        mgr = clt._manager
+        body = {"totalEntries": 300,
+                "links": [{"href": "%s/domains?offset=100" % example_uri,
+                    "rel": "next"}]}
+        cursor = mgr._reset_paging("subdomain", body=body, domain_id="fake")
+        self.assertTrue(isinstance(cursor, PageCursor))
+        self.assertEqual(cursor.next_uri, "/domains?offset=100")
+        self.assertIsNone(cursor.prev_uri)
+        self.assertEqual(cursor.total_entries, 300)
+        self.assertEqual(cursor.domain_id, "fake")
+
+    def test_paging_per_thread(self):
+        clt = self.client
+        mgr = clt._manager
+        mgr._paging["record"]["next_uri"] = example_uri
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(
+                mgr._paging["record"]["next_uri"]))
+        thread.start()
+        thread.join()
+        self.assertEqual(seen, [None])
+        self.assertEqual(mgr._paging["record"]["next_uri"], example_uri)
+
+    def test_list_next_page_cursor(self):
+        clt = self.client
+        mgr = clt._manager
+        mgr.resource_class = CloudDNSDomain
+        next_link = {"href": "%s/domains?offset=1" % example_uri,
+                "rel": "next"}
+        clt.method_get = Mock(side_effect=[
+                ({}, {"domains": [{"name": "a"}], "links": [next_link]}),
+                ({}, {"domains": [{"name": "b"}]})])
+        first = clt.list(limit=1)
+        self.assertTrue(isinstance(first, ResultsPage))
+        self.assertEqual(first.cursor.next_uri, "/domains?offset=1")
+        # Another listing doesn't affect the cursor of the first.
+        mgr._reset_paging("domain")
+        second = clt.list_next_page(first.cursor)
+        self.assertEqual([dom.name for dom in second], ["b"])
+        clt.method_get.assert_called_with("/domains?offset=1")
+        self.assertIsNone(second.cursor.next_uri)
+        self.assertRaises(exc.NoMoreResults, clt.list_next_page,
+                second.cursor)
+
+    def test_list_subdomains_next_page_cursor(self):
+        clt = self.client
+        mgr = clt._manager
+        mgr._list_subdomains = Mock()
+        cursor = PageCursor("subdomain", next_uri=example_uri,
+                domain_id="fake_id")
+        clt.list_subdomains_next_page(cursor)
+        mgr._list_subdomains.assert_called_once_with(example_uri, "fake_id")
+
     def test_get_pagination_qs(self):
         clt = self.client
         mgr = clt._manager
@@ -111,6 +193,18 @@ class CloudDNSTest(unittest.TestCase):
         ret = clt.list()
         self.assertEqual(len(ret), 1)
 
+    def test_manager_iter_pages(self):
+        clt = self.client
+        mgr = clt._manager
+        pages = [[{"id": num, "name": "d%s" % num} for num in xrange(start,
+                min(start + 100, 250))] for start in (0, 100, 200)]
+        mgr.list = Mock(side_effect=pages)
+        ret = list(mgr.iter_all(prefetch=0))
+        self.assertEqual(len(ret), 250)
+        mgr.list.assert_has_calls([call(limit=100, offset=0),
+                call(limit=100, offset=100), call(limit=100, offset=200)])
+        self.assertEqual(mgr.list.call_count, 3)
+
     def test_manager_list_all(self):
         clt = self.client
         mgr = clt._manager
@@ -165,9 +259,10 @@ class CloudDNSTest(unittest.TestCase):
         clt = self.client
         mgr = clt._manager
         mgr._paging["subdomain"]["prev_uri"] = example_uri
+        mgr._paging["subdomain"]["domain_id"] = "fake_id"
         mgr._list_subdomains = Mock()
         clt.list_subdomains_previous_page()
-        mgr._list_subdomains.assert_called_once_with(example_uri)
+        mgr._list_subdomains.assert_called_once_with(example_uri, "fake_id")
 
     def test_list_subdomains_previous_page_fail(self):
         clt = self.client
@@ -178,9 +273,10 @@ class CloudDNSTest(unittest.TestCase):
         clt = self.client
         mgr = clt._manager
         mgr._paging["subdomain"]["next_uri"] = example_uri
+        mgr._paging["subdomain"]["domain_id"] = "fake_id"
         mgr._list_subdomains = Mock()
         clt.list_subdomains_next_page()
-        mgr._list_subdomains.assert_called_once_with(example_uri)
+        mgr._list_subdomains.assert_called_once_with(example_uri, "fake_id")
 
     def test_list_subdomains_next_page_fail(self):
         clt = self.client
@@ -263,18 +359,31 @@ class CloudDNSTest(unittest.TestCase):
     def test_manager_findall(self):
         clt = self.client
         mgr = clt._manager
-        mgr._list = Mock()
+        mgr._list = Mock(return_value=[])
         mgr.findall(name="fake")
-        mgr._list.assert_called_once_with("/domains?name=fake", list_all=True)
+        mgr._list.assert_called_once_with("/domains?limit=%s&offset=0&name=fake"
+                % DEFAULT_PAGE_SIZE)
+
+    def test_manager_findall_exact(self):
+        clt = self.client
+        mgr = clt._manager
+        dom1 = CloudDNSDomain(mgr, {"id": "1", "name": "fake"})
+        dom2 = CloudDNSDomain(mgr, {"id": "2", "name": "sub.fake"})
+        mgr.list = Mock(return_value=[dom1, dom2])
+        ret = mgr.findall(name="fake")
+        self.assertEqual(ret, [dom1])
+        mgr.list.assert_called_once_with(limit=DEFAULT_PAGE_SIZE,
+                offset=0, filters={"name": "fake"})
 
     def test_manager_findall_default(self):
         clt = self.client
         mgr = clt._manager
-        sav = BaseManager.findall
-        BaseManager.findall = Mock()
-        mgr.findall(foo="bar")
-        BaseManager.findall.assert_called_once_with(foo="bar")
-        BaseManager.findall = sav
+        dom = CloudDNSDomain(mgr, {"id": "1", "name": "fake", "foo": "bar"})
+        mgr.list = Mock(return_value=[dom])
+        ret = mgr.findall(foo="bar")
+        self.assertEqual(ret, [dom])
+        mgr.list.assert_called_once_with(limit=DEFAULT_PAGE_SIZE,
+                offset=0)
 
     def test_create_body(self):
         clt = self.client
@@ -347,6 +456,145 @@ class CloudDNSTest(unittest.TestCase):
         self.assertRaises(exc.DNSCallTimedOut, mgr._async_call, uri,
                 method="GET")
 
+    @patch("time.sleep")
+    def test_async_call_backoff(self, mock_sleep):
+        clt = self.client
+        mgr = clt._manager
+        uri = "http://example.com"
+        callback_uri = "https://fake.example.com/status/fake"
+        running = {"callbackUrl": callback_uri, "status": "RUNNING"}
+        complete = {"response": {"result": "fake"}, "status": "COMPLETE"}
+        clt.set_timeout(0)
+        clt.set_polling(initial_delay=0.5, multiplier=2, max_delay=1.5,
+                jitter=0)
+        clt.method_post = Mock(return_value=({}, running))
+        clt.method_get = Mock(side_effect=[({}, running), ({}, running),
+                ({}, running), ({}, complete)])
+        ret = mgr._async_call(uri, body={}, method="POST")
+        self.assertEqual(ret, ({}, complete["response"]))
+        self.assertEqual(mock_sleep.call_args_list,
+                [call(0.5), call(1), call(1.5), call(1.5)])
+        self.assertEqual(clt.get_poll_count(), 4)
+
+    def test_submit_async_call(self):
+        clt = self.client
+        mgr = clt._manager
+        uri = "http://example.com"
+        callback_uri = "https://fake.example.com/status/fake"
+        running = {"callbackUrl": callback_uri, "status": "RUNNING"}
+        complete = {"response": {"result": "fake"}, "status": "COMPLETE"}
+        clt.set_polling(initial_delay=0.001, jitter=0)
+        clt.method_post = Mock(return_value=({}, running))
+        clt.method_get = Mock(side_effect=[({}, running), ({}, complete)])
+        job = mgr._submit_async_call(uri, body={}, method="POST")
+        self.assertTrue(isinstance(job, DNSJob))
+        self.assertEqual(job.job_id, "fake")
+        self.assertEqual(job.result(5), ({}, complete["response"]))
+        self.assertEqual(job.poll_count, 2)
+        clt.method_get.assert_called_with("/status/fake?showDetails=true")
+
+    @patch("time.sleep")
+    def test_poll_count_per_call(self, mock_sleep):
+        clt = self.client
+        mgr = clt._manager
+        clt.set_timeout(0)
+        running = {"callbackUrl": "https://fake/status/fake",
+                "status": "RUNNING"}
+        complete = {"response": {}, "status": "COMPLETE"}
+        clt.method_post = Mock(return_value=({}, running))
+        clt.method_get = Mock(side_effect=[({}, running), ({}, complete)])
+        mgr._async_call("/fake", body={}, method="POST")
+        self.assertEqual(clt.get_poll_count(), 2)
+        # A call made by another thread doesn't change this thread's count.
+        counts = []
+
+        def other():
+            clt.method_get = Mock(return_value=({}, complete))
+            mgr._async_call("/fake", body={}, method="POST")
+            counts.append(clt.get_poll_count())
+
+        thread = threading.Thread(target=other)
+        thread.start()
+        thread.join()
+        self.assertEqual(counts, [1])
+        self.assertEqual(clt.get_poll_count(), 2)
+        # The count for a particular job can be requested.
+        clt.method_get = Mock(return_value=({}, complete))
+        job = mgr._submit_async_call("/fake", body={}, method="POST")
+        job.result(5)
+        self.assertEqual(clt.get_poll_count(job), 1)
+        # A later blocking call replaces the job as the most recent call.
+        clt.method_get = Mock(side_effect=[({}, running), ({}, running),
+                ({}, complete)])
+        mgr._async_call("/fake", body={}, method="POST")
+        self.assertEqual(clt.get_poll_count(), 3)
+
+    def test_submit_async_call_multiplexed(self):
+        clt = self.client
+        mgr = clt._manager
+        clt.set_polling(initial_delay=0.001, multiplier=1, jitter=0)
+        polls = {}
+
+        def post(uri, body):
+            return {}, {"callbackUrl": "https://fake/status/%s" % body["num"],
+                    "status": "RUNNING"}
+
+        def get(uri):
+            job_id = uri.split("/status/")[-1].split("?")[0]
+            polls[job_id] = polls.get(job_id, 0) + 1
+            # Each job needs a different number of checks to complete.
+            if polls[job_id] <= int(job_id) % 3:
+                return {}, {"status": "RUNNING"}
+            return {}, {"status": "COMPLETE", "response": {"num": job_id}}
+
+        clt.method_post = Mock(side_effect=post)
+        clt.method_get = Mock(side_effect=get)
+        process = lambda resp, body: body["num"]
+        jobs = [mgr._submit_async_call("/fake", body={"num": num},
+                method="POST", process=process) for num in range(50)]
+        results = clt.wait_for_jobs(jobs, timeout=5)
+        self.assertEqual(results, [str(num) for num in range(50)])
+        self.assertEqual([job.poll_count for job in jobs],
+                [num % 3 + 1 for num in range(50)])
+
+    def test_submit_async_call_complete(self):
+        clt = self.client
+        mgr = clt._manager
+        callback_uri = "https://fake.example.com/status/fake"
+        clt.method_delete = Mock(return_value=({}, {"callbackUrl": callback_uri,
+                "status": "COMPLETED"}))
+        clt.method_get = Mock()
+        job = mgr._submit_async_call("/fake", method="DELETE",
+                has_response=False)
+        self.assertTrue(job.done())
+        self.assertEqual(job.result()[1]["status"], "COMPLETED")
+        self.assertFalse(clt.method_get.called)
+
+    def test_submit_async_call_error(self):
+        clt = self.client
+        mgr = clt._manager
+        callback_uri = "https://fake.example.com/status/fake"
+        clt.set_polling(initial_delay=0.001)
+        clt.method_delete = Mock(return_value=({}, {"callbackUrl": callback_uri,
+                "status": "RUNNING"}))
+        clt.method_get = Mock(return_value=({}, {"status": "ERROR"}))
+        err_class = exc.DomainRecordDeletionFailed
+        mgr._process_async_error = Mock(side_effect=err_class("oops"))
+        job = mgr._submit_async_call("/fake", method="DELETE",
+                error_class=err_class)
+        self.assertRaises(err_class, job.result, 5)
+
+    def test_submit_async_call_timeout(self):
+        clt = self.client
+        mgr = clt._manager
+        callback_uri = "https://fake.example.com/status/fake"
+        clt.set_timeout(0.01)
+        clt.set_polling(initial_delay=0.001)
+        clt.method_get = Mock(return_value=({}, {"callbackUrl": callback_uri,
+                "status": "RUNNING"}))
+        job = mgr._submit_async_call("/fake", method="GET")
+        self.assertRaises(exc.DNSCallTimedOut, job.result, 5)
+
     def test_async_call_error(self):
         clt = self.client
         mgr = clt._manager
@@ -624,6 +872,255 @@ class CloudDNSTest(unittest.TestCase):
                 error_class=exc.DomainRecordDeletionFailed,
                 has_response=False)
 
+    def test_add_records_nowait(self):
+        clt = self.client
+        mgr = clt._manager
+        dom = self.domain
+        job = DNSJob("/fake", "/status/fake")
+        mgr._submit_async_call = Mock(return_value=job)
+        recs = [{"type": "A", "name": "example.com", "data": "0.0.0.0"}]
+        ret = clt.add_records(dom, recs, wait=False)
+        self.assertTrue(ret is job)
+        process = mgr._submit_async_call.call_args[1]["process"]
+        added = process({}, {"response": {"records": recs}})
+        self.assertTrue(isinstance(added[0], CloudDNSRecord))
+        self.assertEqual(added[0].domain_id, dom.id)
+
+    def test_update_records(self):
+        clt = self.client
+        mgr = clt._manager
+        dom = self.domain
+        mgr._async_call = Mock(return_value=({}, {}))
+        recs = [{"id": "A-1", "name": "example.com", "ttl": 600}]
+        mgr.update_records(dom, recs)
+        mgr._async_call.assert_called_once_with(
+                "/domains/%s/records" % utils.get_id(dom), method="PUT",
+                body={"records": recs},
+                error_class=exc.DomainRecordUpdateFailed, has_response=False)
+
+    def test_delete_records(self):
+        clt = self.client
+        mgr = clt._manager
+        dom = self.domain
+        mgr._async_call = Mock(return_value=({}, {}))
+        mgr.delete_records(dom, ["A-1", "A-2"])
+        mgr._async_call.assert_called_once_with(
+                "/domains/%s/records?id=A-1&id=A-2" % utils.get_id(dom),
+                method="DELETE", error_class=exc.DomainRecordDeletionFailed,
+                has_response=False)
+
+    def _current_records(self, mgr, dom):
+        recs = [{"id": "A-1", "type": "A", "name": "www.example.com",
+                    "data": "192.0.2.1", "ttl": 300},
+                {"id": "A-2", "type": "A", "name": "old.example.com",
+                    "data": "192.0.2.2", "ttl": 300},
+                {"id": "CNAME-1", "type": "CNAME", "name": "ftp.example.com",
+                    "data": "www.example.com", "ttl": 300},
+                {"id": "MX-1", "type": "MX", "name": "example.com",
+                    "data": "mail.example.com", "priority": 10, "ttl": 300},
+                {"id": "NS-1", "type": "NS", "name": "example.com",
+                    "data": "dns1.stabletransit.com", "ttl": 300}]
+        return [CloudDNSRecord(mgr, rec, loaded=False) for rec in recs]
+
+    def test_reconcile_dry_run(self):
+        clt = self.client
+        mgr = clt._manager
+        dom = self.domain
+        current = self._current_records(mgr, dom)
+        mgr.list_records = Mock(return_value=ResultsPage(current,
+                PageCursor("record")))
+        mgr._async_call = Mock()
+        desired = [
+                # Unchanged, apart from case and the trailing dot.
+                {"type": "cname", "name": "FTP.example.com.",
+                    "data": "WWW.example.com."},
+                # A new TTL.
+                {"type": "A", "name": "www.example.com", "data": "192.0.2.1",
+                    "ttl": 600},
+                # A new mail server replaces the old one.
+                {"type": "MX", "name": "example.com",
+                    "data": "mx.example.com", "priority": 10},
+                {"type": "A", "name": "new.example.com", "data": "192.0.2.3"},
+                {"type": "A", "name": "new.example.com", "data": "192.0.2.3"},
+                ]
+        plan = clt.reconcile(dom, desired, dry_run=True)
+        self.assertFalse(mgr._async_call.called)
+        self.assertFalse(plan.applied)
+        self.assertEqual(len(plan), 4)
+        self.assertEqual([rec.id for rec in plan.unchanged], ["CNAME-1"])
+        self.assertEqual(plan.adds, [desired[3]])
+        self.assertEqual([rec.id for rec in plan.deletes], ["A-2"])
+        updates = dict((rec.id, changes) for rec, changes in plan.updates)
+        self.assertEqual(updates, {"A-1": {"ttl": 600},
+                "MX-1": {"data": "mx.example.com"}})
+
+    def test_reconcile_apply(self):
+        clt = self.client
+        mgr = clt._manager
+        dom = self.domain
+        current = self._current_records(mgr, dom)
+        mgr.list_records = Mock(return_value=ResultsPage(current,
+                PageCursor("record")))
+        mgr.add_records = Mock(return_value=["added"])
+        mgr.update_records = Mock()
+        mgr.delete_records = Mock()
+        desired = [{"type": "A", "name": "www.example.com",
+                "data": "192.0.2.9"}]
+        desired.extend({"type": "A", "name": "host%s.example.com" % num,
+                "data": "192.0.2.%s" % num} for num in range(3))
+        plan = clt.reconcile(dom, desired)
+        self.assertTrue(plan.applied)
+        self.assertEqual([action for action, recs in plan.batches(2)],
+                ["delete", "delete", "update", "add", "add"])
+        mgr.delete_records.assert_called_once_with(dom, plan.deletes)
+        self.assertEqual(sorted(rec.id for rec in plan.deletes),
+                ["A-2", "CNAME-1", "MX-1"])
+        mgr.update_records.assert_called_once_with(dom, [{"id": "A-1",
+                "name": "www.example.com", "data": "192.0.2.9"}])
+        mgr.add_records.assert_called_once_with(dom, desired[1:])
+        self.assertEqual(plan.added_records, ["added"])
+
+    def _mirror(self):
+        clt = self.client
+        mgr = clt._manager
+        recs = [{"id": "A-1", "type": "A", "name": "www.example.com",
+                    "data": "192.0.2.1"},
+                {"id": "A-2", "type": "A", "name": "www.example.com",
+                    "data": "192.0.2.2"},
+                {"id": "MX-1", "type": "MX", "name": "example.com",
+                    "data": "mail.example.com", "priority": 10}]
+        mgr.list_records = Mock(return_value=ResultsPage([CloudDNSRecord(mgr,
+                dict(rec, domain_id="1234"), loaded=False) for rec in recs],
+                PageCursor("record")))
+        return clt.get_mirror(domains=[1234])
+
+    def test_mirror_bootstrap(self):
+        clt = self.client
+        mgr = clt._manager
+        mirror = self._mirror()
+        mgr.list_records.assert_called_once_with("1234")
+        mgr.search_records = Mock()
+        recs = mirror.search_records(1234, "a", name="WWW.example.com")
+        self.assertEqual(sorted(rec.id for rec in recs), ["A-1", "A-2"])
+        self.assertTrue(isinstance(recs[0], CloudDNSRecord))
+        rec = mirror.find_record("1234", "A", name="www.example.com",
+                data="192.0.2.2")
+        self.assertEqual(rec.id, "A-2")
+        self.assertEqual(rec.domain_id, "1234")
+        self.assertEqual(mirror.find_record("1234", "MX").priority, 10)
+        self.assertRaises(exc.DomainRecordNotUnique, mirror.find_record,
+                "1234", "A")
+        self.assertRaises(exc.DomainRecordNotFound, mirror.find_record,
+                "1234", "CNAME")
+        self.assertFalse(mgr.search_records.called)
+
+    def test_mirror_sync(self):
+        clt = self.client
+        mgr = clt._manager
+        mirror = self._mirror()
+        synced_at = mirror._since["1234"]
+        changes = [{"action": "update", "targetType": "Domain",
+                    "targetId": 1234},
+                {"action": "create", "targetType": "Record",
+                    "targetId": "A-3"},
+                {"action": "update", "targetType": "Record",
+                    "targetId": "A-1"},
+                {"action": "delete", "targetType": "Record",
+                    "targetId": "A-2"},
+                {"action": "create", "targetType": "Record",
+                    "targetId": "A-4"}]
+        mgr.changes_since = Mock(return_value=changes)
+        current = {"A-3": {"id": "A-3", "type": "A", "name": "ftp.example.com",
+                    "data": "192.0.2.3"},
+                "A-1": {"id": "A-1", "type": "A", "name": "web.example.com",
+                    "data": "192.0.2.1"}}
+
+        def get_record(dom_id, rec_id):
+            if rec_id not in current:
+                raise exc.NotFound(404)
+            return current[rec_id]
+
+        mgr.get_record = Mock(side_effect=get_record)
+        self.assertEqual(mirror.sync(), 5)
+        since = synced_at - datetime.timedelta(seconds=mirror.overlap)
+        mgr.changes_since.assert_called_once_with("1234",
+                since.strftime("%Y-%m-%d %H:%M:%S"))
+        self.assertEqual(mgr.get_record.call_count, 3)
+        self.assertEqual(mirror.search_records("1234", "A",
+                name="www.example.com"), [])
+        self.assertEqual(mirror.find_record("1234", "A",
+                name="web.example.com").id, "A-1")
+        self.assertEqual(mirror.find_record("1234", "A",
+                name="ftp.example.com").id, "A-3")
+
+    def test_mirror_sync_domain_deleted(self):
+        clt = self.client
+        mgr = clt._manager
+        mirror = self._mirror()
+        mgr.changes_since = Mock(return_value=[{"action": "delete",
+                "targetType": "Domain", "targetId": 1234}])
+        mirror.sync()
+        self.assertEqual(mirror.search_records("1234", "MX"), [])
+        mgr.changes_since.reset_mock()
+        mirror.sync()
+        self.assertFalse(mgr.changes_since.called)
+
+    def test_mirror_sync_all_domains(self):
+        clt = self.client
+        mgr = clt._manager
+        self._mirror()
+
+        def domains(*dom_ids):
+            return ResultsPage([CloudDNSDomain(mgr, {"id": dom_id,
+                    "name": "%s.example.com" % dom_id}) for dom_id in dom_ids],
+                    PageCursor("domain"))
+
+        mgr.list = Mock(return_value=domains(1234, 5678))
+        mirror = clt.get_mirror()
+        self.assertEqual(sorted(mirror._since), ["1234", "5678"])
+        # A domain created after the bootstrap is loaded, and a deleted one
+        # is dropped, on the next sync.
+        mgr.list = Mock(return_value=domains(1234, 9999))
+        mgr.list_records.reset_mock()
+        mgr.changes_since = Mock(return_value=[])
+        self.assertEqual(mirror.sync(), 2)
+        mgr.list_records.assert_called_once_with("9999")
+        self.assertEqual(mgr.changes_since.call_count, 1)
+        self.assertEqual(mgr.changes_since.call_args[0][0], "1234")
+        self.assertEqual(sorted(mirror._since), ["1234", "9999"])
+        self.assertEqual(mirror.find_record("9999", "MX").id, "MX-1")
+        self.assertEqual(mirror.search_records("5678", "MX"), [])
+
+    def test_mirror_save_load(self):
+        clt = self.client
+        mgr = clt._manager
+        mirror = self._mirror()
+        with utils.SelfDeletingTempDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "mirror.json")
+            mirror.save(path)
+            loaded = DNSMirror.load(mgr, path)
+        self.assertEqual(loaded._since, mirror._since)
+        self.assertEqual(loaded._index, mirror._index)
+        self.assertEqual(loaded.find_record("1234", "MX").data,
+                "mail.example.com")
+
+    def test_mirror_start_stop(self):
+        clt = self.client
+        mgr = clt._manager
+        mirror = self._mirror()
+        synced = threading.Event()
+
+        def sync():
+            synced.set()
+            raise exc.OverLimit(413)
+
+        mirror.sync = sync
+        mirror.start(interval=0.001)
+        self.assertTrue(synced.wait(5))
+        mirror.stop()
+        self.assertTrue(isinstance(mirror.last_error, exc.OverLimit))
+        self.assertIsNone(mirror._thread)
+
     def test_resolve_device_type(self):
         clt = self.client
         mgr = clt._manager
@@ -816,6 +1313,48 @@ class CloudDNSTest(unittest.TestCase):
         res_iter.next_uri = None
         self.assertRaises(StopIteration, res_iter.next)
 
+    def _paged_domains(self):
+        next_link = {"href": "%s/domains?offset=2" % example_uri,
+                "rel": "next"}
+        return [({}, {"domains": [{"name": "a"}, {"name": "b"}],
+                    "links": [next_link]}),
+                ({}, {"domains": [{"name": "c"}]})]
+
+    def test_iter_items_all_pages(self):
+        clt = self.client
+        mgr = clt._manager
+        mgr.resource_class = CloudDNSDomain
+        clt.method_get = Mock(side_effect=self._paged_domains())
+        res_iter = clt.get_domain_iterator()
+        self.assertEqual([dom.name for dom in res_iter], ["a", "b", "c"])
+        self.assertEqual(clt.method_get.call_args_list,
+                [call("/domains"), call("/domains?offset=2")])
+
+    def test_iter_items_prefetch(self):
+        clt = self.client
+        mgr = clt._manager
+        mgr.resource_class = CloudDNSDomain
+        clt.method_get = Mock(side_effect=self._paged_domains())
+        res_iter = clt.get_domain_iterator(prefetch=True)
+        self.assertEqual(res_iter.next().name, "a")
+        # The second page is requested before the first is used up.
+        self.assertTrue(res_iter._pending is not None)
+        self.assertEqual(res_iter._pending.result(5)[1], None)
+        self.assertEqual(clt.method_get.call_count, 2)
+        self.assertEqual([dom.name for dom in res_iter], ["b", "c"])
+        self.assertEqual(clt.method_get.call_count, 2)
+
+    def test_iter_items_prefetch_error(self):
+        clt = self.client
+        mgr = clt._manager
+        mgr.resource_class = CloudDNSDomain
+        pages = self._paged_domains()
+        clt.method_get = Mock(side_effect=[pages[0], exc.OverLimit(413)])
+        res_iter = clt.get_domain_iterator(prefetch=True)
+        self.assertEqual([res_iter.next().name, res_iter.next().name],
+                ["a", "b"])
+        self.assertRaises(exc.OverLimit, res_iter.next)
+
     def test_subdomain_iter(self):
         clt = self.client
         mgr = clt._manager
@@ -1,12 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import time
 import unittest
 
 from mock import MagicMock as Mock
+from mock import patch
 
 import pyrax.exceptions as exc
 from pyrax import manager
+from pyrax import resource
 import pyrax.utils as utils
 
 from tests.unit import fakes
@@ -196,6 +199,116 @@ class ManagerTest(unittest.TestCase):
         self.assertEqual(ret, mtch)
         mgr.findall = sav_fa
 
+    def _paged_list(self, num_items):
+        items = []
+        for num in xrange(num_items):
+            item = fakes.FakeEntity()
+            item.id = "%03d" % num
+            items.append(item)
+
+        def fake_list(limit=None, marker=None):
+            start = 0 if marker is None else int(marker) + 1
+            return items[start:start + (limit or 4)]
+
+        return Mock(side_effect=fake_list)
+
+    def test_iter_all(self):
+        mgr = self.manager
+        mgr.list = self._paged_list(10)
+        for prefetch in (0, 1, 3):
+            mgr.list.reset_mock()
+            ids = [item.id for item in mgr.iter_all(page_size=4,
+                    prefetch=prefetch)]
+            self.assertEqual(ids, ["%03d" % num for num in xrange(10)])
+            # The short third page ends the listing.
+            self.assertEqual(mgr.list.call_count, 3)
+            self.assertEqual(mgr.list.call_args_list[1][1],
+                    {"limit": 4, "marker": "003"})
+
+    def test_iter_all_default_page_size(self):
+        mgr = self.manager
+        mgr.list = self._paged_list(8)
+        ids = [item.id for item in mgr.iter_all()]
+        # Without any page size, the listing is a single request.
+        self.assertEqual(ids, ["000", "001", "002", "003"])
+        mgr.list.assert_called_once_with(limit=None, marker=None)
+
+    def test_iter_all_manager_page_size(self):
+        mgr = self.manager
+        mgr.default_page_size = 4
+        mgr.list = self._paged_list(3)
+        ids = [item.id for item in mgr.iter_all()]
+        self.assertEqual(len(ids), 3)
+        mgr.list.assert_called_once_with(limit=4, marker=None)
+
+    def test_iter_all_marker_ignored(self):
+        mgr = self.manager
+        o1 = fakes.FakeEntity()
+        o2 = fakes.FakeEntity()
+        mgr.list = Mock(return_value=[o1, o2])
+        self.assertEqual(list(mgr.iter_all(page_size=2)), [o1, o2])
+        self.assertEqual(mgr.list.call_count, 2)
+
+    def test_iter_all_inclusive_marker(self):
+        mgr = self.manager
+        mgr.inclusive_marker = True
+        items = self._paged_list(10).side_effect
+
+        def fake_list(limit=None, marker=None):
+            # Each page starts with the marker's item.
+            start = 0 if marker is None else int(marker)
+            return items(limit=limit, marker=None if not start else
+                    "%03d" % (start - 1))
+
+        mgr.list = Mock(side_effect=fake_list)
+        ids = [item.id for item in mgr.iter_all(page_size=4)]
+        self.assertEqual(ids, ["%03d" % num for num in xrange(10)])
+        self.assertEqual(mgr.list.call_count, 4)
+
+    def test_iter_all_error(self):
+        mgr = self.manager
+        mgr.list = Mock(side_effect=[[fakes.FakeEntity()],
+                exc.OverLimit(413)])
+        items = mgr.iter_all(page_size=1)
+        items.next()
+        self.assertRaises(exc.OverLimit, items.next)
+
+    def test_iter_all_stop_early(self):
+        mgr = self.manager
+        mgr.list = self._paged_list(100)
+        items = mgr.iter_all(page_size=4, prefetch=2)
+        first = items.next()
+        items.close()
+        self.assertEqual(first.id, "000")
+        # The background fetch stops instead of reading the whole listing.
+        time.sleep(0.3)
+        self.assert_(mgr.list.call_count <= 4)
+
+    def test_marker_for(self):
+        mgr = self.manager
+        res = resource.BaseResource(mgr, {"name": "db1"})
+        self.assertEqual(mgr._marker_for(res), "db1")
+        res = resource.BaseResource(mgr, {"id": "x", "name": "db1"})
+        self.assertEqual(mgr._marker_for(res), "x")
+
+    def test_findall_all_pages(self):
+        mgr = self.manager
+        mgr.default_page_size = 4
+        mgr.list = self._paged_list(10)
+        ret = mgr.findall(id="009")
+        self.assertEqual(len(ret), 1)
+
+    def test_findall_no_prefetch(self):
+        mgr = self.manager
+        mgr.default_page_size = 4
+        mgr.list = self._paged_list(2)
+        with patch.object(manager, "threading") as fake_threading:
+            ret = mgr.findall(id="001")
+        self.assertFalse(fake_threading.Thread.called)
+        self.assertEqual(len(ret), 1)
+        # The short page is known to be the last one.
+        self.assertEqual(mgr.list.call_count, 1)
+
     def test_findall(self):
         mgr = self.manager
         o1 = fakes.FakeEntity()
@@ -228,6 +341,27 @@ class ManagerTest(unittest.TestCase):
         self.assertFalse(o3 in ret)
         mgr.list = sav
 
+    def test_findall_query_filters(self):
+        mgr = self.manager
+        mgr.query_filters = {"name": "display_name"}
+        o1 = resource.BaseResource(mgr, {"id": "1", "display_name": "ok"})
+        o1.name = "ok"
+        o2 = resource.BaseResource(mgr, {"id": "2", "display_name": "okay"})
+        o2.name = "okay"
+        o1.size = o2.size = 1
+        mgr.list = Mock(side_effect=[[o1, o2], []])
+        ret = mgr.findall(name="ok", size=1)
+        self.assertEqual(ret, [o1])
+        mgr.list.assert_any_call(limit=None, marker=None,
+                filters={"display_name": "ok"})
+
+    def test_list_filters(self):
+        mgr = self.manager
+        mgr._list = Mock()
+        mgr.uri_base = "test"
+        mgr.list(limit=5, filters={"status": "available"})
+        mgr._list.assert_called_once_with("/test?limit=5&status=available")
+
     def test_add_hook(self):
         mgr = self.manager
         sav = mgr._hooks_map
@@ -81,6 +81,32 @@ class UtilsTest(unittest.TestCase):
                 received = utils.get_checksum(testfile)
         self.assertEqual(expected, received)
 
+    def test_get_checksum_from_path_chunked(self):
+        test = utils.random_name(1000, ascii_only=True)
+        expected = hashlib.md5(test).hexdigest()
+        with utils.SelfDeletingTempfile() as tmp:
+            with open(tmp, "w") as testfile:
+                testfile.write(test)
+            received = utils.get_checksum(tmp, block_size=64)
+            self.assertEqual(expected, received)
+            received = utils.get_checksum(tmp, block_size=64, use_mmap=True)
+            self.assertEqual(expected, received)
+
+    def test_get_checksum_from_empty_path_mmap(self):
+        expected = hashlib.md5("").hexdigest()
+        with utils.SelfDeletingTempfile() as tmp:
+            received = utils.get_checksum(tmp, use_mmap=True)
+        self.assertEqual(expected, received)
+
+    def test_get_checksum_from_file_keeps_position(self):
+        test = utils.random_name(500, ascii_only=True)
+        expected = hashlib.md5(test).hexdigest()
+        fileobj = StringIO.StringIO(test)
+        fileobj.seek(123)
+        received = utils.get_checksum(fileobj, block_size=7)
+        self.assertEqual(expected, received)
+        self.assertEqual(fileobj.tell(), 123)
+
     def test_random_name(self):
         nm = utils.random_name(33)
         self.assertEqual(len(nm), 33)